@@ -1,8 +1,9 @@
 import os
 import sys
 import uvicorn
-from typing import Optional
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
@@ -17,8 +18,12 @@ load_dotenv()
 # --- 2. Import Core Agent Logic & S3 Storage ---
 try:
     from modules.content_builder import build_content_from_prompt
-    from modules.blog_agent.blog_builder import build_blog_from_topic
-    from modules.text_generator import _gemini_call
+    from modules.blog_agent.blog_builder import build_blog_outputs, BLOG_FORMATS
+    from modules.text_generator import _gemini_call, llm_cache_stats
+    from modules import single_flight, hedging, provider_router
+    from modules.blog_agent import search_cache, retriever, mermaid_renderer, diagram_generator
+    from modules.blog_agent.retriever_hybrid import IMAGE_STORE
+    from modules import google_image, background_library, asset_cache, typography_engine
     # New S3 Import
     from modules.s3_storage import upload_to_s3
 except ImportError as e:
@@ -29,10 +34,17 @@ except ImportError as e:
 
 # --- 3. FastAPI App & API Models ---
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fonts and scaled logos are loaded once per worker, not on the first renders
+    typography_engine.warm_assets()
+    yield
+
 app = FastAPI(
     title="AI Content Agent API",
     description="API for the Motivational Post and RAG Blog Generation pipelines with S3 Storage.",
-    version="1.1.0"
+    version="1.1.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware to allow frontend access
@@ -48,6 +60,14 @@ app.add_middleware(
 class TopicRequest(BaseModel):
     topic: str = Field(..., example="The Future of AI")
 
+class MotivationalRequest(TopicRequest):
+    # True = local typography on a pre-generated background (no image-model call); None = POST_IMAGE_MODE
+    fast: Optional[bool] = Field(None, example=True)
+
+class BlogRequest(TopicRequest):
+    # Any of "docx", "markdown", "html"; web-only callers can skip DOCX entirely
+    formats: List[str] = Field(["docx"], example=["html", "markdown"])
+
 class ChatRequest(BaseModel):
     prompt: str
 
@@ -64,7 +84,9 @@ class MotivationalPostResponse(BaseModel):
 class BlogResponse(BaseModel):
     topic: str
     # Changed from local paths to S3 URLs
-    docx_url: str = Field(..., example="https://my-bucket.s3.amazonaws.com/blogs/docs/blog.docx")
+    docx_url: Optional[str] = Field(None, example="https://my-bucket.s3.amazonaws.com/blogs/docs/blog.docx")
+    markdown_url: Optional[str] = Field(None, example="https://my-bucket.s3.amazonaws.com/blogs/markdown/blog.md")
+    html_url: Optional[str] = Field(None, example="https://my-bucket.s3.amazonaws.com/blogs/html/blog.html")
     cover_url: Optional[str] = Field(None, example="https://my-bucket.s3.amazonaws.com/blogs/covers/cover.png")
     # Removed assets_dir as it is a local path and less relevant for cloud deployments
 
@@ -76,18 +98,64 @@ def health():
     """A simple endpoint to confirm the server is running."""
     return {"status": "ok"}
 
+@app.get("/api/v1/metrics", summary="Runtime Metrics")
+def metrics():
+    """
+    Performance counters. `single_flight` is per worker process; the
+    caches are shared by all workers using the same cache files.
+    """
+    return {
+        "single_flight": single_flight.all_stats(),
+        "hedging": hedging.all_stats(),
+        "providers": provider_router.all_stats(),
+        "llm_cache": llm_cache_stats(),
+        "serp_cache": search_cache.stats(),
+        "wiki_cache": retriever.cache_stats(),
+        "image_store": IMAGE_STORE.stats(),
+        "mermaid": mermaid_renderer.stats(),
+        "mermaid_validation": diagram_generator.validation_stats(),
+        "image_cache": google_image.image_cache_stats(),
+        "background_library": background_library.default_library().stats(),
+        "assets": asset_cache.stats(),
+    }
+
+@app.get("/api/v1/metrics/providers", summary="Provider Routing")
+def provider_metrics():
+    """Per-provider EWMA latency, error/timeout rates, circuit state and the latest routing decisions."""
+    return provider_router.all_stats()
+
+# Admin endpoints require the X-Admin-Token header and are disabled while ADMIN_TOKEN is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def _require_admin(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them.")
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token.")
+
+@app.get("/api/v1/admin/image_cache", summary="Generated Image Cache Stats")
+def image_cache_stats(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    return google_image.image_cache_stats()
+
+@app.delete("/api/v1/admin/image_cache", summary="Purge Generated Image Cache")
+def purge_image_cache(x_admin_token: Optional[str] = Header(None)):
+    """Deletes every cached generated image; the next request for each prompt regenerates it."""
+    _require_admin(x_admin_token)
+    return {"purged": google_image.IMAGE_CACHE.purge()}
+
 @app.post("/api/v1/chat", 
           response_model=ChatResponse, 
           summary="Simple Chat")
 def chat(req: ChatRequest):
     """Provides a direct interface to the Gemini text generator."""
-    text = _gemini_call(req.prompt)
+    text = _gemini_call(req.prompt, cache=False)
     return ChatResponse(text=text)
 
 @app.post("/api/v1/generate/motivational_post", 
           response_model=MotivationalPostResponse, 
           summary="Module 1: Generate Motivational Post")
-def generate_motivational_post(req: TopicRequest):
+def generate_motivational_post(req: MotivationalRequest):
     """
     Runs the full 'Pipeline 1' (Motivational Post Generator).
     Generates locally, uploads to S3, and returns the public URL.
@@ -95,7 +163,7 @@ def generate_motivational_post(req: TopicRequest):
     print(f"Received request to generate motivational post for topic: {req.topic}")
     try:
         # 1. Generate locally
-        data, local_image_path = build_content_from_prompt(req.topic)
+        data, local_image_path = build_content_from_prompt(req.topic, fast=req.fast)
         
         if not local_image_path:
             raise HTTPException(status_code=500, detail="Image generation failed internally.")
@@ -121,30 +189,44 @@ def generate_motivational_post(req: TopicRequest):
 @app.post("/api/v1/generate/blog_post", 
           response_model=BlogResponse, 
           summary="Module 2: Generate RAG Blog Post")
-def generate_blog_post(req: TopicRequest):
+def generate_blog_post(req: BlogRequest):
     """
     Runs the full 'Pipeline 2' (Blog Post Generator).
-    Generates DOCX and Cover locally, uploads to S3, and returns public URLs.
+    Generates the requested formats (DOCX, Markdown, HTML) and the Cover locally,
+    uploads them to S3, and returns public URLs.
     """
-    print(f"Received request to generate blog post for topic: {req.topic}")
+    print(f"Received request to generate blog post for topic: {req.topic} (formats: {req.formats})")
+    unknown = [f for f in req.formats if f not in BLOG_FORMATS]
+    if unknown or not req.formats:
+        raise HTTPException(status_code=422, detail=f"formats must be a non-empty subset of {list(BLOG_FORMATS)}")
     try:
         # 1. Generate locally
-        # build_blog_from_topic returns (docx_path, cover_path, assets_dir)
-        local_docx_path, local_cover_path, _ = build_blog_from_topic(req.topic)
-
-        # 2. Upload DOCX to S3
-        docx_url = upload_to_s3(local_docx_path, folder="blogs/docs")
-        if not docx_url:
-             raise HTTPException(status_code=500, detail="Failed to upload Blog DOCX to S3.")
+        outputs = build_blog_outputs(req.topic, req.formats)
+
+        # 2. Upload each document to S3
+        urls = {}
+        for fmt, folder in (("docx", "blogs/docs"), ("markdown", "blogs/markdown"), ("html", "blogs/html")):
+            if fmt not in outputs:
+                continue
+            urls[fmt] = upload_to_s3(outputs[fmt], folder=folder)
+            if not urls[fmt]:
+                raise HTTPException(status_code=500, detail=f"Failed to upload Blog {fmt.upper()} to S3.")
+
+        # Markdown links its images as assets/<file name>, the keys these uploads get
+        if "markdown" in outputs:
+            for image_path in outputs["images"]:
+                upload_to_s3(image_path, folder="blogs/markdown/assets")
 
         # 3. Upload Cover to S3 (if it exists)
         cover_url = None
-        if local_cover_path:
-            cover_url = upload_to_s3(local_cover_path, folder="blogs/covers")
+        if outputs["cover"]:
+            cover_url = upload_to_s3(outputs["cover"], folder="blogs/covers")
 
         return BlogResponse(
             topic=req.topic,
-            docx_url=docx_url,
+            docx_url=urls.get("docx"),
+            markdown_url=urls.get("markdown"),
+            html_url=urls.get("html"),
             cover_url=cover_url
         )
     except HTTPException:
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Blog enrichment + DOCX body build: legacy markdown round-trips vs the section model.
+
+Legacy re-splits/re-joins each section's markdown once per visual and then
+re-parses every line with regexes while building the DOCX. The model path
+parses each section once, inserts all figures in one pass and renders blocks.
+"parse+enrich" excludes python-docx (legacy parsing runs against a null document).
+Synthetic blogs only; no network or API keys.
+
+    python benchmarks/bench_docx_model.py [sections] [paragraphs] [figures] [runs]
+"""
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from docx.shared import Inches
+from PIL import Image
+
+from modules.blog_agent.document_model import figure, insert_figures, parse_section
+from modules.blog_agent.formatter import add_blocks, handle_formatting
+
+BLOG_DIR = "generated/blogs"
+
+
+# --- legacy pipeline (as it was before the section model) ---
+
+def _legacy_insert(content, insert_md, after_paragraph):
+    paras = [p for p in content.split("\n\n") if p.strip() != ""]
+    idx = max(0, min(after_paragraph, len(paras)))
+    new = []
+    for i, p in enumerate(paras):
+        new.append(p)
+        if i == idx:
+            new.append(insert_md)
+    if idx >= len(paras):
+        new.append(insert_md)
+    return "\n\n".join(new)
+
+
+def _legacy_enrich(content, visuals):
+    for after, path, keywords in visuals:
+        rel = os.path.relpath(path, BLOG_DIR).replace("\\", "/")
+        content = _legacy_insert(content, f"![{keywords}]({rel})", after)
+    return content
+
+
+def _legacy_render(document, content_md):
+    img_regex = re.compile(r'!\[(.*?)\]\((.*?)\)')
+    for line in content_md.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        match = img_regex.search(line)
+        if match:
+            img_desc, img_rel_path = match.groups()
+            img_full_path = os.path.join(BLOG_DIR, img_rel_path.replace("/", os.sep))
+            if os.path.exists(img_full_path):
+                document.add_picture(img_full_path, width=Inches(5.5))
+                if img_desc:
+                    document.add_paragraph().add_run(f"Figure: {img_desc}").italic = True
+            continue
+        if line.startswith('## '):
+            document.add_heading(line.lstrip('## ').strip(), level=3)
+        elif line.startswith('* '):
+            handle_formatting(document.add_paragraph(style='List Bullet'), line.lstrip('* ').strip())
+        elif re.match(r'^\d+\.\s', line):
+            handle_formatting(document.add_paragraph(style='List Number'), re.sub(r'^\d+\.\s', '', line).strip())
+        else:
+            handle_formatting(document.add_paragraph(), line)
+
+
+class _NullDoc:
+    """Stands in for a Document so the legacy parse cost can be timed on its own."""
+
+    def add_picture(self, *a, **kw):
+        pass
+
+    def add_heading(self, *a, **kw):
+        pass
+
+    def add_paragraph(self, *a, **kw):
+        return self
+
+    def add_run(self, *a, **kw):
+        return self
+
+
+# --- synthetic blog ---
+
+def _section_md(s, paragraphs):
+    chunks = []
+    for p in range(paragraphs):
+        if p % 5 == 3:
+            chunks.append("\n".join(f"* **Point {k}** keeps *latency* low in section {s}" for k in range(4)))
+        elif p % 5 == 4:
+            chunks.append("\n".join(f"{k + 1}. Step {k} of the *rollout*" for k in range(3)))
+        else:
+            chunks.append(f"Paragraph {p} of section {s} explains **caching** and *batching* in detail. " * 3)
+    return "\n\n".join(chunks)
+
+
+def _blog(sections, paragraphs, figures, image_path):
+    blog = []
+    for s in range(sections):
+        visuals = [((v * 7) % paragraphs, image_path, f"diagram {s} {v}") for v in range(figures)]
+        blog.append((f"Section {s}", _section_md(s, paragraphs), visuals))
+    return blog
+
+
+def _time(fn, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    paragraphs = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    figures = int(sys.argv[3]) if len(sys.argv) > 3 else 12
+    runs = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+
+    os.makedirs(BLOG_DIR, exist_ok=True)  # legacy resolves figures relative to it
+    with tempfile.TemporaryDirectory(dir=".") as tmp:
+        image_path = os.path.join(tmp, "fig.png")
+        Image.new("RGB", (96, 64), "teal").save(image_path)
+        blog = _blog(sections, paragraphs, figures, image_path)
+
+        def legacy_enrich():
+            return [(h, _legacy_enrich(md, vis)) for h, md, vis in blog]
+
+        def model_enrich():
+            return [insert_figures(parse_section(h, md), [(a, figure(p, k)) for a, p, k in vis]) for h, md, vis in blog]
+
+        def legacy_structure():
+            for _, md in legacy_enrich():
+                _legacy_render(_NullDoc(), md)
+
+        def legacy_full():
+            doc = Document()
+            for heading, md in legacy_enrich():
+                doc.add_heading(heading, level=2)
+                _legacy_render(doc, md)
+            doc.save(io.BytesIO())
+
+        def model_full():
+            doc = Document()
+            for section in model_enrich():
+                doc.add_heading(section.heading, level=2)
+                add_blocks(doc, section.blocks)
+            doc.save(io.BytesIO())
+
+        # Same document either way
+        legacy_md = [md for _, md in legacy_enrich()]
+        model_md = [s.to_markdown() for s in model_enrich()]
+        same_figures = all(a.count("![") == b.count("![") for a, b in zip(legacy_md, model_md))
+
+        results = {
+            "parse+enrich": (_time(legacy_structure, runs), _time(model_enrich, runs)),
+            "enrich+docx": (_time(legacy_full, runs), _time(model_full, runs)),
+        }
+
+    print(f"\n{sections} sections x {paragraphs} paragraphs, {figures} figures each; best of {runs}")
+    print(f"figure counts match: {same_figures}")
+    for phase, (legacy, model) in results.items():
+        print(f"{phase:<13} legacy {legacy * 1000:8.1f} ms   model {model * 1000:8.1f} ms   {legacy / model:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
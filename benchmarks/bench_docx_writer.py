@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+DOCX assembly: python-docx from scratch vs the cached branded template with
+bulk XML body emission and streaming save.
+
+Reports wall time per blog and the Python-heap peak (tracemalloc) while saving.
+Synthetic blog, local generated image; no network or API keys.
+
+    python benchmarks/bench_docx_writer.py [sections] [paragraphs] [figures] [runs]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from PIL import Image
+
+from benchmarks.bench_docx_model import _section_md
+from modules.blog_agent import docx_template, formatter
+from modules.blog_agent.document_model import figure, insert_figures, parse_section
+
+
+def _sections(count, paragraphs, figures, image):
+    return [
+        insert_figures(parse_section(f"Section {s}", _section_md(s, paragraphs)),
+                       [((v * 7) % paragraphs, figure(image, f"diagram {s} {v}")) for v in range(figures)])
+        for s in range(count)
+    ]
+
+
+def _save_peak(save):
+    tracemalloc.start()
+    save()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    paragraphs = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    figures = int(sys.argv[3]) if len(sys.argv) > 3 else 12
+    runs = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = os.path.join(tmp, "fig.png")
+        Image.new("RGB", (96, 64), "teal").save(image)
+        sections = _sections(count, paragraphs, figures, image)
+
+        results = {}
+        for writer in ("python-docx", "template"):
+            best = float("inf")
+            for i in range(runs):
+                start = time.perf_counter()
+                path = formatter.assemble_docx({"title": "Bench"}, sections, image, "bench", run_id=f"bench{i}", writer=writer)
+                best = min(best, time.perf_counter() - start)
+            size = os.path.getsize(path)
+            doc = Document(path)
+            out = os.path.join(tmp, f"{writer}.docx")
+            save = (lambda: docx_template.save_streaming(doc, out)) if writer == "template" else (lambda: doc.save(out))
+            results[writer] = (best, _save_peak(save), size)
+            for i in range(runs):
+                os.remove(f"generated/blogs/blog_bench{i}.docx")
+
+    print(f"\n{count} sections x {paragraphs} paragraphs, {figures} figures each; best of {runs}")
+    for writer, (secs, peak, size) in results.items():
+        print(f"{writer:<12} {secs * 1000:9.1f} ms/blog   save heap peak {peak / 1e6:6.2f} MB   file {size / 1e3:.0f} KB")
+    print(f"speedup      {results['python-docx'][0] / results['template'][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Per-call overhead of bare `requests.post` vs the pooled `modules.http_client`.
+
+Runs against a local stub Gemini endpoint twice: once over raw loopback, and
+once with a simulated per-connection setup delay standing in for the TCP+TLS
+handshake to googleapis.com.
+
+    python benchmarks/bench_http_client.py [calls] [handshake_ms]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from benchmarks.stub_server import StubServer, gemini_text_response
+from modules import http_client
+
+
+def _handler(method, path, query, body):
+    return 200, {}, gemini_text_response("stub reply")
+
+
+def _bench(label, stub, fn, calls):
+    before = stub.connections
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / calls * 1000:8.3f} ms/call   connections opened: {stub.connections - before}")
+
+
+async def _bench_async(stub, url, payload, calls):
+    before = stub.connections
+    start = time.perf_counter()
+    for _ in range(calls):
+        r = await http_client.apost(url, json=payload)
+        r.raise_for_status()
+    elapsed = time.perf_counter() - start
+    await http_client.aclose_all()
+    print(f"{'http_client.apost (httpx)':<28} {elapsed / calls * 1000:8.3f} ms/call   connections opened: {stub.connections - before}")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    handshake_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 30.0
+    for connect_latency in (0.0, handshake_ms / 1000):
+        _run(calls, connect_latency)
+
+
+def _run(calls, connect_latency):
+    payload = {"contents": [{"parts": [{"text": "hello"}]}]}
+
+    with StubServer(_handler, connect_latency=connect_latency) as stub:
+        url = f"{stub.url}/v1beta/models/gemini-2.0-flash:generateContent"
+        print(f"\nStub server at {stub.url}, {calls} calls each, "
+              f"simulated handshake {connect_latency * 1000:.0f} ms")
+
+        _bench("requests.post (before)", stub,
+               lambda: requests.post(url, json=payload, timeout=10).raise_for_status(), calls)
+        _bench("http_client.post (after)", stub,
+               lambda: http_client.post(url, json=payload).raise_for_status(), calls)
+        if http_client.httpx is not None:
+            asyncio.run(_bench_async(stub, url, payload, calls))
+
+    http_client.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Decoding a generated image from a JSON response: response.json() +
+b64decode (the old path) vs streaming the base64 field straight to disk.
+
+Serves Gemini-shaped responses with multi-MB inline images from a local stub
+and reports wall time and the tracemalloc peak per request, sequentially and
+with several concurrent requests (the case that bloats RSS under load).
+
+    python benchmarks/bench_image_decode.py [image_mb ...] [--concurrency N]
+"""
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_server import StubServer
+from modules import b64_stream, http_client
+
+
+def _buffered(url, out):
+    response = http_client.post(url, json={})
+    data = response.json()
+    for part in data["candidates"][0]["content"]["parts"]:
+        if "inlineData" in part:
+            with open(out, "wb") as f:
+                f.write(base64.b64decode(part["inlineData"]["data"]))
+            return
+
+
+def _streamed(url, out):
+    response = http_client.post(url, json={}, stream=True)
+    b64_stream.response_to_file(response, "data", out)
+
+
+def _measure(fn, url, tmp, concurrency):
+    outs = [os.path.join(tmp, f"out{i}.png") for i in range(concurrency)]
+    fn(url, outs[0])  # warm the connection pool
+    tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda out: fn(url, out), outs))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    args = sys.argv[1:]
+    concurrency = 1
+    if "--concurrency" in args:
+        i = args.index("--concurrency")
+        concurrency = int(args[i + 1])
+        del args[i:i + 2]
+    sizes = [float(a) for a in args] or [1, 4, 8]
+
+    for mb in sizes:
+        image = os.urandom(int(mb * 1024 * 1024))
+        body = json.dumps({"candidates": [{"content": {"parts": [
+            {"text": "Here is your image."},
+            {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(image).decode()}},
+        ]}}]}).encode()
+
+        with StubServer(lambda *a: (200, {}, body)) as stub, tempfile.TemporaryDirectory() as tmp:
+            url = f"{stub.url}/v1beta/models/gemini-2.5-flash-image:generateContent"
+            print(f"\n{mb:g} MB image ({len(body) / 1024 / 1024:.1f} MB JSON), {concurrency} concurrent request(s)")
+            for label, fn in (("response.json + b64decode", _buffered), ("streamed to disk", _streamed)):
+                for level in sorted({1, concurrency}):
+                    elapsed, peak = _measure(fn, url, tmp, level)
+                    print(f"  {label:<26} x{level:<3} {elapsed * 1000:8.1f} ms   "
+                          f"peak traced memory {peak / 1024 / 1024:7.2f} MB")
+        http_client.close_all()
+
+
+if __name__ == "__main__":
+    main()
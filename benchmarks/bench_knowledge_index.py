@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Offline knowledge index: ingest throughput and query latency on a synthetic
+corpus (default 30k documents x 4 paragraphs -> 120k chunks).
+
+Words follow a Zipf distribution over a fixed vocabulary, and every document
+gets a few topic terms, so queries mix rare and very common terms the way real
+grounding queries do. Reports ingest time, incremental re-ingest time (all
+unchanged) and search / search+pack latency percentiles.
+
+    python benchmarks/bench_knowledge_index.py [documents] [queries]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.blog_agent.knowledge_index import KnowledgeIndex, pack_context
+
+VOCAB_SIZE = 30000
+WORDS_PER_PARAGRAPH = 80  # ~140 tokens, one chunk per paragraph
+PARAGRAPHS_PER_DOC = 4
+
+
+def _vocab(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCAB_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def _corpus(n_docs, rng, vocab):
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    cum = list(_accumulate(weights))
+    for d in range(n_docs):
+        topic = rng.sample(vocab[2000:], 3)
+        paragraphs = []
+        for _ in range(PARAGRAPHS_PER_DOC):
+            words = rng.choices(vocab, cum_weights=cum, k=WORDS_PER_PARAGRAPH)
+            for i in range(0, len(words), 15):
+                words[i] = topic[(i // 15) % len(topic)]
+            paragraphs.append(" ".join(words))
+        yield {"source": f"synthetic:{d}", "title": " ".join(topic), "text": "\n\n".join(paragraphs)}
+
+
+def _accumulate(values):
+    total = 0.0
+    for v in values:
+        total += v
+        yield total
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    n_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    rng = random.Random(7)
+    vocab = _vocab(rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = KnowledgeIndex(os.path.join(tmp, "knowledge.db"))
+
+        corpus = list(_corpus(n_docs, random.Random(1), vocab))
+        start = time.perf_counter()
+        counts = index.ingest(corpus)
+        ingest_s = time.perf_counter() - start
+        index.optimize()
+
+        start = time.perf_counter()
+        again = index.ingest(corpus)
+        reingest_s = time.perf_counter() - start
+
+        stats = index.stats()
+        queries = []
+        for _ in range(n_queries):
+            # 1-2 topic-ish terms plus 1-2 common ones
+            queries.append(" ".join(rng.sample(vocab[2000:], rng.randint(1, 2)) + rng.sample(vocab[:200], rng.randint(1, 2))))
+
+        search_ms, pack_ms = [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            hits = index.search(q, k=12)
+            t1 = time.perf_counter()
+            pack_context(hits, 600)
+            t2 = time.perf_counter()
+            search_ms.append((t1 - t0) * 1000)
+            pack_ms.append((t2 - t0) * 1000)
+
+    print(f"\n{stats['documents']} documents, {stats['chunks']} chunks, index {stats['bytes'] / 1e6:.0f} MB")
+    print(f"ingest      {ingest_s:7.1f} s   ({counts['chunks'] / ingest_s:,.0f} chunks/s)")
+    print(f"re-ingest   {reingest_s:7.1f} s   ({again['skipped']} unchanged documents skipped)")
+    for name, values in (("search", search_ms), ("search+pack", pack_ms)):
+        print(f"{name:<11} p50 {statistics.median(values):6.2f} ms   p95 {_pct(values, 0.95):6.2f} ms   "
+              f"p99 {_pct(values, 0.99):6.2f} ms   ({len(values)} queries, k=12, 600-token budget)")
+
+
+if __name__ == "__main__":
+    main()
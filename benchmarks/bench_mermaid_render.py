@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Mermaid rendering: one `mmdc` process per diagram (the old path) vs the warm
+worker pool, the pure-Python fallback and render-cache hits.
+
+Renderers that are not installed here (mmdc, node + mermaid-cli) are reported
+as skipped. Each diagram is distinct, so only the cache row hits the cache.
+
+    python benchmarks/bench_mermaid_render.py [diagrams]
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.blob_store import BlobStore
+from modules.blog_agent import mermaid_fallback, mermaid_renderer
+
+
+def _diagram(i):
+    return (
+        f"graph LR\nA{i}[Collect data {i}] --> B{i}(Clean)\nB{i} --> C{i}{{Valid?}}\n"
+        f"C{i} -- yes --> D{i}[Train model]\nC{i} -. no .-> B{i}\nD{i} --> E{i}([Deploy])\nE{i} --> F{i}[Monitor]\nF{i} --> A{i}"
+    )
+
+
+def _row(name, times):
+    if not times:
+        print(f"{name:<22} skipped")
+        return
+    total = sum(times)
+    print(f"{name:<22} {statistics.median(times) * 1000:8.1f} ms/diagram (median)   total {total:6.2f} s")
+
+
+def _timed(fn, codes):
+    times = []
+    for code in codes:
+        t = time.perf_counter()
+        fn(code)
+        times.append(time.perf_counter() - t)
+    return times
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        mermaid_renderer.MERMAID_CACHE = BlobStore(os.path.join(tmp, "cache"))
+
+        mmdc = []
+        if shutil.which("mmdc"):
+            def spawn(code):
+                src = os.path.join(tmp, "d.mmd")
+                with open(src, "w") as f:
+                    f.write(code)
+                subprocess.run(["mmdc", "-i", src, "-o", os.path.join(tmp, "d.png")], check=True, capture_output=True)
+            mmdc = _timed(spawn, [_diagram(i) for i in range(min(n, 5))])
+
+        pool = []
+        if not mermaid_renderer.pool().unavailable:
+            mermaid_renderer.pool().start(1)
+            if not mermaid_renderer.pool().unavailable:
+                pool = _timed(lambda c: mermaid_renderer.pool().render(c), [_diagram(1000 + i) for i in range(n)])
+        mermaid_renderer.close_pool()
+
+        fallback = _timed(lambda c: mermaid_fallback.render(c), [_diagram(2000 + i) for i in range(n)])
+        fallback_svg = _timed(lambda c: mermaid_fallback.render(c, "svg"), [_diagram(3000 + i) for i in range(n)])
+
+        mermaid_renderer.MERMAID_RENDERER = "python"
+        codes = [_diagram(4000 + i) for i in range(n)]
+        for code in codes:
+            mermaid_renderer.render(code)
+        cached = _timed(mermaid_renderer.render, codes)
+
+    print(f"\n{n} distinct flowcharts (7 nodes, 7 edges)")
+    _row("mmdc per diagram", mmdc)
+    _row("warm worker pool", pool)
+    _row("python fallback (png)", fallback)
+    _row("python fallback (svg)", fallback_svg)
+    _row("render cache hit", cached)
+
+
+if __name__ == "__main__":
+    main()
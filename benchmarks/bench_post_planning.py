@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pre-image latency of the motivational-post planning step: fused vs legacy.
+
+A local stub Gemini endpoint answers every text call after a fixed delay
+(default 400 ms, roughly a fast gemini-2.0-flash round trip), so the
+difference is the number of sequential round trips.
+
+    python benchmarks/bench_post_planning.py [latency_ms] [runs]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+os.environ["LLM_CACHE_ENABLED"] = "0"
+
+from benchmarks.stub_server import StubServer, gemini_text_response
+
+PLAN = {
+    "quote": "Small steps, taken daily, outrun giant leaps taken once.",
+    "mood": "hopeful",
+    "visual_subject": "hiker on a winding mountain trail",
+    "scene": "hiker on a winding mountain trail at golden sunrise, soft fog in the valley",
+}
+
+
+def _handler(method, path, query, body):
+    req = json.loads(body or b"{}")
+    prompt = req["contents"][0]["parts"][0]["text"]
+    if "generationConfig" in req:
+        return 200, {}, gemini_text_response(json.dumps(PLAN))
+    if "Classify the emotional tone" in prompt:
+        return 200, {}, gemini_text_response("hopeful")
+    if "art director" in prompt:
+        return 200, {}, gemini_text_response(PLAN["visual_subject"])
+    if "background scene" in prompt:
+        return 200, {}, gemini_text_response(PLAN["scene"])
+    return 200, {}, gemini_text_response(PLAN["quote"])
+
+
+def main():
+    latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 400) / 1000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with StubServer(_handler, latency=latency) as stub:
+        from modules import text_generator, image_builder
+        text_generator.GEMINI_API_BASE = stub.url
+
+        results = {}
+        for mode in ("legacy", "fused"):
+            before = stub.requests
+            start = time.perf_counter()
+            for i in range(runs):
+                image_builder.plan_post(f"consistency {i}", planning=mode)
+            results[mode] = ((time.perf_counter() - start) / runs, (stub.requests - before) / runs)
+
+    print(f"\nStub latency {latency * 1000:.0f} ms per call, {runs} runs each")
+    for mode, (secs, calls) in results.items():
+        print(f"{mode:<8} {secs * 1000:8.1f} ms/plan   {calls:.0f} LLM calls/plan")
+    print(f"speedup  {results['legacy'][0] / results['fused'][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Quote typography: the old per-offset outline loop (80 text rasterizations
+plus up to 4 for fake bold) vs the single-mask outline in typography_engine,
+per image at 1080×1080 and 2048×2048.
+
+Where the Windows fonts the styles name are missing, asset_cache falls back
+to Pillow's scalable default font at the mood's real size.
+
+    python benchmarks/bench_typography.py [repeats]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from modules import typography_engine
+
+QUOTE = "Discipline is choosing between what you want now and what you want most"
+
+
+def legacy_outlined_text(img, x, y, text, font, color, outline_color, outline_width, bold, italic, spacing=12):
+    """The previous implementation: the outline is the text redrawn at every offset in the square."""
+    draw = ImageDraw.Draw(img)
+    for dx in range(-outline_width, outline_width + 1):
+        for dy in range(-outline_width, outline_width + 1):
+            if dx != 0 or dy != 0:
+                draw.multiline_text((x + dx, y + dy), text, font=font, fill=outline_color, align="center", spacing=spacing)
+    if italic:
+        offset = 2
+        for i, line in enumerate(text.split("\n")):
+            draw.text((x + offset, y + i * (font.size + spacing)), line, font=font, fill=color)
+            offset += 1
+    elif bold:
+        for dx, dy in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+            draw.multiline_text((x + dx, y + dy), text, font=font, fill=color, align="center", spacing=spacing)
+    else:
+        draw.multiline_text((x, y), text, font=font, fill=color, align="center", spacing=spacing)
+
+
+def _median_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times) * 1000
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'size':<11}{'mood':<10}{'outline loop':>14}{'single mask':>14}{'speedup':>9}{'full render':>14}")
+    for side in (1080, 2048):
+        background = Image.linear_gradient("L").resize((side, side)).convert("RGBA")
+        with tempfile.TemporaryDirectory() as tmp:
+            bg_path = os.path.join(tmp, "bg.png")
+            background.convert("RGB").save(bg_path)
+            for mood in ("neutral", "powerful", "calm"):
+                style = typography_engine.MOOD_STYLES[mood]
+                font = typography_engine._load_font(style["font_family"], int(style["base_size"] * 1.2))
+                text = "\n".join(typography_engine.wrap(QUOTE, width=max(15, int(side / (font.size * 0.5)))))
+                args = (side * 0.1, side * 0.3, text, font, (255, 255, 255), (0, 0, 0), 4, style["bold"], style["italic"])
+
+                old = _median_ms(lambda: legacy_outlined_text(background.copy(), *args), repeats)
+                new = _median_ms(lambda: typography_engine._draw_outlined_text(background.copy(), *args), repeats)
+                full = _median_ms(lambda: typography_engine.render_quote_on_image(
+                    bg_path, QUOTE, mood, os.path.join(tmp, "out.png")), repeats)
+                print(f"{side}x{side:<6}{mood:<10}{old:11.1f} ms{new:11.1f} ms{old / new:8.1f}x{full:11.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
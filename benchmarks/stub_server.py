@@ -0,0 +1,87 @@
+"""
+Local stub HTTP server used by the benchmarks and offline tests.
+
+Speaks HTTP/1.1 with keep-alive so pooled and unpooled clients can be compared.
+Routes are a plain function: handler(method, path, query, body) -> (status, headers, body_bytes).
+"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+def gemini_text_response(text: str) -> bytes:
+    return json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode()
+
+
+class StubServer:
+    def __init__(self, handler, latency: float = 0.0, connect_latency: float = 0.0):
+        self.handler = handler
+        self.latency = latency
+        # Simulated per-connection setup cost (stands in for a TLS handshake RTT).
+        self.connect_latency = connect_latency
+        self.requests = 0
+        self.connections = 0
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                stub.connections += 1
+                if stub.connect_latency:
+                    time.sleep(stub.connect_latency)
+
+            def _serve(self):
+                parts = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stub.requests += 1
+                delay = stub.latency(parts.path, parse_qs(parts.query)) if callable(stub.latency) else stub.latency
+                if delay:
+                    time.sleep(delay)
+                status, headers, payload = stub.handler(self.command, parts.path, parse_qs(parts.query), body)
+                self.send_response(status)
+                headers = dict(headers or {})
+                headers.setdefault("Content-Type", "application/json")
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(payload)
+
+            do_GET = do_POST = do_HEAD = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
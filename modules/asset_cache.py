@@ -0,0 +1,130 @@
+# modules/asset_cache.py
+"""
+Process-wide caches for the assets every rendered post reuses.
+
+- Fonts per (path, size): ImageFont.truetype parses the font file each time.
+- Text bounding boxes per (font, text, spacing): the brand line and repeated
+  quotes are measured once.
+- Logo variants per (path, height): opened, converted to RGBA and
+  LANCZOS-scaled once instead of on every render.
+
+All three are small LRU maps guarded by one lock and safe to share across the
+FastAPI threadpool. warm() preloads them at startup; stats() shows hit rates.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .utils import get_env
+
+FONT_CACHE_SIZE = int(get_env("FONT_CACHE_SIZE", "64"))
+TEXT_BBOX_CACHE_SIZE = int(get_env("TEXT_BBOX_CACHE_SIZE", "512"))
+LOGO_CACHE_SIZE = int(get_env("LOGO_CACHE_SIZE", "16"))
+
+_MISSING = object()
+_measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+
+class _LRU:
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is not _MISSING:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = load()  # outside the lock; two racing loads just produce the same value
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None}
+
+
+_fonts = _LRU("fonts", FONT_CACHE_SIZE)
+_bboxes = _LRU("text_bbox", TEXT_BBOX_CACHE_SIZE)
+_logos = _LRU("logos", LOGO_CACHE_SIZE)
+
+
+def _load_font(path: str, size: int):
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        print(f"⚠️  Font '{path}' not found; using Pillow's default font.")
+        try:
+            return ImageFont.load_default(size)  # scalable since Pillow 10.1
+        except TypeError:
+            return ImageFont.load_default()
+
+
+def get_font(path: str, size: int):
+    """Shared font object for (path, size). Treat it as read-only."""
+    return _fonts.get((path, size), lambda: _load_font(path, size))
+
+
+def text_bbox(path: str, size: int, text: str, spacing: int = 4) -> tuple:
+    """multiline_textbbox of `text` at the origin, with get_font(path, size)."""
+    return _bboxes.get(
+        (path, size, text, spacing),
+        lambda: _measure.multiline_textbbox((0, 0), text, font=get_font(path, size), spacing=spacing),
+    )
+
+
+def get_logo(path: str, height: int) -> Image.Image | None:
+    """
+    The logo as RGBA, LANCZOS-scaled to `height` px (aspect kept), or None if
+    the file is missing. Keyed by mtime too, so replacing the file takes effect.
+    The image is shared: paste it, don't modify it.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    def load():
+        with Image.open(path) as src:
+            logo = src.convert("RGBA")
+        width = max(1, round(logo.width * height / logo.height))
+        logo.thumbnail((width, height), Image.Resampling.LANCZOS)
+        return logo
+
+    return _logos.get((path, mtime, height), load)
+
+
+def warm(fonts=(), logos=()):
+    """Preloads fonts [(path, size)] and logo variants [(path, height)]."""
+    for path, size in fonts:
+        get_font(path, size)
+    for path, height in logos:
+        get_logo(path, height)
+
+
+def stats() -> dict:
+    return {cache.name: cache.stats() for cache in (_fonts, _bboxes, _logos)}
+
+
+def clear():
+    for cache in (_fonts, _bboxes, _logos):
+        cache.clear()
@@ -0,0 +1,194 @@
+# modules/b64_stream.py
+"""
+Streams one base64 string field out of a JSON response straight into a file.
+
+Image APIs return the picture as a multi-MB base64 string inside JSON
+(Gemini: candidates[].content.parts[].inlineData.data, Stability:
+artifacts[].base64). Parsing the whole body with response.json() and then
+b64decode()-ing it holds the image in memory three or four times over.
+Base64FieldExtractor instead scans the body chunk by chunk with a small JSON
+lexer: strings are tracked so a key only matches outside string values, and
+the first value of the wanted key is decoded in 4-byte-aligned slices
+(memoryviews of the incoming chunk) and written to the sink as it arrives.
+Peak memory is roughly one network chunk per request.
+"""
+import binascii
+import os
+import uuid
+
+from modules.utils import ensure_dir
+
+CHUNK_SIZE = 64 * 1024
+
+_WS = b" \t\r\n"
+_OUT, _STRING, _AFTER_STRING, _AFTER_COLON, _TARGET, _DONE = range(6)
+_KEY_CAP = 64  # longer strings cannot be a key we are looking for
+_B64_CHARS = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=")
+
+
+class Base64FieldExtractor:
+    """feed() JSON chunks; the first string value of `field` is decoded into sink.write()."""
+
+    def __init__(self, field: str, sink):
+        self.field = field.encode()
+        self.sink = sink
+        self.written = 0
+        self._state = _OUT
+        self._escape = False
+        self._unicode = None  # hex digits of a \uXXXX escape, possibly split across chunks
+        self._string = bytearray()
+        self._overflow = False
+        self._key = None
+        self._tail = b""
+
+    @property
+    def found(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, chunk: bytes):
+        view = memoryview(chunk)
+        pos, end = 0, len(chunk)
+        while pos < end and self._state != _DONE:
+            state = self._state
+            if state == _OUT:
+                quote = chunk.find(b'"', pos)
+                if quote < 0:
+                    return
+                self._state, self._escape, self._unicode = _STRING, False, None
+                self._string.clear()
+                self._overflow = False
+                pos = quote + 1
+            elif state in (_STRING, _TARGET):
+                pos = self._scan_string(chunk, view, pos, end, target=state == _TARGET)
+            else:
+                c = chunk[pos]
+                if c in _WS:
+                    pos += 1
+                elif state == _AFTER_STRING:
+                    if c == 0x3A:  # ':' -> the string was a key
+                        self._state = _AFTER_COLON
+                        pos += 1
+                    else:
+                        self._key, self._state = None, _OUT
+                else:  # _AFTER_COLON
+                    if c == 0x22 and self._key == self.field:
+                        self._state, self._escape, self._unicode = _TARGET, False, None
+                        pos += 1
+                    else:
+                        self._key, self._state = None, _OUT
+
+    def _scan_string(self, chunk: bytes, view: memoryview, pos: int, end: int, target: bool) -> int:
+        """Consumes string content up to and including its closing quote; returns the new position."""
+        while pos < end:
+            if self._unicode is not None:
+                take = min(4 - len(self._unicode), end - pos)
+                self._unicode += chunk[pos:pos + take]
+                pos += take
+                if len(self._unicode) == 4:
+                    self._unescaped(chr(int(self._unicode, 16)), target)
+                    self._unicode = None
+                continue
+            if self._escape:
+                self._escape = False
+                c = chunk[pos:pos + 1]
+                if c == b"u":  # e.g. base64 '=' padding sent as \u003d
+                    self._unicode = bytearray()
+                elif target:
+                    if c == b"/":  # JSON may escape '/'; \n, \r etc. are line wrapping
+                        self._decode(c)
+                elif not self._overflow:
+                    self._string += c
+                pos += 1
+                continue
+            quote = chunk.find(b'"', pos)
+            backslash = chunk.find(b"\\", pos, quote if quote >= 0 else end)
+            stop = backslash if backslash >= 0 else quote
+            piece_end = end if stop < 0 else stop
+            if piece_end > pos:
+                if target:
+                    self._decode(view[pos:piece_end])
+                elif not self._overflow:
+                    if len(self._string) + piece_end - pos > _KEY_CAP:
+                        self._overflow = True
+                    else:
+                        self._string += view[pos:piece_end]
+            if stop < 0:
+                return end
+            if stop == backslash:
+                self._escape = True
+                pos = stop + 1
+                continue
+            # Closing quote
+            if target:
+                self._finish()
+            else:
+                self._key = None if self._overflow else bytes(self._string)
+                self._state = _AFTER_STRING
+            return stop + 1
+        return pos
+
+    def _unescaped(self, char: str, target: bool):
+        data = char.encode("utf-8", "surrogatepass")
+        if target:
+            if len(data) == 1 and data[0] in _B64_CHARS:
+                self._decode(data)
+        elif not self._overflow:
+            if len(self._string) + len(data) > _KEY_CAP:
+                self._overflow = True
+            else:
+                self._string += data
+
+    def _decode(self, data):
+        if self._tail:
+            need = 4 - len(self._tail)
+            if len(data) < need:
+                self._tail += bytes(data)
+                return
+            self._write(binascii.a2b_base64(self._tail + bytes(data[:need])))
+            data = data[need:]
+        aligned = len(data) - len(data) % 4
+        if aligned:
+            self._write(binascii.a2b_base64(data[:aligned]))
+        self._tail = bytes(data[aligned:])
+
+    def _finish(self):
+        if self._tail:
+            self._write(binascii.a2b_base64(self._tail + b"=" * (-len(self._tail) % 4)))
+            self._tail = b""
+        self._state = _DONE
+
+    def _write(self, data: bytes):
+        self.sink.write(data)
+        self.written += len(data)
+
+
+def extract_to_file(chunks, field: str, output_path: str) -> int:
+    """
+    Decodes the first `field` string found in the JSON `chunks` into output_path.
+    Returns the number of bytes written, or 0 (and leaves output_path untouched)
+    if the field is absent. Written via a temp file, so readers never see half an image.
+    """
+    ensure_dir(output_path)
+    tmp = f"{output_path}.{uuid.uuid4().hex[:8]}.part"
+    try:
+        with open(tmp, "wb") as f:
+            extractor = Base64FieldExtractor(field, f)
+            for chunk in chunks:
+                extractor.feed(chunk)
+                if extractor.found:
+                    break
+        if not extractor.found:
+            return 0
+        os.replace(tmp, output_path)
+        return extractor.written
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def response_to_file(response, field: str, output_path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """extract_to_file for a streamed (stream=True) requests response; closes the response."""
+    try:
+        return extract_to_file(response.iter_content(chunk_size), field, output_path)
+    finally:
+        response.close()
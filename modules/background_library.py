@@ -0,0 +1,301 @@
+# modules/background_library.py
+"""
+Pre-generated background library for motivational posts ("fast mode").
+
+Backgrounds are generated once per mood (in parallel) or added by hand, and
+indexed in SQLite with their mood, subject keywords, overall and centre
+luminance and dominant colours. select_background() picks the best match for
+a quote: same mood, most keyword overlap, a centre dark enough for white text,
+and nothing used in the last BACKGROUND_REUSE_WINDOW picks (shared across
+worker processes through the index).
+
+    python -m modules.background_library build [--per-mood 5] [--workers 4] [--moods calm hopeful]
+    python -m modules.background_library add calm photo1.jpg photo2.jpg --subject "misty lake"
+    python -m modules.background_library select "Every storm runs out of rain" --mood hopeful
+    python -m modules.background_library stats
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from PIL import Image
+
+from .utils import ensure_dir, get_env, image_luminance
+
+LIBRARY_DIR = get_env("BACKGROUND_LIBRARY_DIR", "generated/backgrounds")
+BACKGROUND_REUSE_WINDOW = int(get_env("BACKGROUND_REUSE_WINDOW", "5"))
+BUILD_WORKERS = int(get_env("BACKGROUND_BUILD_WORKERS", "4"))
+
+# Mirrors image_generator._VALID_MOODS / typography_engine.MOOD_STYLES
+MOODS = ("calm", "hopeful", "powerful", "creative", "elegant", "intense")
+
+# Concrete subjects per mood; the build cycles through them
+SUBJECTS = {
+    "calm": ["misty lake at dawn", "zen garden with raked sand", "quiet beach at low tide",
+             "forest path in soft fog", "still mountain lake reflection", "lavender field at dusk"],
+    "hopeful": ["sunrise over rolling hills", "green sprout breaking through soil", "light through parting clouds",
+                "open road toward the horizon", "hot air balloons at sunrise", "meadow after rain with rainbow"],
+    "powerful": ["mountain climber on a summit", "storm waves crashing on cliffs", "lion on a rock at sunset",
+                 "runner sprinting on a track", "lightning over a desert", "eagle soaring above peaks"],
+    "creative": ["artist studio with paint splashes", "colorful abstract ink in water", "city murals at golden hour",
+                 "workbench with sketches and tools", "neon light trails at night", "origami birds in flight"],
+    "elegant": ["marble staircase in soft light", "single rose on dark velvet", "grand piano in a quiet hall",
+                "calligraphy pen on parchment", "art deco architecture at night", "silk fabric in gentle folds"],
+    "intense": ["volcano eruption at night", "boxer training in a dark gym", "wildfire glow on the horizon",
+                "racing car at full speed", "tornado over open plains", "warrior silhouette against fire"],
+}
+
+_TERM = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were will with "
+    "you your we our they their not no all can just do does into over under at up".split()
+)
+
+
+class Background(NamedTuple):
+    id: int
+    path: str
+    mood: str
+    subject: str
+    luminance: float
+    center_luminance: float
+    colors: list[str]
+
+
+def _terms(text: str) -> set[str]:
+    return {t for t in _TERM.findall((text or "").lower()) if t not in _STOPWORDS and len(t) > 2}
+
+
+def analyze(path: str) -> dict:
+    """Luminance (whole image and centre, where the quote goes), dominant colours and size."""
+    with Image.open(path) as img:
+        rgb = img.convert("RGB")
+        width, height = rgb.size
+        small = rgb.resize((64, 64))
+    center = small.crop((16, 16, 48, 48))
+    quantized = small.quantize(colors=5)
+    palette = quantized.getpalette()
+    counts = sorted(quantized.getcolors(), reverse=True)
+    colors = ["#%02x%02x%02x" % tuple(palette[i * 3:i * 3 + 3]) for _, i in counts[:3]]
+    return {
+        "luminance": round(image_luminance(small), 2),
+        "center_luminance": round(image_luminance(center), 2),
+        "colors": colors,
+        "width": width,
+        "height": height,
+    }
+
+
+class BackgroundLibrary:
+    def __init__(self, root: str = LIBRARY_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.db")
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            ensure_dir(self.index_path)
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS backgrounds (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, "
+                "mood TEXT NOT NULL, subject TEXT NOT NULL, keywords TEXT NOT NULL, luminance REAL NOT NULL, "
+                "center_luminance REAL NOT NULL, colors TEXT NOT NULL, width INTEGER, height INTEGER, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL DEFAULT 0, uses INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS backgrounds_mood ON backgrounds(mood)")
+            conn.execute("CREATE INDEX IF NOT EXISTS backgrounds_recent ON backgrounds(last_used)")
+            self._local.conn = conn
+        return conn
+
+    def add(self, src_path: str, mood: str, subject: str = "", move: bool = False) -> int:
+        """Copies (or moves) an image into the library and indexes it. Returns its id."""
+        if mood not in MOODS:
+            raise ValueError(f"Unknown mood '{mood}'. Expected one of: {', '.join(MOODS)}")
+        info = analyze(src_path)
+        dest = os.path.join(self.root, mood, f"{uuid.uuid4().hex[:12]}{os.path.splitext(src_path)[1].lower() or '.png'}")
+        ensure_dir(dest)
+        tmp = f"{dest}.tmp"
+        (shutil.move if move else shutil.copyfile)(src_path, tmp)
+        os.replace(tmp, dest)
+        keywords = " ".join(sorted(_terms(subject) | {mood}))
+        return self._conn().execute(
+            "INSERT INTO backgrounds(path, mood, subject, keywords, luminance, center_luminance, colors, width, height, "
+            "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (os.path.relpath(dest, self.root), mood, subject, keywords, info["luminance"], info["center_luminance"],
+             json.dumps(info["colors"]), info["width"], info["height"], time.time()),
+        ).lastrowid
+
+    def subjects(self, mood: str) -> set[str]:
+        return {r[0] for r in self._conn().execute("SELECT subject FROM backgrounds WHERE mood = ?", (mood,))}
+
+    def select(self, quote: str, mood: str, topic: str = "", reuse_window: int = BACKGROUND_REUSE_WINDOW) -> Background | None:
+        """
+        Best background for a quote, marked as used. Candidates are the mood's
+        backgrounds (any mood if it has none) minus the last `reuse_window` picks,
+        unless that would leave nothing. Rows whose file is gone are pruned on the way.
+        """
+        wanted = _terms(f"{quote} {topic}")
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")  # select + mark used atomically across workers
+        try:
+            cols = "id, path, mood, subject, keywords, luminance, center_luminance, colors, uses"
+            rows = self._existing(conn, conn.execute(f"SELECT {cols} FROM backgrounds WHERE mood = ?", (mood,)).fetchall())
+            if not rows:
+                rows = self._existing(conn, conn.execute(f"SELECT {cols} FROM backgrounds").fetchall())
+            if not rows:
+                conn.execute("COMMIT")
+                return None
+            recent = {r[0] for r in conn.execute(
+                "SELECT id FROM backgrounds WHERE last_used > 0 ORDER BY last_used DESC LIMIT ?", (max(0, reuse_window),)
+            )}
+            fresh = [r for r in rows if r[0] not in recent] or rows
+
+            def score(row):
+                overlap = len(wanted & set(row[4].split()))
+                legibility = 1.0 - row[6] / 255.0  # white text reads best on a darker centre
+                return overlap + 0.5 * legibility - 0.02 * row[8] + random.random() * 0.05
+
+            best = max(fresh, key=score)
+            conn.execute("UPDATE backgrounds SET last_used = ?, uses = uses + 1 WHERE id = ?", (time.time(), best[0]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return Background(best[0], os.path.join(self.root, best[1]), best[2], best[3], best[5], best[6], json.loads(best[7]))
+
+    def _existing(self, conn: sqlite3.Connection, rows: list) -> list:
+        """The rows whose file still exists; the others are deleted from the index."""
+        gone = [r[0] for r in rows if not os.path.exists(os.path.join(self.root, r[1]))]
+        if gone:
+            print(f"🧹 Dropping {len(gone)} library entries whose file is missing.")
+            conn.executemany("DELETE FROM backgrounds WHERE id = ?", [(i,) for i in gone])
+        return [r for r in rows if r[0] not in gone]
+
+    def remove_missing(self) -> int:
+        """Drops index rows whose file has been deleted."""
+        conn = self._conn()
+        gone = [(i,) for i, p in conn.execute("SELECT id, path FROM backgrounds") if not os.path.exists(os.path.join(self.root, p))]
+        conn.executemany("DELETE FROM backgrounds WHERE id = ?", gone)
+        return len(gone)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        per_mood = dict(conn.execute("SELECT mood, COUNT(*) FROM backgrounds GROUP BY mood").fetchall())
+        total, uses = conn.execute("SELECT COUNT(*), COALESCE(SUM(uses), 0) FROM backgrounds").fetchone()
+        return {"root": os.path.abspath(self.root), "backgrounds": total, "per_mood": per_mood, "selections": uses}
+
+
+def build_library(per_mood: int = 5, moods=MOODS, workers: int = BUILD_WORKERS, library: BackgroundLibrary | None = None,
+                  generate=None) -> dict:
+    """
+    Generates backgrounds until every mood has `per_mood` of them, `workers` at
+    a time. `generate(prompt, output_path) -> path | None` defaults to the Gemini
+    image model. Re-running only fills the gaps.
+    """
+    library = library or default_library()
+    if generate is None:
+        from .google_image import generate_image
+        generate = lambda prompt, output_path: generate_image(prompt, output_path, mode="motivational")
+
+    jobs = []
+    for mood in moods:
+        have = library.subjects(mood)
+        subjects = SUBJECTS.get(mood, [])
+        missing = max(0, per_mood - len(have))
+        k = 0
+        while missing and subjects:
+            # Past the curated list, ask for variations of the same subjects
+            subject = subjects[k % len(subjects)] + ("" if k < len(subjects) else f", variation {k // len(subjects) + 1}")
+            k += 1
+            if subject in have:
+                continue
+            jobs.append((mood, subject))
+            missing -= 1
+
+    def run(job):
+        mood, subject = job
+        prompt = f"{subject}, {mood} atmosphere, wide composition with calm space in the centre for text"
+        tmp = os.path.join(library.root, "tmp", f"{uuid.uuid4().hex}.png")
+        ensure_dir(tmp)
+        try:
+            path = generate(prompt, tmp)
+            if not path:
+                return None
+            return library.add(path, mood, subject, move=True)
+        except Exception as e:
+            print(f"⚠️  Background '{subject}' ({mood}) failed: {e}")
+            return None
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="background") as pool:
+        added = sum(1 for r in pool.map(run, jobs) if r)
+    print(f"✅ Background library: {added}/{len(jobs)} generated in {time.perf_counter() - start:.1f}s")
+    return {"requested": len(jobs), "added": added, **library.stats()}
+
+
+_default_library = None
+_default_lock = threading.Lock()
+
+
+def default_library() -> BackgroundLibrary:
+    global _default_library
+    with _default_lock:
+        if _default_library is None or _default_library.root != LIBRARY_DIR:
+            _default_library = BackgroundLibrary(LIBRARY_DIR)
+        return _default_library
+
+
+def select_background(quote: str, mood: str, topic: str = "") -> Background | None:
+    return default_library().select(quote, mood, topic)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the pre-generated background library")
+    parser.add_argument("--dir", default=LIBRARY_DIR, help="Library directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="Generate backgrounds until each mood has --per-mood")
+    b.add_argument("--per-mood", type=int, default=5)
+    b.add_argument("--workers", type=int, default=BUILD_WORKERS)
+    b.add_argument("--moods", nargs="+", default=list(MOODS), choices=MOODS)
+    a = sub.add_parser("add", help="Add existing images for a mood")
+    a.add_argument("mood", choices=MOODS)
+    a.add_argument("paths", nargs="+")
+    a.add_argument("--subject", default="")
+    s = sub.add_parser("select", help="Show the pick for a quote (marks it used)")
+    s.add_argument("quote")
+    s.add_argument("--mood", default="powerful", choices=MOODS)
+    s.add_argument("--topic", default="")
+    sub.add_parser("stats", help="Counts per mood")
+    sub.add_parser("prune", help="Drop index entries whose file is gone")
+    args = parser.parse_args()
+
+    library = BackgroundLibrary(args.dir)
+    if args.command == "build":
+        print(json.dumps(build_library(args.per_mood, args.moods, args.workers, library), indent=2))
+    elif args.command == "add":
+        for path in args.paths:
+            print(f"➕ {path} -> #{library.add(path, args.mood, args.subject)}")
+    elif args.command == "select":
+        print(library.select(args.quote, args.mood, args.topic))
+    elif args.command == "stats":
+        print(json.dumps(library.stats(), indent=2))
+    elif args.command == "prune":
+        print(f"🧹 Removed {library.remove_missing()} missing entries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# modules/blob_store.py
+"""
+Content-addressed file store.
+
+Files are stored once under `<root>/<sha[:2]>/<sha><ext>` and indexed in
+SQLite (WAL mode, shared across threads and worker processes). Any number of
+lookup keys (e.g. source URLs) can point at the same blob, so identical bytes
+fetched under different names are kept once. Once the store grows past
+`quota_bytes`, least-recently-used blobs are deleted.
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from modules.utils import ensure_dir
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BlobStore:
+    def __init__(self, root: str, quota_bytes: int | None = None):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.index_path = os.path.join(root, "index.db")
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            ensure_dir(self.index_path)
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (sha TEXT PRIMARY KEY, ext TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS blobs_lru ON blobs(last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY, sha TEXT NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def blob_path(self, sha: str, ext: str) -> str:
+        return os.path.join(self.root, sha[:2], f"{sha}{ext}")
+
+    def lookup(self, key: str) -> str | None:
+        """Path of the blob indexed under `key`, or None."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT b.sha, b.ext FROM keys k JOIN blobs b ON b.sha = k.sha WHERE k.key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        path = self.blob_path(*row)
+        if not os.path.exists(path):
+            conn.execute("DELETE FROM blobs WHERE sha = ?", (row[0],))
+            conn.execute("DELETE FROM keys WHERE sha = ?", (row[0],))
+            self.misses += 1
+            return None
+        conn.execute("UPDATE blobs SET last_access = ? WHERE sha = ?", (time.time(), row[0]))
+        self.hits += 1
+        return path
+
+    def put_file(self, src_path: str, key: str | None = None, ext: str | None = None) -> str:
+        """
+        Moves `src_path` into the store (deduplicating by content), indexes it
+        under `key` if given, and returns the stored path.
+        """
+        sha = file_sha256(src_path)
+        ext = ext if ext is not None else os.path.splitext(src_path)[1].lower()
+        dest = self.blob_path(sha, ext)
+        size = os.path.getsize(src_path)
+        if os.path.exists(dest):
+            os.remove(src_path)
+        else:
+            ensure_dir(dest)
+            tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+            shutil.move(src_path, tmp)
+            os.replace(tmp, dest)  # atomic: readers never see a partial blob
+
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO blobs(sha, ext, size, created_at, last_access) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(sha) DO UPDATE SET last_access = excluded.last_access",
+            (sha, ext, size, now, now),
+        )
+        if key is not None:
+            conn.execute("INSERT OR REPLACE INTO keys(key, sha) VALUES (?, ?)", (key, sha))
+        self.evict(keep=sha)
+        return dest
+
+    def link(self, blob: str, dest: str, hardlink: bool = True) -> str:
+        """Hard-links (or copies, across filesystems or when hardlink=False) a stored blob to `dest`."""
+        ensure_dir(dest)
+        tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+        if hardlink:
+            try:
+                os.link(blob, tmp)
+            except OSError:
+                hardlink = False
+        if not hardlink:
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, dest)
+        return dest
+
+    def evict(self, keep: str | None = None) -> int:
+        """
+        Deletes least-recently-used blobs until the store fits its quota. Paths
+        handed out by lookup()/put_file() can go at any time; callers that keep a
+        file past the call should link() it somewhere of their own first.
+        """
+        if not self.quota_bytes:
+            return 0
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        removed = 0
+        if total <= self.quota_bytes:
+            return 0
+        for sha, ext, size in conn.execute(
+            "SELECT sha, ext, size FROM blobs ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.quota_bytes:
+                break
+            if sha == keep:
+                continue
+            try:
+                os.remove(self.blob_path(sha, ext))
+            except OSError:
+                pass
+            conn.execute("DELETE FROM blobs WHERE sha = ?", (sha,))
+            conn.execute("DELETE FROM keys WHERE sha = ?", (sha,))
+            total -= size
+            removed += 1
+        return removed
+
+    def purge(self) -> int:
+        conn = self._conn()
+        rows = conn.execute("SELECT sha, ext FROM blobs").fetchall()
+        for sha, ext in rows:
+            try:
+                os.remove(self.blob_path(sha, ext))
+            except OSError:
+                pass
+        conn.execute("DELETE FROM blobs")
+        conn.execute("DELETE FROM keys")
+        return len(rows)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        blobs, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        keys = conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "root": os.path.abspath(self.root),
+            "blobs": blobs,
+            "keys": keys,
+            "bytes": size,
+            "quota_bytes": self.quota_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
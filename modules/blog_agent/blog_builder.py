@@ -1,87 +1,148 @@
 # modules/blog_agent/blog_builder.py
 
 import os
+import threading
 import uuid
-from modules.utils import print_header, ensure_dir
+from modules.utils import print_header, ensure_dir, get_env
 from modules.text_generator import plan_blog_outline
 from modules.blog_agent.retriever_hybrid import find_and_download_image
-from modules.blog_agent.writer import write_sections
+from modules.blog_agent.writer import SECTION_CONCURRENCY, write_one_section
+from modules.blog_agent.retriever import retrieve_section_context
 from modules.blog_agent.visual_agent import decide_visuals_for_section
-from modules.blog_agent.formatter import assemble_docx
-
-def _insert_after_paragraphs(content: str, insert_md: str, after_paragraph: int) -> str:
-    """Inserts a markdown block after the Nth paragraph."""
-    paras = [p for p in content.split("\n\n") if p.strip() != ""]
-    idx = max(0, min(after_paragraph, len(paras)))
-    new = []
-    for i, p in enumerate(paras):
-        new.append(p)
-        if i == idx:
-            new.append(insert_md)
-    if idx >= len(paras):
-        new.append(insert_md)
-    return "\n\n".join(new)
-
-def build_blog_from_topic(topic: str):
+from modules.blog_agent.exporters import export_html, export_markdown, image_paths
+from modules.blog_agent.document_model import SectionDoc, figure, insert_figures, parse_section
+from modules.task_graph import TaskGraph
+
+# Max pipeline stages (LLM calls, searches, downloads) running at once
+PIPELINE_CONCURRENCY = int(get_env("BLOG_PIPELINE_CONCURRENCY", "6"))
+
+BLOG_FORMATS = ("docx", "markdown", "html")
+
+def _export_docx(plan, sections, cover_path, topic, run_id=None):
+    # Imported lazily so Markdown/HTML-only runs never load python-docx
+    from modules.blog_agent.formatter import assemble_docx
+    return assemble_docx(plan, sections, cover_path, topic, run_id=run_id)
+
+_EXPORTERS = {"docx": _export_docx, "markdown": export_markdown, "html": export_html}
+
+def _section_visual_path(s_idx: int, v_idx: int, keywords: str, run_id: str) -> str:
+    # Unique filename for section images
+    clean_keywords = keywords.replace(' ', '_')[:20] # Keep it short
+    stem = f"sec{s_idx}_vis{v_idx}_{clean_keywords}_{run_id}.png"
+    return os.path.join("generated/blogs/assets", stem)
+
+def _enrich_section(section: SectionDoc, visuals: list[dict], img_paths: tuple) -> SectionDoc:
+    # One pass over the section; after_paragraph indexes the section as written
+    figures = [(v["after_paragraph"], figure(img_path, v["keywords"])) for v, img_path in zip(visuals, img_paths)]
+    return insert_figures(section, figures)
+
+def build_blog_outputs(topic: str, formats=("docx",), max_workers: int | None = None) -> dict:
     """
-    Full RAG-enhanced blog pipeline with UNIQUE filenames.
+    Full RAG-enhanced blog pipeline with UNIQUE filenames, rendered to the requested
+    formats ("docx", "markdown", "html") from the same sections.
+
+    Runs as a dependency graph: the cover search starts immediately, each section's
+    visuals are chosen and fetched as soon as that section is written, and every
+    format is exported in parallel once all sections and the cover are ready.
+
+    Returns {format: path, "cover": cover_path, "images": [...], "assets_dir": ...,
+    "sections": [{heading, seconds, error}], "report": graph timings and critical path}.
     """
+    formats = list(dict.fromkeys(formats or ("docx",)))
+    unknown = [f for f in formats if f not in BLOG_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown blog format(s) {unknown}; choose from {list(BLOG_FORMATS)}")
+
     # Create unique run ID
     run_id = uuid.uuid4().hex[:8]
-    
-    print_header("Planning Blog Structure")
-    plan_dict = plan_blog_outline(topic)
-
-    print_header("Writing Sections")
-    raw_sections = write_sections(plan_dict, topic)
-
-    print_header("Finding Cover Image with RAG")
-    # Unique cover path
-    cover_filename = f"generated/blogs/assets/cover_{run_id}.png"
-    cover_path = find_and_download_image(
-        topic=topic,
-        keywords="technology abstract cover",
-        vtype="image",
-        output_path=cover_filename
-    )
-
-    print_header("Enhancing Sections with RAG Visuals")
-    sections_with_md = []
     ensure_dir("generated/blogs/assets/x")
+    graph = TaskGraph(max_workers=max_workers or PIPELINE_CONCURRENCY, name=f"blog_{run_id}")
+    # Section writes are the heaviest LLM calls; cap them separately from the other stages
+    section_slots = threading.BoundedSemaphore(SECTION_CONCURRENCY)
 
-    for s_idx, (heading, content) in enumerate(raw_sections):
-        visuals = decide_visuals_for_section(heading, content)
-        enriched = content
-
-        for v_idx, v in enumerate(visuals):
-            keywords = v["keywords"]
-            vtype = v["type"]
-            after = v["after_paragraph"]
-            
-            # Unique filename for section images
-            clean_keywords = keywords.replace(' ', '_')[:20] # Keep it short
-            stem = f"sec{s_idx}_vis{v_idx}_{clean_keywords}_{run_id}.png"
-            out_path = os.path.join("generated/blogs/assets", stem)
-            
-            img_path = find_and_download_image(
+    def cover():
+        print_header("Finding Cover Image with RAG")
+        # Unique cover path
+        cover_filename = f"generated/blogs/assets/cover_{run_id}.png"
+        return find_and_download_image(
+            topic=topic,
+            keywords="technology abstract cover",
+            vtype="image",
+            output_path=cover_filename
+        )
+
+    def outline():
+        print_header("Planning Blog Structure")
+        plan_dict = plan_blog_outline(topic)
+        audience = plan_dict.get("target_audience", "")
+        tone = plan_dict.get("tone", "informative")
+        sections = plan_dict.get("sections", [])
+
+        print_header(f"Writing {len(sections)} Sections with RAG Visuals")
+        for s_idx, sec in enumerate(sections):
+            graph.add(f"write:{s_idx}", lambda sec=sec: write(sec, audience, tone))
+            graph.add(f"visuals:{s_idx}", lambda section, s_idx=s_idx: visuals(s_idx, section), deps=[f"write:{s_idx}"])
+
+        section_nodes = [f"enrich:{s_idx}" for s_idx in range(len(sections))]
+        for fmt in formats:
+            graph.add(
+                f"export:{fmt}",
+                lambda cover_path, *enriched, fmt=fmt: export(fmt, plan_dict, cover_path, enriched),
+                deps=["cover", *section_nodes],
+            )
+        graph.add("images", lambda cover_path, *enriched: image_paths(enriched, cover_path), deps=["cover", *section_nodes])
+        return plan_dict
+
+    def write(sec: dict, audience: str, tone: str):
+        with section_slots:
+            return write_one_section(
+                sec, audience, tone,
+                context=retrieve_section_context(topic, sec.get("heading", ""), sec.get("summary", "")),
+            )
+
+    def visuals(s_idx: int, section):
+        chosen = decide_visuals_for_section(section.heading, section.content)
+        fetches = []
+        for v_idx, v in enumerate(chosen):
+            name = f"fetch:{s_idx}:{v_idx}"
+            out_path = _section_visual_path(s_idx, v_idx, v["keywords"], run_id)
+            graph.add(name, lambda v=v, out_path=out_path: find_and_download_image(
                 topic=topic,
-                keywords=keywords,
-                vtype=vtype,
+                keywords=v["keywords"],
+                vtype=v["type"],
                 output_path=out_path
-            )
+            ))
+            fetches.append(name)
+        graph.add(
+            f"enrich:{s_idx}",
+            lambda *img_paths: _enrich_section(parse_section(section.heading, section.content), chosen, img_paths),
+            deps=fetches,
+        )
+        return chosen
 
-            if img_path:
-                rel = os.path.relpath(img_path, "generated/blogs").replace("\\","/")
-                block = f"![{keywords}]({rel})" 
-            else:
-                block = f"> (Image not found for keywords: {keywords})"
+    def export(fmt, plan_dict, cover_path, enriched):
+        print_header(f"Exporting {fmt.upper()} Blog")
+        # Pass the run_id to the exporter
+        return _EXPORTERS[fmt](plan_dict, list(enriched), cover_path, topic, run_id=run_id)
 
-            enriched = _insert_after_paragraphs(enriched, block, after)
+    graph.add("cover", cover)
+    graph.add("outline", outline)
+    results = graph.run()
+    graph.print_report()
 
-        sections_with_md.append((heading, enriched))
+    written = [results[f"write:{s_idx}"] for s_idx in range(len(results["outline"].get("sections", [])))]
+    for r in written:
+        print(f"   {r.seconds:6.2f}s  {r.heading}{'  (fallback)' if r.error else ''}")
 
-    print_header("Assembling DOCX Blog")
-    # Pass the run_id to assembler
-    docx_path = assemble_docx(plan_dict, sections_with_md, cover_path, topic, run_id=run_id)
+    outputs = {fmt: results[f"export:{fmt}"] for fmt in formats}
+    outputs.update(cover=results["cover"], images=results["images"], assets_dir="generated/blogs/assets",
+                   sections=[{"heading": r.heading, "seconds": round(r.seconds, 3), "error": r.error} for r in written],
+                   report=graph.report())
+    return outputs
 
-    return docx_path, cover_path, "generated/blogs/assets"
\ No newline at end of file
+def build_blog_from_topic(topic: str, max_workers: int | None = None):
+    """
+    DOCX-only pipeline. Returns (docx_path, cover_path, assets_dir).
+    """
+    outputs = build_blog_outputs(topic, ("docx",), max_workers=max_workers)
+    return outputs["docx"], outputs["cover"], outputs["assets_dir"]
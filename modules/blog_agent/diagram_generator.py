@@ -1,8 +1,28 @@
 # modules/blog_agent/diagram_generator.py
 import os
-import subprocess
+import threading
 from modules.text_generator import _gemini_call, validate_mermaid_code
-from modules.utils import ensure_dir
+from modules.blog_agent import mermaid_renderer
+from modules.blog_agent.mermaid_validator import strip_fences, validate_flowchart
+from modules.utils import ensure_dir, get_env
+
+# "on_error": the LLM repair call only runs when local validation fails; "always": review every diagram
+MERMAID_LLM_REVIEW = get_env("MERMAID_LLM_REVIEW", "on_error")
+DEFAULT_DIAGRAM = "graph LR\nA[Input]-->B[Process]\nB-->C[Output]\nC-->D[Feedback]\nD-->A"
+
+# How often the LLM repair call was needed vs skipped after local validation
+_validation_lock = threading.Lock()
+_validation = {"valid": 0, "repair_calls": 0, "repaired": 0, "repair_failed": 0}
+
+def _count(name: str):
+    with _validation_lock:
+        _validation[name] += 1
+
+def validation_stats() -> dict:
+    with _validation_lock:
+        stats = dict(_validation)
+    stats["repairs_avoided"] = stats["valid"]
+    return stats
 
 def generate_mermaid_from_context(topic: str, description: str, context: str) -> str:
     prompt = (
@@ -13,26 +33,60 @@ def generate_mermaid_from_context(topic: str, description: str, context: str) ->
         f"Diagram goal: {description}\n\n"
         f"Context:\n{context}\n"
     )
-    code = (_gemini_call(prompt) or "").strip()
+    code = strip_fences(_gemini_call(prompt) or "")
     if not code.startswith("graph"):
-        code = "graph LR\nA[Input]-->B[Process]\nB-->C[Output]\nC-->D[Feedback]\nD-->A"
-    return validate_mermaid_code(code, topic)
+        code = DEFAULT_DIAGRAM
+    problems = validate_flowchart(code)
+    if not problems and MERMAID_LLM_REVIEW != "always":
+        _count("valid")
+        return code
 
-def render_mermaid(code: str, output_dir: str, file_stem: str) -> tuple[str|None, str]:
-    """
-    Save .mmd and try to render to PNG using Mermaid CLI (mmdc).
-    Returns (png_path_or_None, mmd_path)
-    """
+    # Only a diagram that fails local validation costs a second LLM call
+    _count("repair_calls")
+    if problems:
+        print(f"🔧 Repairing Mermaid diagram: {'; '.join(problems)}")
+    repaired = validate_mermaid_code(code, topic, problems)
+    if not validate_flowchart(repaired):
+        _count("repaired")
+        return repaired
+    _count("repair_failed")
+    # Prefer whichever version at least parses (the renderer can still draw it)
+    for candidate in (repaired, code):
+        if not any(p.startswith("syntax") for p in validate_flowchart(candidate)):
+            return candidate
+    return DEFAULT_DIAGRAM
+
+def _write_mmd(code: str, output_dir: str, file_stem: str) -> str:
     ensure_dir(os.path.join(output_dir, "x"))
     mmd_path = os.path.join(output_dir, f"{file_stem}.mmd")
-    png_path = os.path.join(output_dir, f"{file_stem}.png")
-
     with open(mmd_path, "w", encoding="utf-8") as f:
         f.write(code)
+    return mmd_path
+
+def _publish(rendered: str | None, output_dir: str, file_stem: str, fmt: str) -> str | None:
+    if not rendered:
+        return None
+    return mermaid_renderer.MERMAID_CACHE.link(rendered, os.path.join(output_dir, f"{file_stem}.{fmt}"))
 
-    try:
-        subprocess.run(["mmdc", "-i", mmd_path, "-o", png_path, "-b", "transparent"], check=True)
-        return png_path, mmd_path
-    except Exception as e:
-        print("⚠️ Mermaid CLI not available or render failed:", e)
-        return None, mmd_path
+def render_mermaid(code: str, output_dir: str, file_stem: str, fmt: str = "png") -> tuple[str|None, str]:
+    """
+    Save .mmd and render it to PNG (or SVG) via the warm renderer pool / render cache.
+    Returns (image_path_or_None, mmd_path)
+    """
+    mmd_path = _write_mmd(code, output_dir, file_stem)
+    rendered, _ = mermaid_renderer.render(code, fmt)
+    if not rendered:
+        print("⚠️ Mermaid render failed (no renderer could draw this diagram).")
+    return _publish(rendered, output_dir, file_stem, fmt), mmd_path
+
+def render_mermaid_batch(items: list[tuple[str, str]], output_dir: str, fmt: str = "png") -> list[tuple[str|None, str]]:
+    """
+    render_mermaid for several (code, file_stem) pairs, rendered concurrently.
+    Returns [(image_path_or_None, mmd_path)] in input order.
+    """
+    mmd_paths = [_write_mmd(code, output_dir, stem) for code, stem in items]
+    rendered = mermaid_renderer.render_batch([code for code, _ in items], fmt)
+    return [
+        (_publish(path, output_dir, stem, fmt), mmd_path)
+        for (path, _), (_, stem), mmd_path in zip(rendered, items, mmd_paths)
+    ]
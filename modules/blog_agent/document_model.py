@@ -0,0 +1,166 @@
+# modules/blog_agent/document_model.py
+"""
+Lightweight structured model of a blog section.
+
+A section's LLM markdown is parsed once into blocks (paragraphs, bullets,
+numbered items, sub-headings, figures) with inline bold/italic spans. Visuals
+are inserted in a single pass and the DOCX assembler renders the blocks
+directly, so nothing re-splits or re-parses markdown downstream.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+
+BLOG_DIR = "generated/blogs"
+
+_BOLD = re.compile(r'(\*\*.*?\*\*)')
+_ITALIC = re.compile(r'(\*.*?\*)')
+_IMAGE = re.compile(r'!\[(.*?)\]\((.*?)\)')
+_HEADING = re.compile(r'^#{1,6}\s+')
+_BULLET = re.compile(r'^[*-]\s+')
+_NUMBERED = re.compile(r'^\d+\.\s')
+
+
+@dataclass(slots=True)
+class Span:
+    text: str
+    bold: bool = False
+    italic: bool = False
+
+
+@dataclass(slots=True)
+class Block:
+    kind: str  # "paragraph" | "bullet" | "numbered" | "heading" | "figure"
+    spans: list[Span] = field(default_factory=list)
+    image: str | None = None  # figure: filesystem path of the image
+    caption: str = ""
+    para: int = 0  # index of the source paragraph (blank-line separated chunk)
+
+    @property
+    def text(self) -> str:
+        return "".join(s.text for s in self.spans)
+
+
+@dataclass(slots=True)
+class SectionDoc:
+    heading: str
+    blocks: list[Block] = field(default_factory=list)
+
+    @property
+    def paragraph_count(self) -> int:
+        return max((b.para for b in self.blocks), default=-1) + 1
+
+    def figures(self) -> list[Block]:
+        return [b for b in self.blocks if b.kind == "figure"]
+
+    def to_markdown(self, base_dir: str = BLOG_DIR) -> str:
+        chunks: list[list[str]] = []
+        last = None
+        for b in self.blocks:
+            if b.para != last:
+                chunks.append([])
+                last = b.para
+            chunks[-1].append(block_to_markdown(b, base_dir))
+        return "\n\n".join("\n".join(lines) for lines in chunks)
+
+
+def parse_inline(text: str) -> list[Span]:
+    """Splits **bold** and *italic* markdown into spans (italic may nest inside bold)."""
+    if "*" not in text:
+        return [Span(text)] if text else []
+    spans = []
+    for part in _BOLD.split(text):
+        bold = part.startswith('**') and part.endswith('**') and len(part) >= 4
+        if bold:
+            part = part[2:-2]
+        for sub in _ITALIC.split(part):
+            if sub.startswith('*') and sub.endswith('*') and len(sub) >= 2:
+                spans.append(Span(sub[1:-1], bold=bold, italic=True))
+            elif sub:
+                spans.append(Span(sub, bold=bold))
+    return spans
+
+
+def _spans_to_markdown(spans: list[Span]) -> str:
+    out = []
+    for s in spans:
+        t = f"*{s.text}*" if s.italic else s.text
+        out.append(f"**{t}**" if s.bold else t)
+    return "".join(out)
+
+
+def block_to_markdown(b: Block, base_dir: str = BLOG_DIR) -> str:
+    if b.kind == "figure":
+        rel = os.path.relpath(b.image, base_dir).replace("\\", "/")
+        return f"![{b.caption}]({rel})"
+    text = _spans_to_markdown(b.spans)
+    if b.kind == "bullet":
+        return f"* {text}"
+    if b.kind == "numbered":
+        return f"1. {text}"
+    if b.kind == "heading":
+        return f"## {text}"
+    return text
+
+
+def parse_line(line: str, para: int = 0, base_dir: str = BLOG_DIR) -> Block | None:
+    line = line.strip()
+    if not line:
+        return None
+    m = _IMAGE.search(line)
+    if m:
+        desc, rel = m.groups()
+        return Block("figure", image=os.path.join(base_dir, rel.replace("/", os.sep)), caption=desc, para=para)
+    if _HEADING.match(line):
+        return Block("heading", [Span(_HEADING.sub("", line).strip())], para=para)
+    if _BULLET.match(line):
+        return Block("bullet", parse_inline(_BULLET.sub("", line).strip()), para=para)
+    if _NUMBERED.match(line):
+        return Block("numbered", parse_inline(_NUMBERED.sub("", line).strip()), para=para)
+    return Block("paragraph", parse_inline(line), para=para)
+
+
+def parse_section(heading: str, markdown: str, base_dir: str = BLOG_DIR) -> SectionDoc:
+    """Builds the section model from LLM markdown (paragraphs are blank-line separated chunks)."""
+    blocks = []
+    chunks = [c for c in (markdown or "").split("\n\n") if c.strip()]
+    for para, chunk in enumerate(chunks):
+        for line in chunk.split("\n"):
+            block = parse_line(line, para, base_dir)
+            if block is not None:
+                blocks.append(block)
+    return SectionDoc(heading, blocks)
+
+
+def figure(image: str | None, caption: str) -> Block:
+    """A figure block, or the 'image not found' note when there is no image."""
+    if image:
+        return Block("figure", image=image, caption=caption)
+    return Block("paragraph", [Span(f"> (Image not found for keywords: {caption})")])
+
+
+def insert_figures(section: SectionDoc, figures: list[tuple[int, Block]]) -> SectionDoc:
+    """
+    Inserts every (after_paragraph, block) in one pass. Paragraph indices refer to
+    the section as written; several figures after the same paragraph keep their order.
+    Indices past the end append to the section.
+    """
+    count = section.paragraph_count
+    after: dict[int, list[Block]] = {}
+    for idx, block in figures:
+        after.setdefault(max(0, min(idx, count - 1)) if count else 0, []).append(block)
+
+    blocks, next_para = [], 0
+    for i, b in enumerate(section.blocks):
+        blocks.append(Block(b.kind, b.spans, b.image, b.caption, next_para))
+        last_of_para = i + 1 == len(section.blocks) or section.blocks[i + 1].para != b.para
+        if last_of_para:
+            next_para += 1
+            for fig in after.pop(b.para, []):
+                blocks.append(Block(fig.kind, fig.spans, fig.image, fig.caption, next_para))
+                next_para += 1
+    for figs in after.values():  # empty section
+        for fig in figs:
+            blocks.append(Block(fig.kind, fig.spans, fig.image, fig.caption, next_para))
+            next_para += 1
+    return SectionDoc(section.heading, blocks)
@@ -0,0 +1,183 @@
+# modules/blog_agent/docx_template.py
+"""
+Template-based DOCX writer.
+
+The branded base document (default font, footer logo, hyperlink) is built once
+per process and kept as bytes; each blog loads a copy of it instead of being
+styled from scratch. Section blocks are emitted as raw WordprocessingML and
+parsed into the body in bulk rather than through python-docx's per-run object
+API, with style IDs resolved once from the template. Documents are saved by
+streaming each XML part straight into the zip, then moved into place.
+"""
+import io
+import os
+import re
+import threading
+import uuid
+from xml.sax.saxutils import escape
+from zipfile import ZipFile, ZIP_DEFLATED
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.part import XmlPart
+from docx.opc.pkgwriter import _ContentTypesItem
+from docx.oxml import parse_xml
+from docx.oxml.shape import CT_Inline
+from docx.shared import Inches
+from lxml import etree
+
+from modules.blog_agent.document_model import Block, Span
+from modules.utils import ensure_dir
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_STYLE_NAMES = {"bullet": "List Bullet", "numbered": "List Number", 2: "Heading 2", 3: "Heading 3"}
+# Characters XML 1.0 cannot carry (python-docx would raise on them)
+_INVALID_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_RUN_SPECIALS = re.compile(r"([\t\n\r])")
+
+_lock = threading.Lock()
+_templates: dict = {}
+
+
+def _template(build) -> tuple[bytes, dict]:
+    """(docx bytes, style ids) of the template made by `build()`, built on first use."""
+    cached = _templates.get(build)
+    if cached is None:
+        with _lock:
+            cached = _templates.get(build)
+            if cached is None:
+                document = build()
+                style_ids = {k: document.part.get_style_id(name, WD_STYLE_TYPE.PARAGRAPH) for k, name in _STYLE_NAMES.items()}
+                buf = io.BytesIO()
+                document.save(buf)
+                cached = _templates[build] = (buf.getvalue(), style_ids)
+    return cached
+
+
+def new_document(build):
+    """A fresh Document loaded from the cached template produced by `build()`."""
+    data, _ = _template(build)
+    return Document(io.BytesIO(data))
+
+
+def clear_template_cache():
+    with _lock:
+        _templates.clear()
+
+
+def _run_xml(span: Span) -> str:
+    rpr = ""
+    if span.bold or span.italic:
+        rpr = "<w:rPr>" + ("<w:b/>" if span.bold else "") + ("<w:i/>" if span.italic else "") + "</w:rPr>"
+    out = []
+    # Same run content python-docx writes: tabs and line breaks are elements, text keeps edge spaces
+    for piece in _RUN_SPECIALS.split(_INVALID_XML.sub("", span.text)):
+        if not piece:
+            continue
+        if piece == "\t":
+            out.append("<w:tab/>")
+        elif piece in ("\n", "\r"):
+            out.append("<w:br/>")
+        elif piece != piece.strip():
+            out.append(f'<w:t xml:space="preserve">{escape(piece)}</w:t>')
+        else:
+            out.append(f"<w:t>{escape(piece)}</w:t>")
+    return f"<w:r>{rpr}{''.join(out)}</w:r>"
+
+
+def _paragraph_xml(spans: list[Span], style_id: str | None = None, jc: str | None = None) -> str:
+    ppr = ""
+    if style_id or jc:
+        ppr = "<w:pPr>" + (f'<w:pStyle w:val="{style_id}"/>' if style_id else "") + (f'<w:jc w:val="{jc}"/>' if jc else "") + "</w:pPr>"
+    return f"<w:p>{ppr}{''.join(_run_xml(s) for s in spans)}</w:p>"
+
+
+class BodyWriter:
+    """
+    Appends blocks to a template-loaded document's body in bulk. Text blocks are
+    buffered as XML and parsed in one go; figures flush the buffer and go through
+    python-docx, which owns the image relationships.
+    """
+
+    def __init__(self, document, build):
+        self.document = document
+        _, self.style_ids = _template(build)
+        self._pending: list[str] = []
+        # python-docx rescans the whole body for the next free shape id on every
+        # picture; nothing else adds ids while we write, so count from here instead
+        self._next_id = document.part.next_id
+
+    def heading(self, text: str, level: int):
+        self._pending.append(_paragraph_xml([Span(text)] if text else [], self.style_ids[level]))
+
+    def blocks(self, blocks: list[Block]):
+        for block in blocks:
+            if block.kind == "figure":
+                if not os.path.exists(block.image):
+                    continue
+                self.flush()
+                try:
+                    self._picture(block.image, Inches(5.5))
+                    if block.caption:
+                        self._pending.append(_paragraph_xml([Span(f"Figure: {block.caption}", italic=True)], jc="center"))
+                except Exception as e:
+                    print(f"⚠️  Could not add section image '{block.image}': {e}")
+            elif block.kind == "heading":
+                self.heading(block.text, 3)
+            else:
+                self._pending.append(_paragraph_xml(block.spans, self.style_ids.get(block.kind)))
+
+    def _picture(self, path: str, width):
+        # What Document.add_picture builds, minus the id scan
+        part = self.document.part
+        r_id, image = part.get_or_add_image(path)
+        cx, cy = image.scaled_dimensions(width, None)
+        inline = CT_Inline.new_pic_inline(self._next_id, r_id, image.filename, cx, cy)
+        self._next_id += 1
+        self.document.element.body.add_p().add_r().add_drawing(inline)
+
+    def flush(self):
+        if not self._pending:
+            return
+        fragment = parse_xml(f'<w:body xmlns:w="{_W_NS}">{"".join(self._pending)}</w:body>')
+        self._pending.clear()
+        body = self.document.element.body
+        anchor = body.sectPr
+        for p in list(fragment):
+            if anchor is not None:
+                anchor.addprevious(p)
+            else:
+                body.append(p)
+
+
+def save_streaming(document, path: str) -> str:
+    """
+    Saves like Document.save, but serialises each XML part directly into its zip
+    entry (no whole-part byte copies) and writes to a temp file that replaces
+    `path` only once complete.
+    """
+    package = document.part.package
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+
+    ensure_dir(path)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with ZipFile(tmp, "w", compression=ZIP_DEFLATED) as zf:
+            zf.writestr(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+            zf.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+            for part in parts:
+                if isinstance(part, XmlPart):
+                    with zf.open(part.partname.membername, "w") as f:
+                        etree.ElementTree(part.element).write(f, encoding="UTF-8", standalone=True)
+                else:
+                    zf.writestr(part.partname.membername, part.blob)
+                if len(part.rels):
+                    zf.writestr(part.partname.rels_uri.membername, part.rels.xml)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
@@ -0,0 +1,194 @@
+# modules/blog_agent/downloader.py
+"""
+Bounded, validating image downloader for blog visuals.
+
+Streams to a temp file while enforcing a byte cap, rejects anything that is
+not an image (Content-Type and magic bytes), verifies the file with PIL, and
+downscales/re-encodes it to a DOCX-friendly width so documents stay small.
+"""
+import os
+import threading
+import uuid
+
+from PIL import Image
+
+from modules import http_client
+from modules.utils import get_env, ensure_dir
+
+IMAGE_MAX_BYTES = int(float(get_env("IMAGE_MAX_MB", "15")) * 1024 * 1024)
+# Figures are embedded at 5.5–6 inches; 6in at 200 dpi
+DOCX_IMAGE_MAX_WIDTH = int(get_env("DOCX_IMAGE_MAX_WIDTH", "1200"))
+IMAGE_MIN_SIDE = int(get_env("IMAGE_MIN_SIDE", "64"))
+IMAGE_MAX_PIXELS = 60_000_000
+JPEG_QUALITY = int(get_env("DOCX_IMAGE_JPEG_QUALITY", "85"))
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+
+# Formats python-docx can embed as-is
+_DOCX_FORMATS = {"png": ".png", "jpeg": ".jpg"}
+
+
+class ImageRejected(Exception):
+    pass
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    """Image format from the first bytes of a file, or None if it isn't a known image."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head.startswith(b"BM"):
+        return "bmp"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    return None
+
+
+def check_content_type(content_type: str | None):
+    ctype = (content_type or "").split(";")[0].strip().lower()
+    if ctype and not ctype.startswith("image/") and ctype not in ("application/octet-stream", "binary/octet-stream"):
+        raise ImageRejected(f"content-type {ctype}")
+
+
+def _stream_to_file(response, path: str, max_bytes: int, cancel_event: threading.Event | None) -> str:
+    """Writes the body to `path`, enforcing the byte cap mid-stream. Returns the sniffed format."""
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise ImageRejected(f"{int(length)} bytes exceeds cap of {max_bytes}")
+
+    kind, total, head = None, 0, b""
+    with open(path, "wb") as f:
+        for chunk in response.iter_content(chunk_size=65536):
+            if cancel_event is not None and cancel_event.is_set():
+                raise InterruptedError("cancelled")
+            if kind is None:
+                head += chunk
+                if len(head) < 12 and chunk:
+                    f.write(chunk)
+                    total += len(chunk)
+                    continue
+                kind = sniff_image_type(head)
+                if kind is None:
+                    raise ImageRejected("not an image (magic bytes)")
+            total += len(chunk)
+            if total > max_bytes:
+                raise ImageRejected(f"body exceeds cap of {max_bytes} bytes")
+            f.write(chunk)
+    if kind is None:
+        kind = sniff_image_type(head)
+        if kind is None:
+            raise ImageRejected("not an image (magic bytes)")
+    return kind
+
+
+def normalize_for_docx(src: str, output_path: str, kind: str, target_width: int) -> str:
+    """
+    Verifies `src` with PIL and writes a DOCX-ready copy next to `output_path`:
+    downscaled to target_width, PNG if it has transparency, JPEG otherwise.
+    Images already small and in PNG/JPEG are kept byte-for-byte. Returns the final path.
+    """
+    with Image.open(src) as img:
+        img.verify()
+    with Image.open(src) as img:
+        w, h = img.size
+        if w * h > IMAGE_MAX_PIXELS:
+            raise ImageRejected(f"{w}x{h} is too large to decode")
+        if min(w, h) < IMAGE_MIN_SIDE:
+            raise ImageRejected(f"{w}x{h} is too small")
+
+        root = os.path.splitext(output_path)[0]
+        if kind in _DOCX_FORMATS and w <= target_width:
+            final = root + _DOCX_FORMATS[kind]
+            os.replace(src, final)
+            return final
+
+        img.seek(0)
+        img.load()
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        if w > target_width:
+            img = img.resize((target_width, max(1, round(h * target_width / w))), Image.Resampling.LANCZOS)
+        final = root + (".png" if has_alpha else ".jpg")
+        if has_alpha:
+            img.save(final, "PNG", optimize=True)
+        else:
+            img.save(final, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    os.remove(src)
+    return final
+
+
+def probe_image(url: str, max_bytes: int = IMAGE_MAX_BYTES) -> str | None:
+    """
+    Cheap pre-download check: HEAD for Content-Type/Length, falling back to a
+    ranged GET of the first bytes (magic sniff) when HEAD is refused or vague.
+    Returns a rejection reason, or None if the URL looks like an acceptable image.
+    """
+    headers = {"User-Agent": USER_AGENT}
+    try:
+        r = http_client.request("HEAD", url, read_timeout=10, headers=headers, allow_redirects=True)
+        ctype = (r.headers.get("Content-Type") or "").lower()
+        length = r.headers.get("Content-Length")
+        if r.status_code < 400 and ctype.startswith("image/"):
+            if length and length.isdigit() and int(length) > max_bytes:
+                return f"{length} bytes exceeds cap"
+            return None
+        if r.status_code < 400 or r.status_code in (403, 405, 501):
+            if r.status_code < 400:
+                check_content_type(ctype)
+            # A refused HEAD's headers describe its error page, so only the GET's are checked
+            with http_client.get(url, read_timeout=10, headers={**headers, "Range": "bytes=0-31"}, stream=True) as g:
+                if g.status_code >= 400:
+                    return f"HTTP {g.status_code}"
+                check_content_type(g.headers.get("Content-Type"))
+                total = (g.headers.get("Content-Range") or "").rpartition("/")[2]
+                if g.status_code != 206:
+                    total = g.headers.get("Content-Length") or ""
+                if total.isdigit() and int(total) > max_bytes:
+                    return f"{total} bytes exceeds cap"
+                head = next(g.iter_content(chunk_size=32), b"")
+            return None if sniff_image_type(head) else "not an image (magic bytes)"
+        return f"HTTP {r.status_code}"
+    except ImageRejected as e:
+        return str(e)
+    except Exception as e:
+        return f"probe failed: {e}"
+
+
+def download_image(
+    url: str,
+    output_path: str,
+    cancel_event: threading.Event | None = None,
+    max_bytes: int = IMAGE_MAX_BYTES,
+    target_width: int = DOCX_IMAGE_MAX_WIDTH,
+) -> str | None:
+    """
+    Downloads and validates one image. Returns the written path (its extension
+    reflects the final encoding, .png or .jpg), or None if it was rejected.
+    """
+    ensure_dir(output_path)
+    tmp_path = f"{output_path}.{uuid.uuid4().hex[:8]}.download"
+    try:
+        print(f"Attempting to download from: {url}")
+        with http_client.get(url, read_timeout=30, headers={"User-Agent": USER_AGENT}, stream=True) as response:
+            response.raise_for_status()
+            check_content_type(response.headers.get("Content-Type"))
+            kind = _stream_to_file(response, tmp_path, max_bytes, cancel_event)
+        final = normalize_for_docx(tmp_path, output_path, kind, target_width)
+        print(f"✅ Image downloaded successfully -> {final}")
+        return final
+    except InterruptedError:
+        return None
+    except ImageRejected as e:
+        print(f"⚠️  Rejected {url}: {e}.")
+        return None
+    except Exception as e:
+        print(f"⚠️  Failed to download {url}. Reason: {e}.")
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,204 @@
+# modules/blog_agent/exporters.py
+"""
+Web-ready blog exports rendered straight from the section model (no python-docx).
+
+- Markdown: images referenced as assets/<file name>, next to the .md file;
+  images stored elsewhere (e.g. the blob store) are linked into that folder.
+- HTML: a single self-contained file; every image is embedded as data URIs
+  with responsive `srcset` variants at HTML_SRCSET_WIDTHS.
+"""
+import base64
+import html
+import io
+import os
+import shutil
+from dataclasses import replace
+from datetime import date
+
+from PIL import Image
+
+from modules.blog_agent.document_model import SectionDoc, Span, parse_section
+from modules.utils import ensure_dir, get_env
+
+OUT_DIR = "generated/blogs"
+HTML_SRCSET_WIDTHS = [int(w) for w in get_env("HTML_SRCSET_WIDTHS", "480,960").split(",") if w.strip()]
+HTML_MAX_IMAGE_WIDTH = int(get_env("HTML_MAX_IMAGE_WIDTH", "1200"))
+HTML_JPEG_QUALITY = int(get_env("HTML_JPEG_QUALITY", "80"))
+
+_CSS = """
+body { font-family: Calibri, 'Segoe UI', Arial, sans-serif; font-size: 12pt; line-height: 1.6;
+       max-width: 800px; margin: 2rem auto; padding: 0 1rem; color: #222; }
+img { max-width: 100%; height: auto; display: block; margin: 0 auto; }
+figure { margin: 1.5rem 0; }
+figcaption { text-align: center; font-style: italic; font-size: 0.9em; color: #555; }
+.published { font-style: italic; color: #555; }
+footer { margin-top: 3rem; text-align: right; font-style: italic; font-size: 10pt; }
+"""
+
+
+def _output_path(run_id: str | None, ext: str) -> str:
+    return os.path.join(OUT_DIR, f"blog_{run_id}{ext}" if run_id else f"blog{ext}")
+
+
+def _sections(sections) -> list[SectionDoc]:
+    return [s if isinstance(s, SectionDoc) else parse_section(*s, base_dir=OUT_DIR) for s in sections]
+
+
+def image_paths(sections, cover_path: str | None = None) -> list[str]:
+    """Every existing image a blog references (cover first), e.g. to publish next to the Markdown."""
+    paths = [cover_path] if cover_path and os.path.exists(cover_path) else []
+    for section in _sections(sections):
+        paths += [b.image for b in section.figures() if os.path.exists(b.image) and b.image not in paths]
+    return paths
+
+
+# --- Markdown ---
+
+def _flat_asset(path: str) -> str:
+    """
+    OUT_DIR/assets/<file name> holding `path`'s image, the layout the Markdown links
+    and the S3 upload keys both use. Hard-linked (or copied) there when needed.
+    """
+    dest = os.path.join(OUT_DIR, "assets", os.path.basename(path))
+    if not os.path.exists(dest):
+        ensure_dir(dest)
+        try:
+            os.link(path, dest)
+        except OSError:
+            shutil.copy2(path, dest)
+    return dest
+
+
+def export_markdown(plan: dict, sections, cover_path: str | None, topic: str, run_id: str = None) -> str:
+    title = plan.get("title", f"Understanding {topic}")
+    out = [f"# {title}", f"*Published: {date.today().isoformat()}*"]
+    if cover_path and os.path.exists(cover_path):
+        out.append(f"![{title}](assets/{os.path.basename(_flat_asset(cover_path))})")
+    for section in _sections(sections):
+        if "introduction" not in section.heading.lower():
+            out.append(f"## {section.heading}")
+        blocks = [replace(b, image=_flat_asset(b.image)) if b.kind == "figure" and os.path.exists(b.image) else b
+                  for b in section.blocks]
+        body = SectionDoc(section.heading, blocks).to_markdown(base_dir=OUT_DIR)
+        if body:
+            out.append(body)
+
+    path = _output_path(run_id, ".md")
+    ensure_dir(path)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(out) + "\n")
+    print(f"✅ Successfully created Markdown file: {path}")
+    return path
+
+
+# --- HTML ---
+
+def _data_uri(img: Image.Image, width: int | None) -> str:
+    if width and img.width > width:
+        img = img.resize((width, max(1, round(img.height * width / img.width))), Image.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    if img.mode in ("RGBA", "LA", "P"):
+        img.convert("RGBA").save(buf, "PNG", optimize=True)
+        mime = "image/png"
+    else:
+        img.convert("RGB").save(buf, "JPEG", quality=HTML_JPEG_QUALITY, optimize=True, progressive=True)
+        mime = "image/jpeg"
+    return f"data:{mime};base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+
+
+def _img_tag(path: str, alt: str, cache: dict) -> str | None:
+    """<img> with a data-URI src and srcset; variants are encoded once per image per export."""
+    attrs = cache.get(path)
+    if attrs is None:
+        try:
+            with Image.open(path) as img:
+                img.load()
+                full = min(img.width, HTML_MAX_IMAGE_WIDTH)
+                widths = sorted({w for w in HTML_SRCSET_WIDTHS if w < full} | {full})
+                variants = [(w, _data_uri(img, w)) for w in widths]
+        except Exception as e:
+            print(f"⚠️  Could not embed image '{path}' in HTML: {e}")
+            return None
+        srcset = ", ".join(f"{uri} {w}w" for w, uri in variants)
+        attrs = cache[path] = (
+            f'src="{variants[-1][1]}" srcset="{srcset}" sizes="(max-width: 800px) 100vw, 800px" width="{full}"'
+        )
+    return f'<img {attrs} alt="{html.escape(alt)}" loading="lazy">'
+
+
+def _spans_html(spans: list[Span]) -> str:
+    out = []
+    for s in spans:
+        t = html.escape(s.text)
+        if s.italic:
+            t = f"<em>{t}</em>"
+        if s.bold:
+            t = f"<strong>{t}</strong>"
+        out.append(t)
+    return "".join(out)
+
+
+def _section_html(section: SectionDoc, images: dict) -> list[str]:
+    out, open_list = [], None
+    for b in section.blocks:
+        tag = {"bullet": "ul", "numbered": "ol"}.get(b.kind)
+        if tag != open_list:
+            if open_list:
+                out.append(f"</{open_list}>")
+            if tag:
+                out.append(f"<{tag}>")
+            open_list = tag
+        if tag:
+            out.append(f"<li>{_spans_html(b.spans)}</li>")
+        elif b.kind == "figure":
+            img = _img_tag(b.image, b.caption, images) if os.path.exists(b.image) else None
+            if img:
+                caption = f"<figcaption>Figure: {html.escape(b.caption)}</figcaption>" if b.caption else ""
+                out.append(f"<figure>{img}{caption}</figure>")
+        elif b.kind == "heading":
+            out.append(f"<h3>{html.escape(b.text)}</h3>")
+        else:
+            out.append(f"<p>{_spans_html(b.spans)}</p>")
+    if open_list:
+        out.append(f"</{open_list}>")
+    return out
+
+
+def export_html(plan: dict, sections, cover_path: str | None, topic: str, run_id: str = None) -> str:
+    title = html.escape(plan.get("title", f"Understanding {topic}"))
+    images: dict = {}
+    out = [
+        "<!DOCTYPE html>",
+        '<html lang="en">',
+        "<head>",
+        '<meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        f"<title>{title}</title>",
+        f"<style>{_CSS}</style>",
+        "</head>",
+        "<body>",
+        "<article>",
+        f"<h1>{title}</h1>",
+        f'<p class="published">Published: {date.today().isoformat()}</p>',
+    ]
+    if cover_path and os.path.exists(cover_path):
+        cover = _img_tag(cover_path, plan.get("title", topic), images)
+        if cover:
+            out.append(f"<figure>{cover}</figure>")
+    for section in _sections(sections):
+        if "introduction" not in section.heading.lower():
+            out.append(f"<h2>{html.escape(section.heading)}</h2>")
+        out += _section_html(section, images)
+    out += [
+        "</article>",
+        '<footer>@aiwithsid | <a href="http://grwothbrothers.in">http://grwothbrothers.in</a></footer>',
+        "</body>",
+        "</html>",
+    ]
+
+    path = _output_path(run_id, ".html")
+    ensure_dir(path)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(out) + "\n")
+    print(f"✅ Successfully created HTML file: {path}")
+    return path
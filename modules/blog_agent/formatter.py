@@ -1,19 +1,26 @@
 # modules/blog_agent/formatter.py
 import os
-import re
 from datetime import date
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
-from modules.utils import ensure_dir
+from modules.utils import ensure_dir, get_env
+from modules.blog_agent import docx_template
+from modules.blog_agent.document_model import Block, SectionDoc, Span, parse_inline, parse_section
 
 # --- Define Project Root to find assets/logo.jpg ---
 # This makes the path robust, finding D:\Marketing Agent\assets\logo.jpg
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 LOGO_PATH = os.path.join(PROJECT_ROOT, "assests", "logo.jpg")
 
+_BLOCK_STYLES = {"bullet": "List Bullet", "numbered": "List Number"}
+
+# "template": cached branded template + bulk XML body + streaming save; "python-docx": build from scratch
+DOCX_WRITER = get_env("DOCX_WRITER", "template")
+
 
 def add_hyperlink(paragraph, text, url):
     """
@@ -55,27 +62,22 @@ def add_hyperlink(paragraph, text, url):
     hyperlink.append(new_run)
     paragraph._p.append(hyperlink)
 
+def add_spans(paragraph, spans: list[Span]):
+    """
+    Adds pre-parsed inline spans (bold/italic) to a paragraph as runs.
+    """
+    for span in spans:
+        run = paragraph.add_run(span.text)
+        if span.bold:
+            run.bold = True
+        if span.italic:
+            run.italic = True
+
 def handle_formatting(paragraph, text):
     """
     Parses a line of text for **bold** and *italic* Markdown.
     """
-    parts = re.split(r'(\*\*.*?\*\*)', text)
-    for part in parts:
-        if part.startswith('**') and part.endswith('**'):
-            content = part[2:-2]
-            sub_parts = re.split(r'(\*.*?\*)', content)
-            for sub_part in sub_parts:
-                if sub_part.startswith('*') and sub_part.endswith('*'):
-                    paragraph.add_run(sub_part[1:-1]).italic = True
-                else:
-                    paragraph.add_run(sub_part).bold = True
-        else:
-            sub_parts = re.split(r'(\*.*?\*)', part)
-            for sub_part in sub_parts:
-                if sub_part.startswith('*') and sub_part.endswith('*'):
-                    paragraph.add_run(sub_part[1:-1]).italic = True
-                else:
-                    paragraph.add_run(sub_part)
+    add_spans(paragraph, parse_inline(text))
 
 def add_branding_footer(document):
     """
@@ -123,9 +125,45 @@ def set_default_font(document):
     except Exception as e:
         print(f"⚠️  Could not set default font. Using document defaults. Error: {e}")
 
-def assemble_docx(plan: dict, sections_with_md: list[tuple[str,str]], cover_path: str|None, topic: str, run_id: str = None) -> str:
+def add_blocks(document, blocks: list[Block]):
+    """
+    Renders a section's document-model blocks into the DOCX body.
+    """
+    # Resolving a style by name scans every style in the document; do it once per call
+    style_ids = {kind: document.part.get_style_id(name, WD_STYLE_TYPE.PARAGRAPH) for kind, name in _BLOCK_STYLES.items()}
+    for block in blocks:
+        if block.kind == "figure":
+            if os.path.exists(block.image):
+                try:
+                    document.add_picture(block.image, width=Inches(5.5))
+                    if block.caption:
+                        p = document.add_paragraph()
+                        p.add_run(f"Figure: {block.caption}").italic = True
+                        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                except Exception as e:
+                    print(f"⚠️  Could not add section image '{block.image}': {e}")
+        elif block.kind == "heading":
+            document.add_heading(block.text, level=3)
+        else:
+            p = document.add_paragraph()
+            if block.kind in style_ids:
+                p._p.style = style_ids[block.kind]
+            add_spans(p, block.spans)
+
+def build_branded_template():
+    """
+    The blank branded document every blog starts from: default font and footer.
+    """
+    document = Document()
+    set_default_font(document)
+    add_branding_footer(document)
+    return document
+
+def assemble_docx(plan: dict, sections: list[SectionDoc | tuple[str, str]], cover_path: str|None, topic: str, run_id: str = None, writer: str | None = None) -> str:
     """
     Assemble the final blog post as a .docx file with a UNIQUE filename.
+    Sections are document models; (heading, markdown) pairs are parsed on the way in.
+    `writer` overrides DOCX_WRITER ("template" or "python-docx").
     """
     title = plan.get("title", f"Understanding {topic}")
     out_dir = "generated/blogs"
@@ -140,8 +178,13 @@ def assemble_docx(plan: dict, sections_with_md: list[tuple[str,str]], cover_path
         
     docx_path = os.path.join(out_dir, docx_filename)
 
-    document = Document()
-    set_default_font(document)
+    use_template = (writer or DOCX_WRITER) == "template"
+    if use_template:
+        # Font and footer come with the cached template
+        document = docx_template.new_document(build_branded_template)
+    else:
+        document = Document()
+        set_default_font(document)
 
     # --- Header ---
     document.add_heading(title, level=1)
@@ -158,54 +201,33 @@ def assemble_docx(plan: dict, sections_with_md: list[tuple[str,str]], cover_path
             print(f"⚠️  Could not add cover image to DOCX: {e}")
 
     # --- Blog Sections ---
-    img_regex = re.compile(r'!\[(.*?)\]\((.*?)\)')
-
-    for heading, content_md in sections_with_md:
-        if "introduction" not in heading.lower():
-            document.add_heading(heading, level=2)
-
-        for line in content_md.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-
-            match = img_regex.search(line)
-            if match:
-                img_desc, img_rel_path = match.groups()
-                # Fix path resolution for relative paths
-                img_full_path = os.path.join(out_dir, img_rel_path.replace("/", os.sep))
-                
-                if os.path.exists(img_full_path):
-                    try:
-                        document.add_picture(img_full_path, width=Inches(5.5))
-                        if img_desc:
-                             p = document.add_paragraph()
-                             p.add_run(f"Figure: {img_desc}").italic = True
-                             p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    except Exception as e:
-                        print(f"⚠️  Could not add section image '{img_full_path}': {e}")
-                continue
-
-            if line.startswith('## '):
-                document.add_heading(line.lstrip('## ').strip(), level=3)
-            elif line.startswith('* '):
-                p = document.add_paragraph(style='List Bullet')
-                handle_formatting(p, line.lstrip('* ').strip())
-            elif re.match(r'^\d+\.\s', line):
-                 p = document.add_paragraph(style='List Number')
-                 handle_formatting(p, re.sub(r'^\d+\.\s', '', line).strip())
-            else:
-                p = document.add_paragraph()
-                handle_formatting(p, line)
-
-    # --- Add Branding Footer ---
-    add_branding_footer(document)
+    body = docx_template.BodyWriter(document, build_branded_template) if use_template else None
+    for section in sections:
+        if not isinstance(section, SectionDoc):
+            section = parse_section(*section, base_dir=out_dir)
+        if use_template:
+            if "introduction" not in section.heading.lower():
+                body.heading(section.heading, 2)
+            body.blocks(section.blocks)
+        else:
+            if "introduction" not in section.heading.lower():
+                document.add_heading(section.heading, level=2)
+            add_blocks(document, section.blocks)
+
+    if use_template:
+        body.flush()
+    else:
+        # --- Add Branding Footer ---
+        add_branding_footer(document)
 
     # --- Save the document ---
     try:
-        document.save(docx_path)
+        if use_template:
+            docx_template.save_streaming(document, docx_path)
+        else:
+            document.save(docx_path)
         print(f"✅ Successfully created DOCX file: {docx_path}")
     except Exception as e:
         print(f"❌ Failed to save DOCX file: {e}")
 
-    return docx_path
\ No newline at end of file
+    return docx_path
@@ -0,0 +1,375 @@
+# modules/blog_agent/knowledge_index.py
+"""
+Offline knowledge index: SQLite FTS5 with BM25 ranking.
+
+Documents (Wikipedia extract dumps, our own past blogs) are split into
+paragraph-aware chunks of ~CHUNK_TOKENS and indexed once. Queries return the
+best chunks, which are packed greedily into a token budget for prompts.
+Ingest is incremental: a document whose text hash is unchanged is skipped, a
+changed one has its chunks replaced.
+
+    python -m modules.blog_agent.knowledge_index ingest-jsonl dump.jsonl [--title-field title --text-field text]
+    python -m modules.blog_agent.knowledge_index ingest-blogs [generated/blogs]
+    python -m modules.blog_agent.knowledge_index query "transformer attention" [--budget 600]
+    python -m modules.blog_agent.knowledge_index stats | optimize
+"""
+import argparse
+import glob
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, NamedTuple
+
+from modules.utils import ensure_dir, get_env
+
+INDEX_PATH = get_env("KNOWLEDGE_INDEX_PATH", "generated/cache/knowledge.db")
+CHUNK_TOKENS = int(get_env("KNOWLEDGE_CHUNK_TOKENS", "160"))
+CHUNK_OVERLAP = int(get_env("KNOWLEDGE_CHUNK_OVERLAP", "24"))
+CONTEXT_TOKENS = int(get_env("KNOWLEDGE_CONTEXT_TOKENS", "600"))
+# bm25() column weights: a hit in the title counts more than one in the body
+TITLE_WEIGHT = float(get_env("KNOWLEDGE_TITLE_WEIGHT", "4.0"))
+# Query terms found in more than this share of chunks carry almost no BM25 weight
+# but make every chunk a candidate; they are dropped (unless nothing rarer is left)
+MAX_TERM_DF = float(get_env("KNOWLEDGE_MAX_TERM_DF", "0.05"))
+# ...but posting lists this short are cheap to score, so small indexes keep every term
+_MIN_DF_CUTOFF = 500
+
+# Chunk rowids are (document id << 20) | chunk number, so a document's chunks are one rowid range
+_ROWID_BITS = 20
+
+# query term -> porter stems, as produced by the index tokenizer
+_stems: dict[str, list[str]] = {}
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was what when where "
+    "which who why will with".split()
+)
+
+
+class Hit(NamedTuple):
+    title: str
+    text: str
+    source: str
+    score: float  # bm25: lower is better
+    tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose
+    return max(1, math.ceil(len(text) / 4))
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """
+    Splits on blank lines and packs whole paragraphs up to max_tokens; a paragraph
+    longer than that is cut on word boundaries with `overlap` tokens carried over.
+    """
+    chunks, current, size = [], [], 0
+    for para in (p.strip() for p in re.split(r"\n\s*\n", text or "")):
+        if not para:
+            continue
+        tokens = estimate_tokens(para)
+        if tokens > max_tokens:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            # Greedy on word lengths (same ~4 chars/token estimate), stepping back `overlap` tokens
+            words = para.split()
+            start = 0
+            while start < len(words):
+                end, chars = start, 0
+                while end < len(words) and (end == start or (chars + len(words[end])) / 4 <= max_tokens):
+                    chars += len(words[end]) + 1
+                    end += 1
+                chunks.append(" ".join(words[start:end]))
+                if end >= len(words):
+                    break
+                back, back_chars = end, 0
+                while back > start + 1 and (back_chars + len(words[back - 1]) + 1) / 4 <= overlap:
+                    back -= 1
+                    back_chars += len(words[back]) + 1
+                start = back
+            continue
+        if size + tokens > max_tokens and current:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(para)
+        size += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def query_terms(query: str) -> list[str]:
+    return [t for t in dict.fromkeys(t.lower() for t in _TERM.findall(query or "")) if t not in _STOPWORDS]
+
+
+def match_expression(terms: list[str]) -> str | None:
+    """FTS5 MATCH string: quoted terms OR-ed together (no syntax errors from user input)."""
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in terms) or None
+
+
+class KnowledgeIndex:
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._total = (0.0, 0)  # (checked_at, chunk count)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            ensure_dir(self.path)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, source TEXT UNIQUE NOT NULL, "
+                "title TEXT NOT NULL, sha TEXT NOT NULL, chunks INTEGER NOT NULL, ingested_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+                "title, body, tokens UNINDEXED, tokenize='porter unicode61')"
+            )
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_vocab USING fts5vocab(chunks, 'row')")
+            # Snapshot of per-term chunk counts: fts5vocab walks a term's whole posting list per lookup
+            conn.execute("CREATE TABLE IF NOT EXISTS term_df (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+            # Scratch table with the same tokenizer: its vocab yields the stemmed form of query terms
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.query_terms USING fts5(t, tokenize='porter unicode61')")
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.query_stems USING fts5vocab(temp, query_terms, 'instance')")
+            self._local.conn = conn
+        return conn
+
+    def ingest(self, docs: Iterable[dict], batch_size: int = 2000) -> dict:
+        """
+        Indexes {"source", "title", "text"} dicts. Unchanged documents (same text
+        hash) are skipped. Commits every `batch_size` documents.
+        """
+        conn = self._conn()
+        counts = {"added": 0, "updated": 0, "skipped": 0, "chunks": 0}
+        pending = 0
+        conn.execute("BEGIN")
+        try:
+            for doc in docs:
+                source, title, text = doc["source"], doc.get("title") or doc["source"], doc.get("text") or ""
+                sha = hashlib.sha256(f"{title}\0{text}".encode("utf-8")).hexdigest()
+                row = conn.execute("SELECT id, sha FROM documents WHERE source = ?", (source,)).fetchone()
+                if row and row[1] == sha:
+                    counts["skipped"] += 1
+                    continue
+                if row:
+                    first = row[0] << _ROWID_BITS
+                    conn.execute("DELETE FROM chunks WHERE rowid BETWEEN ? AND ?", (first, first + (1 << _ROWID_BITS) - 1))
+                    conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+                pieces = chunk_text(text)[: 1 << _ROWID_BITS]
+                doc_id = conn.execute(
+                    "INSERT INTO documents(source, title, sha, chunks, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                    (source, title, sha, len(pieces), time.time()),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO chunks(rowid, title, body, tokens) VALUES (?, ?, ?, ?)",
+                    [((doc_id << _ROWID_BITS) | i, title, piece, estimate_tokens(piece)) for i, piece in enumerate(pieces)],
+                )
+                counts["updated" if row else "added"] += 1
+                counts["chunks"] += len(pieces)
+                pending += 1
+                if pending >= batch_size:
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN")
+                    pending = 0
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if counts["added"] or counts["updated"]:
+            self.refresh_term_stats()
+        return counts
+
+    def refresh_term_stats(self):
+        conn = self._conn()
+        conn.execute("BEGIN")
+        conn.execute("DELETE FROM term_df")
+        conn.execute("INSERT INTO term_df(term, df) SELECT term, doc FROM chunks_vocab")
+        conn.execute("COMMIT")
+        self._total = (0.0, 0)
+
+    def _chunk_count(self) -> int:
+        checked_at, count = self._total
+        if time.monotonic() - checked_at > 30:
+            count = self._conn().execute("SELECT COALESCE(SUM(chunks), 0) FROM documents").fetchone()[0]
+            self._total = (time.monotonic(), count)
+        return count
+
+    def selective_terms(self, terms: list[str]) -> list[str]:
+        """
+        Drops terms no chunk contains, and terms present in more than MAX_TERM_DF
+        of chunks (keeping at least the rarest one).
+        """
+        if not terms:
+            return terms
+        conn = self._conn()
+        limit = max(MAX_TERM_DF * self._chunk_count(), _MIN_DF_CUTOFF)
+        unseen = [t for t in terms if t not in _stems]
+        if unseen:
+            conn.execute("DELETE FROM temp.query_terms")
+            conn.executemany("INSERT INTO temp.query_terms(rowid, t) VALUES (?, ?)", list(enumerate(unseen)))
+            stems = {t: [] for t in unseen}
+            for i, stem in conn.execute("SELECT doc, term FROM temp.query_stems").fetchall():
+                stems[unseen[i]].append(stem)
+            _stems.update(stems)
+        df = {}
+        for t in terms:
+            df[t] = max((conn.execute("SELECT df FROM term_df WHERE term = ?", (stem,)).fetchone() or (0,))[0]
+                        for stem in _stems[t] or [t])
+        present = [t for t in terms if df[t]]
+        kept = [t for t in present if df[t] <= limit]
+        return kept or ([min(present, key=df.get)] if present else [])
+
+    def search(self, query: str, k: int = 8) -> list[Hit]:
+        try:
+            expr = match_expression(self.selective_terms(query_terms(query)))
+            if not expr:
+                return []
+            # Rank on rowid alone; content is read only for the top k
+            rows = self._conn().execute(
+                "SELECT c.title, c.body, d.source, h.score, c.tokens FROM ("
+                "  SELECT rowid, bm25(chunks, ?, 1.0) AS score FROM chunks WHERE chunks MATCH ? ORDER BY score LIMIT ?"
+                ") h JOIN chunks c ON c.rowid = h.rowid JOIN documents d ON d.id = (h.rowid >> ?) ORDER BY h.score",
+                (TITLE_WEIGHT, expr, k, _ROWID_BITS),
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️  Knowledge index query failed: {e}")
+            return []
+        return [Hit(*row) for row in rows]
+
+    def optimize(self):
+        self._conn().execute("INSERT INTO chunks(chunks) VALUES ('optimize')")
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        docs, chunks = conn.execute("SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM documents").fetchone()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"path": os.path.abspath(self.path), "documents": docs, "chunks": chunks, "bytes": size}
+
+
+def pack_context(hits: list[Hit], budget_tokens: int = CONTEXT_TOKENS, max_chars: int | None = None) -> str:
+    """
+    Best-ranked chunks first, each as "[title]\\ntext", skipping any that would
+    overflow the token budget (a smaller later chunk may still fit).
+    """
+    out, used, seen = [], 0, set()
+    for hit in hits:
+        if hit.text in seen:
+            continue
+        cost = hit.tokens + estimate_tokens(hit.title) + 2
+        if used + cost > budget_tokens:
+            continue
+        seen.add(hit.text)
+        out.append(f"[{hit.title}]\n{hit.text}")
+        used += cost
+    ctx = "\n\n".join(out)
+    return ctx[:max_chars] if max_chars else ctx
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_index() -> KnowledgeIndex:
+    global _default_index
+    with _default_lock:
+        if _default_index is None or _default_index.path != INDEX_PATH:
+            _default_index = KnowledgeIndex(INDEX_PATH)
+        return _default_index
+
+
+def retrieve(query: str, budget_tokens: int = CONTEXT_TOKENS, k: int = 12) -> str:
+    """Packed context for `query` from the local index ("" if nothing matches)."""
+    return pack_context(default_index().search(query, k=k), budget_tokens)
+
+
+# --- Ingest sources ---
+
+def iter_jsonl(path: str, title_field: str = "title", text_field: str = "text", source_field: str | None = None):
+    """Wikipedia-extract style dumps: one JSON object per line (e.g. wikiextractor --json)."""
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️  Skipping malformed line {n} in {path}")
+                continue
+            title = row.get(title_field) or ""
+            source = row.get(source_field) if source_field else (row.get("url") or row.get("id") or title)
+            yield {"source": f"{os.path.basename(path)}:{source}", "title": title, "text": row.get(text_field) or ""}
+
+
+def iter_blogs(directory: str = "generated/blogs"):
+    """Our own past blogs: Markdown exports, and DOCX files when python-docx is available."""
+    for path in sorted(glob.glob(os.path.join(directory, "*.md"))):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        title = text.splitlines()[0].lstrip("# ").strip() if text else os.path.basename(path)
+        yield {"source": os.path.abspath(path), "title": title, "text": re.sub(r"!\[[^\]]*\]\([^)]*\)", "", text)}
+    docx_paths = sorted(glob.glob(os.path.join(directory, "*.docx")))
+    if docx_paths:
+        from docx import Document
+        for path in docx_paths:
+            if os.path.exists(os.path.splitext(path)[0] + ".md"):
+                continue  # same blog already ingested from its Markdown
+            paragraphs = [p.text for p in Document(path).paragraphs if p.text.strip()]
+            title = paragraphs[0] if paragraphs else os.path.basename(path)
+            yield {"source": os.path.abspath(path), "title": title, "text": "\n\n".join(paragraphs)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the offline knowledge index")
+    parser.add_argument("--index", default=INDEX_PATH, help="SQLite index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    js = sub.add_parser("ingest-jsonl", help="Ingest a JSONL dump (one document per line)")
+    js.add_argument("paths", nargs="+")
+    js.add_argument("--title-field", default="title")
+    js.add_argument("--text-field", default="text")
+    js.add_argument("--source-field", default=None)
+    blogs = sub.add_parser("ingest-blogs", help="Ingest past blogs (.md/.docx)")
+    blogs.add_argument("directory", nargs="?", default="generated/blogs")
+    q = sub.add_parser("query", help="Show the packed context for a query")
+    q.add_argument("text")
+    q.add_argument("--budget", type=int, default=CONTEXT_TOKENS)
+    q.add_argument("--k", type=int, default=12)
+    sub.add_parser("stats", help="Document/chunk counts and index size")
+    sub.add_parser("optimize", help="Merge FTS5 segments (after large ingests)")
+    args = parser.parse_args()
+
+    index = KnowledgeIndex(args.index)
+    start = time.perf_counter()
+    if args.command == "ingest-jsonl":
+        for path in args.paths:
+            counts = index.ingest(iter_jsonl(path, args.title_field, args.text_field, args.source_field))
+            print(f"📚 {path}: {counts}")
+    elif args.command == "ingest-blogs":
+        print(f"📚 {args.directory}: {index.ingest(iter_blogs(args.directory))}")
+    elif args.command == "query":
+        hits = index.search(args.text, k=args.k)
+        for h in hits:
+            print(f"{h.score:8.3f}  {h.title}  ({h.tokens} tokens)")
+        print("\n" + pack_context(hits, args.budget))
+    elif args.command == "stats":
+        print(json.dumps(index.stats(), indent=2))
+    elif args.command == "optimize":
+        index.optimize()
+        print("✅ Index optimized.")
+    print(f"({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+# modules/blog_agent/mermaid_fallback.py
+"""
+Pure-Python renderer for simple Mermaid flowcharts (`graph`/`flowchart` with
+LR/RL/TD/TB/BT), used when Node/mermaid-cli is not installed.
+
+Covers what our generated diagrams use: node shapes ([], (), ([]), (()), {}),
+chained edges (A --> B --> C, A & B --> C), edge labels (-->|x| and -- x -->),
+dotted/thick arrows and subgraphs (flattened). Styling statements are ignored.
+Layout is layered: longest-path ranks with cycles broken, then a few barycenter
+sweeps to reduce crossings. Output is SVG, or PNG drawn with PIL from the same
+geometry.
+"""
+import html
+import io
+import re
+from dataclasses import dataclass, field
+
+from PIL import Image, ImageDraw, ImageFont
+
+FONT_SIZE = 14
+WRAP_CHARS = 22
+PAD_X, PAD_Y = 14, 9
+RANK_GAP, NODE_GAP, MARGIN = 56, 28, 20
+DUMMY_SIZE = 8
+FILL, STROKE, TEXT = "#ECECFF", "#9370DB", "#333333"
+EDGE = "#555555"
+
+
+class MermaidSyntaxError(ValueError):
+    pass
+
+
+@dataclass(slots=True)
+class Node:
+    id: str
+    label: str
+    shape: str = "rect"
+    w: float = 0.0
+    h: float = 0.0
+    x: float = 0.0  # centre
+    y: float = 0.0
+
+
+@dataclass(slots=True)
+class Edge:
+    src: str
+    dst: str
+    label: str = ""
+    style: str = "solid"  # solid | dotted | thick
+    arrow: bool = True
+
+
+@dataclass(slots=True)
+class Flowchart:
+    direction: str = "TD"
+    nodes: dict[str, Node] = field(default_factory=dict)
+    edges: list[Edge] = field(default_factory=list)
+    width: float = 0.0
+    height: float = 0.0
+    routes: list[tuple[Edge, list[tuple[float, float]]]] = field(default_factory=list)
+    labelled: set[str] = field(default_factory=set)  # ids given a label somewhere
+    issues: list[str] = field(default_factory=list)  # drawable here, but rejected by mermaid itself
+
+
+# --- Parsing ---
+
+_HEADER = re.compile(r"^(?:graph|flowchart)(?:\s+(TB|TD|BT|LR|RL))?\s*;?\s*$", re.IGNORECASE)
+_ID = re.compile(r"\s*(\w+(?:-\w+)*)")  # "A-1" is an id, "A-->B" is not
+# (open, close, shape); longer openers first
+_SHAPES = (
+    ("(((", ")))", "circle"), ("((", "))", "circle"), ("([", "])", "round"), ("[[", "]]", "rect"),
+    ("[(", ")]", "round"), ("{{", "}}", "diamond"), ("[/", "/]", "rect"), ("[\\", "\\]", "rect"),
+    ("[/", "\\]", "rect"), ("[\\", "/]", "rect"), ("(", ")", "round"), ("[", "]", "rect"),
+    ("{", "}", "diamond"), (">", "]", "rect"),
+)
+_EDGE = re.compile(
+    r"\s*(?:"
+    r"--\s*(?P<l1>[^-|>][^|>]*?)\s*(?P<o1>-->|---)"   # -- text -->
+    r"|==\s*(?P<l2>[^=|>][^|>]*?)\s*(?P<o2>==>|===)"  # == text ==>
+    r"|-\.\s*(?P<l3>[^.|>][^|>]*?)\s*(?P<o3>\.->|\.-)"  # -. text .->
+    r"|(?P<o4><?(?:-{2,}>|-{3,}|={2,}>|={3,}|-\.+->|-\.+-|--[ox]))"
+    r")(?:\|(?P<l4>[^|]*)\|)?"
+)
+_AMP = re.compile(r"\s*&")
+# Mermaid reads these as shape delimiters inside an unquoted label
+_UNSAFE_LABEL = re.compile(r'[()\[\]{}|"]')
+_IGNORED = ("classdef ", "class ", "style ", "linkstyle ", "click ", "direction ")
+
+
+def _statements(code: str):
+    for raw in code.splitlines():
+        line = raw.split("%%", 1)[0].strip()
+        for stmt in line.split(";"):
+            if stmt.strip():
+                yield stmt.strip()
+
+
+def _unquote(text: str) -> str:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        text = text[1:-1]
+    return html.unescape(text.replace("<br>", "\n").replace("<br/>", "\n").replace("<br />", "\n"))
+
+
+def _node(stmt: str, pos: int, chart: Flowchart) -> tuple[str, int]:
+    m = _ID.match(stmt, pos)
+    if not m:
+        raise MermaidSyntaxError(f"expected a node at: {stmt[pos:]!r}")
+    node_id, pos = m.group(1), m.end()
+    label, shape = None, None
+    for opener, closer, kind in _SHAPES:
+        if stmt.startswith(opener, pos):
+            end = stmt.find(closer, pos + len(opener))
+            if end < 0:
+                continue
+            raw = stmt[pos + len(opener):end]
+            if not raw.strip().startswith('"') and _UNSAFE_LABEL.search(raw):
+                chart.issues.append(f"label of {node_id} needs quotes: {raw!r}")
+            label, shape = _unquote(raw), kind
+            pos = end + len(closer)
+            break
+    if stmt.startswith(":::", pos):
+        pos = _ID.match(stmt, pos + 3).end() if _ID.match(stmt, pos + 3) else pos + 3
+    if node_id == "end":
+        chart.issues.append('"end" is reserved and cannot be a node id')
+    if label is not None:
+        chart.labelled.add(node_id)
+    node = chart.nodes.get(node_id)
+    if node is None:
+        chart.nodes[node_id] = Node(node_id, label if label is not None else node_id, shape or "rect")
+    elif label is not None:
+        node.label, node.shape = label, shape
+    return node_id, pos
+
+
+def _group(stmt: str, pos: int, chart: Flowchart) -> tuple[list[str], int]:
+    ids = []
+    while True:
+        node_id, pos = _node(stmt, pos, chart)
+        ids.append(node_id)
+        m = _AMP.match(stmt, pos)
+        if not m:
+            return ids, pos
+        pos = m.end()
+
+
+def parse(code: str) -> Flowchart:
+    statements = list(_statements(code or ""))
+    if not statements:
+        raise MermaidSyntaxError("empty diagram")
+    header = _HEADER.match(statements[0])
+    if not header:
+        raise MermaidSyntaxError(f"unsupported diagram type: {statements[0]!r}")
+    chart = Flowchart(direction=(header.group(1) or "TD").upper().replace("TB", "TD"))
+    depth = 0
+    for stmt in statements[1:]:
+        lower = stmt.lower()
+        if lower.startswith(_IGNORED):
+            continue
+        if lower == "end":
+            depth -= 1
+            continue
+        if lower.startswith("subgraph"):
+            depth += 1
+            continue  # members are laid out with everything else
+        sources, pos = _group(stmt, 0, chart)
+        while pos < len(stmt):
+            m = _EDGE.match(stmt, pos)
+            if not m:
+                raise MermaidSyntaxError(f"cannot parse: {stmt!r}")
+            op = next(m.group(g) for g in ("o1", "o2", "o3", "o4") if m.group(g))
+            label = _unquote(next((m.group(g) for g in ("l1", "l2", "l3", "l4") if m.group(g)), ""))
+            style = "dotted" if "." in op else "thick" if "=" in op else "solid"
+            targets, pos = _group(stmt, m.end(), chart)
+            for s in sources:
+                for t in targets:
+                    chart.edges.append(Edge(s, t, label, style, op.endswith(">")))
+            sources = targets
+            if not stmt[pos:].strip():
+                break
+    if not chart.nodes:
+        raise MermaidSyntaxError("diagram has no nodes")
+    if depth:
+        chart.issues.append("subgraph/end blocks are unbalanced")
+    return chart
+
+
+# --- Layout ---
+
+_fonts: dict[int, ImageFont.ImageFont] = {}
+
+
+def _font(size: int = FONT_SIZE):
+    font = _fonts.get(size)
+    if font is None:
+        for name in ("DejaVuSans.ttf", "arial.ttf"):
+            try:
+                font = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        else:
+            font = ImageFont.load_default(size)
+        _fonts[size] = font
+    return font
+
+
+def _wrap(label: str) -> list[str]:
+    lines = []
+    for part in label.split("\n"):
+        line = ""
+        for word in part.split():
+            if line and len(line) + 1 + len(word) > WRAP_CHARS:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.append(line)
+    return lines or [""]
+
+
+def _text_size(lines: list[str]) -> tuple[float, float]:
+    font = _font()
+    width = max(font.getlength(line) for line in lines)
+    return width, len(lines) * FONT_SIZE * 1.3
+
+
+def _back_edges(chart: Flowchart) -> set[tuple[str, str]]:
+    """Edges closing a cycle, found by an iterative DFS (these are laid out reversed)."""
+    succ = {n: [] for n in chart.nodes}
+    for e in chart.edges:
+        succ[e.src].append(e.dst)
+    state, back = {}, set()
+    for root in chart.nodes:
+        if root in state:
+            continue
+        stack = [(root, iter(succ[root]))]
+        state[root] = 1
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if state.get(child) == 1:
+                    back.add((node, child))
+                elif child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(succ[child])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return back
+
+
+def _ranks(chart: Flowchart, forward: list[tuple[str, str]]) -> dict[str, int]:
+    """Longest-path layering: every forward edge goes down at least one rank."""
+    indeg = {n: 0 for n in chart.nodes}
+    succ = {n: [] for n in chart.nodes}
+    for s, d in forward:
+        succ[s].append(d)
+        indeg[d] += 1
+    rank = {n: 0 for n in chart.nodes}
+    queue = [n for n in chart.nodes if indeg[n] == 0]
+    while queue:
+        node = queue.pop()
+        for d in succ[node]:
+            rank[d] = max(rank[d], rank[node] + 1)
+            indeg[d] -= 1
+            if indeg[d] == 0:
+                queue.append(d)
+    return rank
+
+
+def layout(chart: Flowchart) -> Flowchart:
+    """Sizes and positions nodes, and routes every edge as a polyline (chart.routes)."""
+    for node in chart.nodes.values():
+        tw, th = _text_size(_wrap(node.label))
+        node.w, node.h = tw + 2 * PAD_X, th + 2 * PAD_Y
+        if node.shape == "diamond":
+            node.w, node.h = node.w * 1.4, node.h * 1.4
+        elif node.shape == "circle":
+            node.w = node.h = max(node.w, node.h)
+
+    back = _back_edges(chart)
+    oriented = []  # (edge, top, bottom) with rank(top) < rank(bottom)
+    for e in chart.edges:
+        if e.src != e.dst:
+            oriented.append((e, e.dst, e.src) if (e.src, e.dst) in back else (e, e.src, e.dst))
+    rank = _ranks(chart, [(a, b) for _, a, b in oriented])
+
+    # Long edges pass through small invisible nodes, one per rank they cross
+    nodes = dict(chart.nodes)
+    chains = []
+    for k, (e, top, bottom) in enumerate(oriented):
+        chain = [top]
+        for r in range(rank[top] + 1, rank[bottom]):
+            dummy = Node(f"\0{k}:{r}", "", "dummy", DUMMY_SIZE, DUMMY_SIZE)
+            nodes[dummy.id] = dummy
+            rank[dummy.id] = r
+            chain.append(dummy.id)
+        chain.append(bottom)
+        chains.append(chain)
+
+    layers: list[list[str]] = [[] for _ in range(max(rank.values()) + 1)]
+    for node_id in nodes:
+        layers[rank[node_id]].append(node_id)
+    up = {n: [] for n in nodes}
+    down = {n: [] for n in nodes}
+    for chain in chains:
+        for a, b in zip(chain, chain[1:]):
+            down[a].append(b)
+            up[b].append(a)
+    # Barycenter sweeps, alternating down and up
+    for sweep in range(6):
+        downward = sweep % 2 == 0
+        for i in (range(1, len(layers)) if downward else range(len(layers) - 2, -1, -1)):
+            ref = {n: k for k, n in enumerate(layers[i - 1] if downward else layers[i + 1])}
+            current = {n: k for k, n in enumerate(layers[i])}
+            def bary(n, ref=ref, current=current, links=up if downward else down):
+                ks = [ref[m] for m in links[n]]
+                return sum(ks) / len(ks) if ks else current[n]
+            layers[i].sort(key=bary)
+
+    horizontal = chart.direction in ("LR", "RL")
+    # "along" is the rank axis, "across" the position within a rank
+    depth = [max((nodes[n].w if horizontal else nodes[n].h) for n in layer) for layer in layers]
+    spans = [sum((nodes[n].h if horizontal else nodes[n].w) for n in layer) + NODE_GAP * (len(layer) - 1)
+             for layer in layers]
+    widest = max(spans)
+    along = MARGIN
+    for layer, d, span in zip(layers, depth, spans):
+        across = MARGIN + (widest - span) / 2
+        for n in layer:
+            node = nodes[n]
+            size = node.h if horizontal else node.w
+            a, c = along + d / 2, across + size / 2
+            node.x, node.y = (a, c) if horizontal else (c, a)
+            across += size + NODE_GAP
+        along += d + RANK_GAP
+    total_along, total_across = along - RANK_GAP + MARGIN, widest + 2 * MARGIN
+    chart.width, chart.height = (total_along, total_across) if horizontal else (total_across, total_along)
+    for node in nodes.values():
+        if chart.direction == "RL":
+            node.x = chart.width - node.x
+        elif chart.direction == "BT":
+            node.y = chart.height - node.y
+
+    pairs = {(e.src, e.dst) for e in chart.edges}
+    chart.routes = []
+    for (e, top, bottom), chain in zip(oriented, chains):
+        points = [(nodes[n].x, nodes[n].y) for n in chain]
+        if (e.src, e.dst) in back:
+            points.reverse()
+        first, last = chart.nodes[e.src], chart.nodes[e.dst]
+        points[0] = _boundary(first, *points[1])
+        points[-1] = _boundary(last, *points[-2])
+        if len(points) == 2 and (e.dst, e.src) in pairs:
+            points = _offset(points, 5.0)  # A --> B and B --> A side by side
+        chart.routes.append((e, points))
+    return chart
+
+
+def _offset(points, distance):
+    (x1, y1), (x2, y2) = points
+    length = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5 or 1.0
+    nx, ny = -(y2 - y1) / length * distance, (x2 - x1) / length * distance
+    return [(x1 + nx, y1 + ny), (x2 + nx, y2 + ny)]
+
+
+def _boundary(node: Node, tx: float, ty: float) -> tuple[float, float]:
+    """Where the segment from the node centre towards (tx, ty) leaves the node."""
+    dx, dy = tx - node.x, ty - node.y
+    if dx == 0 and dy == 0:
+        return node.x, node.y
+    hw, hh = node.w / 2, node.h / 2
+    if node.shape == "diamond":
+        t = 1 / (abs(dx) / hw + abs(dy) / hh)
+    elif node.shape == "circle":
+        t = hw / (dx * dx + dy * dy) ** 0.5
+    else:
+        t = min(hw / abs(dx) if dx else float("inf"), hh / abs(dy) if dy else float("inf"))
+    return node.x + dx * t, node.y + dy * t
+
+
+def _label_point(points):
+    """Midpoint of the middle segment of a route."""
+    k = (len(points) - 1) // 2
+    (x1, y1), (x2, y2) = points[k], points[k + 1]
+    return (x1 + x2) / 2, (y1 + y2) / 2
+
+
+def _arrowhead(x1, y1, x2, y2, size=8.0):
+    dx, dy = x2 - x1, y2 - y1
+    length = (dx * dx + dy * dy) ** 0.5 or 1.0
+    ux, uy = dx / length, dy / length
+    bx, by = x2 - ux * size, y2 - uy * size
+    return [(x2, y2), (bx - uy * size / 2, by + ux * size / 2), (bx + uy * size / 2, by - ux * size / 2)]
+
+
+# --- Output ---
+
+def _shape_svg(node: Node) -> str:
+    x, y, w, h = node.x - node.w / 2, node.y - node.h / 2, node.w, node.h
+    style = f'fill="{FILL}" stroke="{STROKE}" stroke-width="1.5"'
+    if node.shape == "diamond":
+        pts = f"{node.x:.1f},{y:.1f} {x + w:.1f},{node.y:.1f} {node.x:.1f},{y + h:.1f} {x:.1f},{node.y:.1f}"
+        return f'<polygon points="{pts}" {style}/>'
+    if node.shape == "circle":
+        return f'<circle cx="{node.x:.1f}" cy="{node.y:.1f}" r="{w / 2:.1f}" {style}/>'
+    radius = h / 2 if node.shape == "round" else 3
+    return f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" rx="{radius:.1f}" {style}/>'
+
+
+def _text_svg(lines: list[str], x: float, y: float, size: int = FONT_SIZE) -> str:
+    line_h = size * 1.3
+    top = y - line_h * (len(lines) - 1) / 2
+    spans = "".join(
+        f'<tspan x="{x:.1f}" y="{top + i * line_h:.1f}">{html.escape(line)}</tspan>' for i, line in enumerate(lines)
+    )
+    return f'<text text-anchor="middle" dominant-baseline="central" font-size="{size}">{spans}</text>'
+
+
+def to_svg(chart: Flowchart) -> str:
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{chart.width:.0f}" height="{chart.height:.0f}" '
+        f'viewBox="0 0 {chart.width:.1f} {chart.height:.1f}" font-family="DejaVu Sans, Arial, sans-serif" fill="{TEXT}">'
+    ]
+    for e, points in chart.routes:
+        dash = ' stroke-dasharray="4 3"' if e.style == "dotted" else ""
+        width = 3 if e.style == "thick" else 1.5
+        pts = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+        parts.append(f'<polyline points="{pts}" fill="none" stroke="{EDGE}" stroke-width="{width}"{dash}/>')
+        if e.arrow:
+            head = " ".join(f"{x:.1f},{y:.1f}" for x, y in _arrowhead(*points[-2], *points[-1]))
+            parts.append(f'<polygon points="{head}" fill="{EDGE}"/>')
+    for node in chart.nodes.values():
+        parts.append(_shape_svg(node))
+        parts.append(_text_svg(_wrap(node.label), node.x, node.y))
+    for e, points in chart.routes:
+        if e.label:
+            parts.append(_text_svg(_wrap(e.label), *_label_point(points), FONT_SIZE - 2))
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def to_png(chart: Flowchart, scale: float = 2.0, background: str | None = "white") -> bytes:
+    size = (int(chart.width * scale + 0.5), int(chart.height * scale + 0.5))
+    opaque = background if background and background != "transparent" else None
+    img = Image.new("RGBA", size, opaque or (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    s = scale
+
+    def text(lines, cx, cy, font_size):
+        font = _font(int(font_size * s))
+        line_h = font_size * 1.3 * s
+        top = cy * s - line_h * len(lines) / 2
+        for i, line in enumerate(lines):
+            draw.text((cx * s, top + line_h * (i + 0.5)), line, font=font, fill=TEXT, anchor="mm")
+
+    for e, points in chart.routes:
+        width = int((3 if e.style == "thick" else 1.5) * s)
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            if e.style == "dotted":
+                length = ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5 or 1.0
+                steps = max(1, int(length / 7))
+                for k in range(0, steps, 2):
+                    a, b = k / steps, min(1.0, (k + 1) / steps)
+                    draw.line([((x1 + (x2 - x1) * a) * s, (y1 + (y2 - y1) * a) * s),
+                               ((x1 + (x2 - x1) * b) * s, (y1 + (y2 - y1) * b) * s)], fill=EDGE, width=width)
+            else:
+                draw.line([(x1 * s, y1 * s), (x2 * s, y2 * s)], fill=EDGE, width=width, joint="curve")
+        if e.arrow:
+            draw.polygon([(px * s, py * s) for px, py in _arrowhead(*points[-2], *points[-1])], fill=EDGE)
+    for node in chart.nodes.values():
+        x, y, w, h = node.x - node.w / 2, node.y - node.h / 2, node.w, node.h
+        box = [x * s, y * s, (x + w) * s, (y + h) * s]
+        if node.shape == "diamond":
+            draw.polygon([(node.x * s, y * s), ((x + w) * s, node.y * s), (node.x * s, (y + h) * s), (x * s, node.y * s)],
+                         fill=FILL, outline=STROKE, width=int(1.5 * s))
+        elif node.shape == "circle":
+            draw.ellipse(box, fill=FILL, outline=STROKE, width=int(1.5 * s))
+        else:
+            draw.rounded_rectangle(box, radius=(h / 2 if node.shape == "round" else 3) * s,
+                                   fill=FILL, outline=STROKE, width=int(1.5 * s))
+        text(_wrap(node.label), node.x, node.y, FONT_SIZE)
+    for e, points in chart.routes:
+        if e.label:
+            lines = _wrap(e.label)
+            font = _font(int((FONT_SIZE - 2) * s))
+            tw = max(font.getlength(line) for line in lines)
+            th = len(lines) * (FONT_SIZE - 2) * 1.3 * s
+            lx, ly = _label_point(points)
+            draw.rectangle([lx * s - tw / 2 - 3, ly * s - th / 2, lx * s + tw / 2 + 3, ly * s + th / 2], fill=opaque or "white")
+            text(lines, lx, ly, FONT_SIZE - 2)
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def render(code: str, fmt: str = "png", background: str | None = "white") -> bytes:
+    """Mermaid flowchart -> PNG or SVG bytes. Raises MermaidSyntaxError for anything unsupported."""
+    chart = layout(parse(code))
+    if fmt == "svg":
+        return to_svg(chart).encode("utf-8")
+    return to_png(chart, background=background)
@@ -0,0 +1,345 @@
+# modules/blog_agent/mermaid_renderer.py
+"""
+Mermaid rendering without booting a browser per diagram.
+
+A small pool of long-lived Node workers (mermaid_worker.mjs, one headless
+browser each) renders diagrams sent over stdin as JSON lines. A render that
+runs past MERMAID_TIMEOUT gets its worker killed (the next job starts a fresh
+one), and workers are recycled after MERMAID_WORKER_MAX_JOBS renders.
+Output is stored by content hash in a BlobStore, so the same code, format and
+background are only ever rendered once.
+
+When Node or mermaid-cli is missing (or a render fails), simple flowcharts are
+drawn by the pure-Python mermaid_fallback instead.
+MERMAID_RENDERER: "auto" (default), "node" or "python".
+"""
+import atexit
+import base64
+import collections
+import itertools
+import json
+import os
+import queue
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.blob_store import BlobStore
+from modules.disk_cache import make_key
+from modules.single_flight import SingleFlight
+from modules.blog_agent import mermaid_fallback
+from modules.utils import ensure_dir, get_env
+
+MERMAID_RENDERER = get_env("MERMAID_RENDERER", "auto")
+MERMAID_WORKERS = int(get_env("MERMAID_WORKERS", "2"))
+# Per diagram; a worker that overruns is killed, not reused
+MERMAID_TIMEOUT = float(get_env("MERMAID_TIMEOUT", "20"))
+MERMAID_STARTUP_TIMEOUT = float(get_env("MERMAID_STARTUP_TIMEOUT", "45"))
+# Headless browsers grow over time; restart a worker after this many renders
+MERMAID_WORKER_MAX_JOBS = int(get_env("MERMAID_WORKER_MAX_JOBS", "200"))
+MERMAID_WORKER_CMD = get_env(
+    "MERMAID_WORKER_CMD",
+    "node " + shlex.quote(os.path.join(os.path.dirname(os.path.abspath(__file__)), "mermaid_worker.mjs")),
+)
+MERMAID_BACKGROUND = get_env("MERMAID_BACKGROUND", "transparent")
+
+MERMAID_CACHE_ENABLED = get_env("MERMAID_CACHE_ENABLED", "1") == "1"
+MERMAID_CACHE = BlobStore(
+    get_env("MERMAID_CACHE_DIR", "generated/cache/mermaid"),
+    quota_bytes=int(float(get_env("MERMAID_CACHE_QUOTA_MB", "200")) * 1024 * 1024),
+)
+
+_flight = SingleFlight("mermaid")
+_job_ids = itertools.count(1)
+
+
+class MermaidRenderError(RuntimeError):
+    """Mermaid itself rejected the diagram (the worker is still healthy)."""
+
+
+class WorkerError(RuntimeError):
+    """The worker died, could not start, or stopped answering."""
+
+
+class _Worker:
+    def __init__(self, cmd: list[str], startup_timeout: float):
+        self.jobs = 0
+        # Own process group, so a kill also takes down the browser it launched
+        self.proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", bufsize=1, start_new_session=(os.name == "posix"),
+        )
+        self._lines: queue.Queue = queue.Queue()
+        self._stderr = collections.deque(maxlen=40)  # tail, for error messages
+        threading.Thread(target=self._read, name="mermaid-worker-reader", daemon=True).start()
+        threading.Thread(target=self._read_stderr, name="mermaid-worker-stderr", daemon=True).start()
+        try:
+            while not self._next(time.monotonic() + startup_timeout).get("ready"):
+                pass
+        except BaseException:
+            self.kill()
+            raise
+
+    def _read(self):
+        for line in self.proc.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _read_stderr(self):
+        for line in self.proc.stderr:
+            if line.strip():
+                self._stderr.append(line.strip())
+
+    def _next(self, deadline: float) -> dict:
+        """Next JSON message from the worker; stray non-JSON output is skipped."""
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError("mermaid worker did not answer in time") from None
+            if line is None:
+                code = self.proc.wait()
+                time.sleep(0.05)  # let the stderr reader catch up
+                tail = list(self._stderr)
+                detail = next((f": {line}" for line in reversed(tail) if "Error" in line), f": {tail[-1]}" if tail else "")
+                raise WorkerError(f"mermaid worker exited (code {code}){detail}")
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+
+    def render(self, code: str, fmt: str, background: str, timeout: float) -> bytes:
+        job_id = next(_job_ids)
+        try:
+            self.proc.stdin.write(json.dumps({"id": job_id, "code": code, "format": fmt, "background": background}) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"mermaid worker is gone: {e}") from None
+        self.jobs += 1
+        deadline = time.monotonic() + timeout
+        while True:
+            msg = self._next(deadline)
+            if msg.get("id") != job_id:
+                continue
+            if not msg.get("ok"):
+                raise MermaidRenderError(msg.get("error") or "render failed")
+            return base64.b64decode(msg["data"])
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def kill(self):
+        if self.proc.poll() is None:
+            try:
+                if os.name == "posix":
+                    os.killpg(self.proc.pid, signal.SIGKILL)
+                else:
+                    self.proc.kill()
+            except OSError:
+                pass
+        self.proc.wait()
+
+
+class RendererPool:
+    def __init__(self, cmd: list[str], size: int = MERMAID_WORKERS, timeout: float = MERMAID_TIMEOUT,
+                 startup_timeout: float = MERMAID_STARTUP_TIMEOUT, max_jobs: int = MERMAID_WORKER_MAX_JOBS):
+        self.cmd, self.size, self.timeout = cmd, max(1, size), timeout
+        self.startup_timeout, self.max_jobs = startup_timeout, max_jobs
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._idle: list[_Worker] = []
+        self._started_once = False
+        self.unavailable: str | None = None
+        self.renders = self.errors = self.timeouts = self.crashes = self.spawns = 0
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive():
+                    return worker
+        try:
+            worker = _Worker(self.cmd, self.startup_timeout)
+        except (OSError, WorkerError, TimeoutError) as e:
+            with self._lock:
+                if not self._started_once:
+                    # Node or mermaid-cli missing: stop trying for this process
+                    self.unavailable = f"{type(e).__name__}: {e}"
+            raise WorkerError(f"could not start mermaid worker: {e}") from None
+        with self._lock:
+            self._started_once = True
+            self.spawns += 1
+        return worker
+
+    def _checkin(self, worker: _Worker):
+        if worker.jobs >= self.max_jobs or not worker.alive():
+            worker.kill()
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def render(self, code: str, fmt: str = "png", background: str = MERMAID_BACKGROUND) -> bytes:
+        if self.unavailable:
+            raise WorkerError(self.unavailable)
+        with self._slots:
+            worker = self._checkout()
+            try:
+                data = worker.render(code, fmt, background, self.timeout)
+            except MermaidRenderError:
+                self.errors += 1
+                self._checkin(worker)
+                raise
+            except TimeoutError:
+                self.timeouts += 1
+                worker.kill()
+                raise
+            except BaseException:
+                self.crashes += 1
+                worker.kill()
+                raise
+            self.renders += 1
+            self._checkin(worker)
+            return data
+
+    def start(self, count: int | None = None):
+        """Boots workers ahead of the first diagram."""
+        for _ in range(min(count or self.size, self.size)):
+            try:
+                self._checkin(self._checkout())
+            except WorkerError:
+                break
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            "size": self.size, "idle": idle, "unavailable": self.unavailable, "spawns": self.spawns,
+            "renders": self.renders, "errors": self.errors, "timeouts": self.timeouts, "crashes": self.crashes,
+        }
+
+
+_pool: RendererPool | None = None
+_pool_lock = threading.Lock()
+_counts = {"cache_hits": 0, "node": 0, "python": 0, "failed": 0}
+
+
+def pool() -> RendererPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RendererPool(
+                shlex.split(MERMAID_WORKER_CMD, posix=(os.name == "posix")),
+                MERMAID_WORKERS, MERMAID_TIMEOUT, MERMAID_STARTUP_TIMEOUT, MERMAID_WORKER_MAX_JOBS,
+            )
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+
+
+atexit.register(close_pool)
+
+
+def _renderers() -> list[str]:
+    if MERMAID_RENDERER == "python":
+        return ["python"]
+    if MERMAID_RENDERER == "node":
+        return ["node"]
+    return ["node", "python"] if not pool().unavailable else ["python"]
+
+
+def _cache_key(code: str, fmt: str, background: str, renderer: str) -> str:
+    return make_key("mermaid", renderer, fmt, background, code)
+
+
+def _draw(renderer: str, code: str, fmt: str, background: str) -> bytes:
+    if renderer == "node":
+        return pool().render(code, fmt, background)
+    return mermaid_fallback.render(code, fmt, background)
+
+
+def _store(data: bytes, key: str, fmt: str) -> str:
+    ensure_dir(os.path.join(MERMAID_CACHE.root, "x"))
+    fd, tmp = tempfile.mkstemp(suffix=f".{fmt}", dir=MERMAID_CACHE.root)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return MERMAID_CACHE.put_file(tmp, key=key if MERMAID_CACHE_ENABLED else None)
+
+
+def render(code: str, fmt: str = "png", background: str = MERMAID_BACKGROUND) -> tuple[str | None, str]:
+    """
+    Renders Mermaid code to a PNG/SVG file in the render cache.
+    Returns (cached_path, renderer) or (None, "") when nothing could draw it.
+    Callers copy or link the file; the cached path must not be modified.
+    """
+    code = (code or "").strip()
+    renderers = _renderers()
+    if MERMAID_CACHE_ENABLED:
+        for renderer in renderers:
+            path = MERMAID_CACHE.lookup(_cache_key(code, fmt, background, renderer))
+            if path:
+                _counts["cache_hits"] += 1
+                return path, renderer
+
+    for renderer in renderers:
+        key = _cache_key(code, fmt, background, renderer)
+        try:
+            # Identical diagrams requested concurrently are drawn once
+            path, _ = _flight.do(key, lambda: _store(_draw(renderer, code, fmt, background), key, fmt))
+        except mermaid_fallback.MermaidSyntaxError as e:
+            print(f"⚠️ Mermaid fallback cannot draw this diagram: {e}")
+            continue
+        except (MermaidRenderError, WorkerError, TimeoutError) as e:
+            print(f"⚠️ Mermaid worker render failed: {e}")
+            continue
+        _counts[renderer] += 1
+        return path, renderer
+    _counts["failed"] += 1
+    return None, ""
+
+
+def render_batch(codes: list[str], fmt: str = "png", background: str = MERMAID_BACKGROUND) -> list[tuple[str | None, str]]:
+    """Renders several diagrams at once (up to MERMAID_WORKERS in flight); results in input order."""
+    unique = list(dict.fromkeys((c or "").strip() for c in codes))
+    if not unique:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(MERMAID_WORKERS, len(unique))), thread_name_prefix="mermaid") as ex:
+        done = dict(zip(unique, ex.map(lambda c: render(c, fmt, background), unique)))
+    return [done[(c or "").strip()] for c in codes]
+
+
+def stats() -> dict:
+    return {
+        "renderer": MERMAID_RENDERER,
+        "renders": dict(_counts),
+        "pool": _pool.stats() if _pool is not None else None,
+        "cache": MERMAID_CACHE.stats(),
+    }
+
+
+if __name__ == "__main__":
+    # python -m modules.blog_agent.mermaid_renderer diagram.mmd [out.png|out.svg]
+    src = sys.argv[1]
+    out = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".png"
+    with open(src, encoding="utf-8") as f:
+        path, used = render(f.read(), os.path.splitext(out)[1].lstrip(".") or "png")
+    if not path:
+        sys.exit("❌ Could not render diagram")
+    MERMAID_CACHE.link(path, out)
+    print(f"✅ {out} ({used})")
@@ -0,0 +1,54 @@
+# modules/blog_agent/mermaid_validator.py
+"""
+Local checks for generated Mermaid flowcharts, so the LLM repair round trip
+only happens for diagrams that actually need it.
+
+Uses the flowchart parser from mermaid_fallback (the same subset we render) and
+reports problems as short strings that can be handed to the repair prompt:
+syntax errors, labels Mermaid would reject, dangling references (ids only ever
+used bare while the other nodes have labels), unconnected nodes and node
+counts outside MERMAID_MIN_NODES..MERMAID_MAX_NODES.
+"""
+import re
+
+from modules.blog_agent.mermaid_fallback import MermaidSyntaxError, parse
+from modules.utils import get_env
+
+MERMAID_MIN_NODES = int(get_env("MERMAID_MIN_NODES", "3"))
+MERMAID_MAX_NODES = int(get_env("MERMAID_MAX_NODES", "15"))
+
+_FENCE = re.compile(r"^\s*```(?:mermaid)?\s*\n(.*?)\n?\s*```\s*$", re.DOTALL | re.IGNORECASE)
+
+
+def strip_fences(text: str) -> str:
+    """Mermaid code without a surrounding ```mermaid fence (LLMs often add one)."""
+    m = _FENCE.match(text or "")
+    return (m.group(1) if m else text or "").strip()
+
+
+def validate_flowchart(code: str, min_nodes: int | None = None, max_nodes: int | None = None) -> list[str]:
+    """Problems found in `code`; an empty list means it is fine to render as is."""
+    min_nodes = MERMAID_MIN_NODES if min_nodes is None else min_nodes
+    max_nodes = MERMAID_MAX_NODES if max_nodes is None else max_nodes
+    try:
+        chart = parse(code)
+    except MermaidSyntaxError as e:
+        return [f"syntax: {e}"]
+
+    problems = list(chart.issues)
+    if not chart.edges:
+        problems.append("diagram has no edges")
+    if chart.labelled:
+        dangling = [n for n in chart.nodes if n not in chart.labelled]
+        if dangling:
+            problems.append(f"references to undefined nodes: {', '.join(dangling)}")
+    connected = {e.src for e in chart.edges} | {e.dst for e in chart.edges}
+    isolated = [n for n in chart.nodes if n not in connected]
+    if isolated and chart.edges:
+        problems.append(f"unconnected nodes: {', '.join(isolated)}")
+    count = len(chart.nodes)
+    if count < min_nodes:
+        problems.append(f"too few nodes ({count} < {min_nodes})")
+    elif count > max_nodes:
+        problems.append(f"too many nodes ({count} > {max_nodes})")
+    return problems
@@ -0,0 +1,42 @@
+// modules/blog_agent/mermaid_worker.mjs
+//
+// Long-lived Mermaid renderer used by mermaid_renderer.py. Boots one headless
+// browser and then renders diagrams from JSON lines on stdin:
+//   {"id": 1, "code": "graph LR ...", "format": "png", "background": "white"}
+// answering each with one line on stdout:
+//   {"id": 1, "ok": true, "data": "<base64>"}  or  {"id": 1, "ok": false, "error": "..."}
+// A {"ready": true} line is written once the browser is up.
+//
+// Needs @mermaid-js/mermaid-cli resolvable from this file, e.g.
+//   npm install @mermaid-js/mermaid-cli     (in the repository root)
+import readline from "node:readline";
+import { renderMermaid } from "@mermaid-js/mermaid-cli";
+import puppeteer from "puppeteer";
+
+const send = (msg) => process.stdout.write(JSON.stringify(msg) + "\n");
+
+const browser = await puppeteer.launch({
+  headless: true,
+  args: process.env.MERMAID_NO_SANDBOX === "1" ? ["--no-sandbox", "--disable-setuid-sandbox"] : [],
+});
+send({ ready: true });
+
+const lines = readline.createInterface({ input: process.stdin });
+for await (const line of lines) {
+  let job;
+  try {
+    job = JSON.parse(line);
+  } catch {
+    continue;
+  }
+  try {
+    const { data } = await renderMermaid(browser, job.code, job.format || "png", {
+      backgroundColor: job.background || "white",
+      mermaidConfig: job.config || {},
+    });
+    send({ id: job.id, ok: true, data: Buffer.from(data).toString("base64") });
+  } catch (e) {
+    send({ id: job.id, ok: false, error: String((e && e.message) || e) });
+  }
+}
+await browser.close();
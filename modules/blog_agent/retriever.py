@@ -1,62 +1,179 @@
 # modules/blog_agent/retriever.py
+"""
+Wikipedia grounding context for visuals.
 
-import requests
+One MediaWiki round trip per search: generator=search returns the matching
+pages together with their intro extracts and revision ids. Extracts are cached
+on disk by (title, revision) and searches by normalised query, so a repeated
+lookup needs no network at all. The description and topic searches run
+concurrently; the topic results are only used when the description finds nothing.
 
-WIKI_SEARCH = "https://en.wikipedia.org/w/api.php"
-WIKI_EXTRACT = "https://en.wikipedia.org/w/api.php"
+RETRIEVER_BACKEND selects the source: "wikipedia" (default), "local" (the
+offline knowledge index only) or "hybrid" (local first, Wikipedia on a miss).
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import http_client
+from modules.disk_cache import DiskCache, make_key
+from modules.blog_agent import knowledge_index
+from modules.blog_agent.search_cache import normalize_query
+from modules.utils import get_env
+
+RETRIEVER_BACKEND = get_env("RETRIEVER_BACKEND", "wikipedia")
+WIKI_API = get_env("WIKI_API", "https://en.wikipedia.org/w/api.php")
+WIKI_TIMEOUT = float(get_env("WIKI_TIMEOUT", "10"))
+WIKI_CACHE_ENABLED = get_env("WIKI_CACHE_ENABLED", "1") == "1"
+_CACHE_PATH = get_env("WIKI_CACHE_PATH", "generated/cache/wiki_cache.db")
+
+USER_AGENT = "marketing-agent/1.0 (blog visual grounding)"
+# clamp to ~2k chars per page for prompts
+EXTRACT_CHARS = 2000
+
+# An extract never changes for a given revision, so these can live long
+EXTRACTS = DiskCache(_CACHE_PATH, table="wiki_extracts", ttl=float(get_env("WIKI_EXTRACT_TTL", str(30 * 24 * 3600))), max_entries=50000)
+# Search rankings drift, so query -> [(title, revid)] expires sooner
+QUERIES = DiskCache(_CACHE_PATH, table="wiki_queries", ttl=float(get_env("WIKI_QUERY_TTL", str(24 * 3600))), max_entries=20000)
+
+
+def _api(params: dict) -> dict:
+    r = http_client.get(
+        WIKI_API,
+        params={**params, "format": "json", "formatversion": "2"},
+        headers={"User-Agent": USER_AGENT},
+        read_timeout=WIKI_TIMEOUT,
+    )
+    r.raise_for_status()
+    return r.json()
+
+
+def _pages(data: dict) -> list[dict]:
+    pages = data.get("query", {}).get("pages", [])
+    return list(pages.values()) if isinstance(pages, dict) else pages
+
+
+def _store_extract(title: str, revid, extract: str):
+    if WIKI_CACHE_ENABLED and extract:
+        EXTRACTS.set(make_key(title, revid), extract[:EXTRACT_CHARS], meta={"title": title, "revid": revid})
+
+
+def _cached_extract(title: str, revid) -> str | None:
+    return EXTRACTS.get(make_key(title, revid)) if WIKI_CACHE_ENABLED else None
+
+
+def _wiki_search(query: str, limit: int = 3) -> list[tuple[str, str]]:
+    """
+    [(title, extract)] for the top `limit` search hits, from cache or one request
+    (generator=search with prop=extracts|info).
+    """
+    query_key = make_key(normalize_query(query), limit)
+    if WIKI_CACHE_ENABLED:
+        raw = QUERIES.get(query_key)
+        if raw is not None:
+            hits = json.loads(raw)
+            cached = [(title, _cached_extract(title, revid)) for title, revid in hits]
+            missing = [title for title, extract in cached if extract is None]
+            if not missing:
+                return [(title, extract) for title, extract in cached if extract]
+            # Extracts evicted or pages edited: refetch just those, batched
+            fresh = _wiki_extracts(missing)
+            return [(t, e if e is not None else fresh.get(t, "")) for t, e in cached if (e or fresh.get(t))]
 
-def _wiki_search(query: str, limit: int = 3) -> list[str]:
     try:
-        params = {
-            "action": "opensearch",
-            "search": query,
-            "limit": str(limit),
-            "namespace": "0",
-            "format": "json"
-        }
-        r = requests.get(WIKI_SEARCH, params=params, timeout=20)
-        if r.status_code == 200:
-            data = r.json()
-            titles = data[1] if len(data) > 1 else []
-            return titles[:limit]
-    except Exception:
-        pass
-    return []
-
-def _wiki_extract(title: str) -> str:
+        data = _api({
+            "action": "query",
+            "generator": "search",
+            "gsrsearch": query,
+            "gsrlimit": str(limit),
+            "gsrnamespace": "0",
+            "prop": "extracts|info",
+            "exintro": "1",
+            "explaintext": "1",
+            "exlimit": "max",
+            "exchars": str(EXTRACT_CHARS),
+        })
+    except Exception as e:
+        print(f"⚠️  Wikipedia search failed for '{query}': {e}")
+        return []
+
+    pages = sorted(_pages(data), key=lambda p: p.get("index", 0))[:limit]
+    hits = []
+    for page in pages:
+        _store_extract(page["title"], page.get("lastrevid"), page.get("extract", ""))
+        hits.append((page["title"], page.get("lastrevid")))
+    if WIKI_CACHE_ENABLED:
+        QUERIES.set(query_key, json.dumps(hits), meta={"query": normalize_query(query)})
+    return [(page["title"], page.get("extract", "")[:EXTRACT_CHARS]) for page in pages if page.get("extract")]
+
+
+def _wiki_extracts(titles: list[str]) -> dict[str, str]:
+    """Intro extracts for several titles in one request (title -> text)."""
+    if not titles:
+        return {}
     try:
-        params = {
+        data = _api({
             "action": "query",
-            "prop": "extracts",
+            "titles": "|".join(titles),
+            "prop": "extracts|info",
+            "exintro": "1",
             "explaintext": "1",
-            "titles": title,
-            "format": "json"
-        }
-        r = requests.get(WIKI_EXTRACT, params=params, timeout=20)
-        if r.status_code == 200:
-            data = r.json()
-            pages = data.get("query", {}).get("pages", {})
-            for _, page in pages.items():
-                extract = page.get("extract", "")
-                if extract:
-                    # clamp to ~2k chars for prompts
-                    return extract[:2000]
-    except Exception:
-        pass
-    return ""
+            "exlimit": "max",
+            "exchars": str(EXTRACT_CHARS),
+            "redirects": "1",
+        })
+    except Exception as e:
+        print(f"⚠️  Wikipedia extract fetch failed: {e}")
+        return {}
+
+    # Map redirected/normalised titles back to what was asked for
+    aliases = {}
+    for entry in data.get("query", {}).get("normalized", []) + data.get("query", {}).get("redirects", []):
+        aliases[entry["to"]] = aliases.get(entry["from"], entry["from"])
+    out = {}
+    for page in _pages(data):
+        extract = page.get("extract", "")
+        if extract:
+            _store_extract(page["title"], page.get("lastrevid"), extract)
+            out[aliases.get(page["title"], page["title"])] = extract[:EXTRACT_CHARS]
+    return out
+
 
 def retrieve_visual_context(topic: str, description: str, extra_hint: str = "") -> str:
     """
     Retrieve quick factual/context snippets from Wikipedia to ground visuals.
     Returns a short concatenated text.
     """
-    # Search using description, fallback to topic
-    titles = _wiki_search(f"{description} {extra_hint}".strip()) or _wiki_search(topic)
-    snippets = []
-    for t in titles[:3]:
-        txt = _wiki_extract(t)
-        if txt:
-            snippets.append(f"[{t}]\n{txt}")
+    if RETRIEVER_BACKEND in ("local", "hybrid"):
+        ctx = knowledge_index.retrieve(f"{description} {extra_hint} {topic}")[:3000]
+        if ctx or RETRIEVER_BACKEND == "local":
+            return ctx or f"No external context found for '{description}'."
+
+    # Search using description, fallback to topic (both in flight at once)
+    primary = f"{description} {extra_hint}".strip()
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        fallback = pool.submit(_wiki_search, topic) if topic and topic != primary else None
+        hits = _wiki_search(primary) if primary else []
+        if not hits and fallback is not None:
+            hits = fallback.result()
+    finally:
+        # An unneeded fallback finishes in the background (and still warms the cache)
+        pool.shutdown(wait=False)
+    snippets = [f"[{title}]\n{text}" for title, text in hits[:3]]
     # Concatenate and clamp
     ctx = "\n\n".join(snippets)[:3000]
     return ctx or f"No external context found for '{description}'."
+
+
+def retrieve_section_context(topic: str, heading: str, summary: str = "") -> str:
+    """
+    Grounding context for writing one blog section, from the local knowledge index.
+    Empty with the wikipedia backend (a per-section network lookup would stall writing).
+    """
+    if RETRIEVER_BACKEND not in ("local", "hybrid"):
+        return ""
+    return knowledge_index.retrieve(f"{heading} {summary} {topic}")
+
+
+def cache_stats() -> dict:
+    return {"enabled": WIKI_CACHE_ENABLED, "extracts": EXTRACTS.stats(), "queries": QUERIES.stats()}
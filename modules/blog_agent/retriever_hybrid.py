@@ -1,10 +1,30 @@
 # modules/blog_agent/retriever_hybrid.py
-import requests
 import os
-from modules.utils import get_env, ensure_dir
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from modules import http_client
+from modules.blog_agent import search_cache
+from modules.blog_agent.downloader import download_image, probe_image
+from modules.blob_store import BlobStore
+from modules.utils import get_env
 
 # --- Configuration ---
 SERP_API_KEY = get_env("SERP_API_KEY")
+SERPAPI_ENDPOINT = get_env("SERPAPI_ENDPOINT", "https://serpapi.com/search.json")
+# "cascade" walks the searches one by one and usually stops after the first; "race" issues
+# them concurrently (faster, but up to IMAGE_SEARCH_RACE_CONCURRENCY paid searches per visual)
+IMAGE_SEARCH_MODE = get_env("IMAGE_SEARCH_MODE", "cascade")
+IMAGE_SEARCH_RACE_CONCURRENCY = int(get_env("IMAGE_SEARCH_RACE_CONCURRENCY", "4"))
+# How long a finished result waits for a more-preferred attempt that is still running
+IMAGE_SEARCH_RACE_GRACE = float(get_env("IMAGE_SEARCH_RACE_GRACE", "0.25"))
+
+# Downloaded images are kept once per content hash; URLs seen before are not re-fetched
+IMAGE_STORE_ENABLED = get_env("IMAGE_STORE_ENABLED", "1") == "1"
+IMAGE_STORE = BlobStore(
+    get_env("IMAGE_STORE_DIR", "generated/blogs/assets/store"),
+    quota_bytes=int(float(get_env("IMAGE_STORE_QUOTA_MB", "500")) * 1024 * 1024),
+)
 
 # --- API Self-Test ---
 IS_API_KEY_VALID = None
@@ -12,7 +32,9 @@ IS_API_KEY_VALID = None
 def _validate_api_key():
     """
     Performs a one-time, simple search to check if the SerpAPI key is valid.
-    Uses google_images as the default test.
+    Uses google_images as the default test. A definite outcome (200, or 401/403
+    for a bad key) is persisted in the search cache, so later processes skip the
+    probe; rate limits, server errors and network failures are re-checked next time.
     """
     global IS_API_KEY_VALID
     if IS_API_KEY_VALID is not None:
@@ -23,36 +45,69 @@ def _validate_api_key():
         IS_API_KEY_VALID = False
         return False
 
+    cached = search_cache.get_key_status(SERP_API_KEY)
+    if cached is not None:
+        IS_API_KEY_VALID = cached
+        if not cached:
+            print("❌ CRITICAL: SerpAPI key was found invalid on a recent check (purge the search cache to re-check).")
+        return cached
+
     print("🩺 Performing a one-time check of the SerpAPI key...")
     try:
         params = {"q": "Test", "engine": "google_images", "api_key": SERP_API_KEY}
-        response = requests.get("https://serpapi.com/search.json", params=params, timeout=10)
+        response = http_client.get(SERPAPI_ENDPOINT, params=params, read_timeout=10)
         
         if response.status_code == 200:
             print("✅ SerpAPI key is valid.")
             IS_API_KEY_VALID = True
+            search_cache.store_key_status(SERP_API_KEY, True)
             return True
-        else:
-            error_data = response.json()
-            error_message = error_data.get("error", "An unknown API error occurred.")
+        try:
+            error_message = response.json().get("error", "An unknown API error occurred.")
+        except ValueError:
+            error_message = f"HTTP {response.status_code}"
+        if response.status_code in (401, 403):
             print(f"❌ CRITICAL: SerpAPI key appears to be invalid. Reason: {error_message}")
             print("   Please check your SERP_API_KEY in your .env file and ensure your account has searches remaining.")
             IS_API_KEY_VALID = False
+            search_cache.store_key_status(SERP_API_KEY, False)
             return False
-            
+        # Rate limits and outages say nothing about the key: skip this search, check again next time
+        print(f"⚠️  SerpAPI unavailable (HTTP {response.status_code}: {error_message}); will re-check the key later.")
+        return False
+
     except Exception as e:
-        print(f"❌ CRITICAL: Failed to connect to SerpAPI. Check your network connection. Error: {e}")
-        IS_API_KEY_VALID = False
+        print(f"❌ Failed to connect to SerpAPI. Check your network connection. Error: {e}")
         return False
 
-def find_and_download_image(topic: str, keywords: str, vtype: str, output_path: str) -> str | None:
+def _search_attempts(topic: str, keywords: str, vtype: str) -> list[tuple[str, str]]:
+    """(query, engine) pairs of the Query Cascade, in preference order."""
+    search_queries = [
+        f"{topic} {keywords} {vtype}", # Attempt 1: Specific
+        f"{topic} {keywords}",         # Attempt 2: Simpler
+        f"{keywords}"                  # Attempt 3: Broadest
+    ]
+    attempts = [(q, engine) for q in search_queries for engine in ("google_images", "bing_images")]
+    attempts.append((f"{topic} {vtype}", "google_images")) # Final fallback
+    return attempts
+
+def find_and_download_image(topic: str, keywords: str, vtype: str, output_path: str, mode: str | None = None) -> str | None:
     """
     Uses a multi-engine, multi-attempt "Query Cascade" RAG strategy.
     It will try Google Images first, then Bing Images as a fallback.
+    In "race" mode (opt-in) the cascade's searches run concurrently instead.
+    Each search's top candidates are tried in parallel before moving on.
+
+    Returns the path of the image: output_path with the image's real extension.
+    Images from the store are hard-linked (or copied) there, so evicting the
+    blob later cannot pull the file from under a run that has not embedded it yet.
     """
     if not _validate_api_key():
         return None
 
+    if (mode or IMAGE_SEARCH_MODE) == "race":
+        return _race_download_image(topic, keywords, vtype, output_path)
+
     search_queries = [
         f"{topic} {keywords} {vtype}", # Attempt 1: Specific
         f"{topic} {keywords}",         # Attempt 2: Simpler
@@ -62,63 +117,243 @@ def find_and_download_image(topic: str, keywords: str, vtype: str, output_path:
     for query in search_queries:
         # --- Try Google Images First ---
         print(f"🔎 [Google] Searching for: '{query}'")
-        image_url = _search_with_engine(query, "google_images")
-        
-        if image_url and _download_image(image_url, output_path):
-            return output_path # Success!
+        path = _download_best(_search_candidates(query, "google_images"), output_path)
+        if path:
+            return path # Success!
 
         # --- If Google fails, Try Bing Images ---
         print(f"⚠️  [Google] failed. Trying [Bing] for: '{query}'")
-        image_url = _search_with_engine(query, "bing_images")
-        
-        if image_url and _download_image(image_url, output_path):
-            return output_path # Success!
+        path = _download_best(_search_candidates(query, "bing_images"), output_path)
+        if path:
+            return path # Success!
 
     # --- Final Fallback ---
     print(f"⚠️ All specific searches failed. Trying a broad fallback search.")
     fallback_query = f"{topic} {vtype}"
-    image_url = _search_with_engine(fallback_query, "google_images")
-    if image_url and _download_image(image_url, output_path):
-        return output_path
+    path = _download_best(_search_candidates(fallback_query, "google_images"), output_path)
+    if path:
+        return path
 
     print(f"❌ All search attempts on all engines failed for keywords: '{keywords}'")
     return None
 
-def _search_with_engine(query: str, engine: str) -> str | None:
-    """Helper function to perform the SerpAPI search on a specific engine."""
+def _race_download_image(topic: str, keywords: str, vtype: str, output_path: str) -> str | None:
+    """
+    Runs every cascade attempt (search + candidate downloads) concurrently,
+    capped at IMAGE_SEARCH_RACE_CONCURRENCY.
+    """
+    attempts = _search_attempts(topic, keywords, vtype)
+
+    def attempt(i: int, tmp_path: str, cancel: threading.Event) -> str | None:
+        query, engine = attempts[i]
+        print(f"🔎 [{engine}] Racing search {i + 1}/{len(attempts)}: '{query}'")
+        candidates = _search_candidates(query, engine)
+        if cancel.is_set():
+            return None
+        # cancel is a _CancelScope: losing the race also stops this attempt's downloads
+        return _download_best(candidates, tmp_path, cancel_event=cancel)
+
+    won = _race_paths(len(attempts), attempt, output_path, "race", IMAGE_SEARCH_RACE_CONCURRENCY)
+    if not won:
+        print(f"❌ All search attempts on all engines failed for keywords: '{keywords}'")
+        return None
+    best, path = won
+    query, engine = attempts[best]
+    print(f"🏁 [{engine}] won the race for '{query}' -> {path}")
+    return path
+
+def _download_best(candidates: list[str] | None, output_path: str, cancel_event: threading.Event | None = None) -> str | None:
+    """
+    Tries a search's ranked candidate URLs together: each is probed (HEAD / Range)
+    for type and size, acceptable ones are downloaded in parallel, and the
+    best-ranked success is kept. Candidates already in the image store win outright.
+    """
+    if not candidates:
+        return None
+    if IMAGE_STORE_ENABLED:
+        for url in candidates:
+            stored = IMAGE_STORE.lookup(url)
+            if stored:
+                print(f"♻️  Reusing stored image for {url} -> {stored}")
+                path = _claim_stored(stored, output_path)
+                if path:
+                    return path
+
+    def candidate(k: int, tmp_path: str, cancel: threading.Event) -> str | None:
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        url = candidates[k]
+        reason = probe_image(url)
+        if reason:
+            print(f"⚠️  Skipping candidate {k + 1} ({reason}): {url}")
+            return None
+        if cancel.is_set():
+            return None
+        return _download_image(url, tmp_path, cancel_event=cancel)
+
+    won = _race_paths(len(candidates), candidate, output_path, "cand", len(candidates), parent=cancel_event)
+    return won[1] if won else None
+
+class _CancelScope(threading.Event):
+    """An Event whose set() also sets the scopes created from it with child()."""
+
+    def __init__(self):
+        super().__init__()
+        self._children = []
+        self._children_lock = threading.Lock()
+
+    def child(self) -> "_CancelScope":
+        scope = _CancelScope()
+        with self._children_lock:
+            self._children.append(scope)
+            if self.is_set():
+                scope.set()
+        return scope
+
+    def set(self):
+        with self._children_lock:
+            super().set()
+            children = list(self._children)
+        for scope in children:
+            scope.set()
+
+def _race_paths(count: int, job, output_path: str, tag: str, max_workers: int,
+                parent: threading.Event | None = None) -> tuple[int, str] | None:
+    """
+    Runs job(i, tmp_path, cancel) for i in range(count) concurrently; each returns a
+    file path or None. The first success wins, except that more-preferred (lower i)
+    jobs still running get IMAGE_SEARCH_RACE_GRACE seconds to finish, so near-ties
+    keep preference order. Losers are cancelled and their own temp files removed;
+    a winning temp file is renamed to output_path (keeping its real extension).
+    Setting `parent` (a _CancelScope, e.g. an enclosing race's) cancels this race too.
+    Returns (winning index, path) or None.
+    """
+    cancel = parent.child() if isinstance(parent, _CancelScope) else _CancelScope()
+    lock = threading.Lock()
+    finished: dict[int, str] = {}  # job index -> downloaded file
+    root, ext = os.path.splitext(output_path)
+
+    def is_temp(i: int, path: str) -> bool:
+        # a job's own download, as opposed to a shared image-store file
+        return os.path.splitext(path)[0] == f"{root}.{tag}{i}"
+
+    def run(i: int):
+        if cancel.is_set():
+            return
+        path = job(i, f"{root}.{tag}{i}{ext}", cancel)
+        if not path:
+            return
+        with lock:
+            if not cancel.is_set():
+                finished[i] = path
+                return
+        if is_temp(i, path):
+            _remove_quietly(path)  # lost the race
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix=f"image-{tag}")
+    futures = {pool.submit(run, i): i for i in range(count)}
+    pending = set(futures)
+    try:
+        while pending:
+            _, pending = wait(pending, return_when=FIRST_COMPLETED)
+            with lock:
+                best = min(finished, default=None)
+            if best is not None:
+                preferred = {f for f in pending if futures[f] < best}
+                if preferred:
+                    wait(preferred, timeout=IMAGE_SEARCH_RACE_GRACE)
+                break
+    finally:
+        with lock:
+            cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if not finished:
+        return None
+    best = min(finished)
+    for i, path in finished.items():
+        if i != best and is_temp(i, path):
+            _remove_quietly(path)
+    path = finished[best]
+    if is_temp(best, path):
+        final = root + os.path.splitext(path)[1]
+        os.replace(path, final)
+        path = final
+    return best, path
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _search_candidates(query: str, engine: str) -> list[str] | None:
+    """
+    Image URLs (top 3, ranked) for a query on one engine, served from the search
+    cache when possible. Returns None if the search itself failed.
+    """
+    cached = search_cache.get_results(query, engine)
+    if cached is not None:
+        print(f"💾 [{engine}] Cached results for: '{query}'")
+        return cached
     try:
+        # The normalised form is only the cache key; "C++" or "Node.js" must reach the engine intact
         params = { "q": query, "engine": engine, "ijn": "0", "api_key": SERP_API_KEY }
-        response = requests.get("https://serpapi.com/search.json", params=params, timeout=30)
+        response = http_client.get(SERPAPI_ENDPOINT, params=params, read_timeout=30)
         response.raise_for_status()
         results = response.json()
-
-        if "images_results" in results and results["images_results"]:
-            for image_info in results["images_results"][:3]:
-                # --- This is the key fix ---
-                # Check for Google's key OR Bing's key
-                url = image_info.get("original") or image_info.get("original_image_url")
-                if url:
-                    return url
-            
     except Exception as e:
         print(f"❌ Error during [{engine}] search for '{query}': {e}")
-    
-    print(f"❌ No image results found on [{engine}] for query: '{query}'")
-    return None
+        return None
+
+    urls = []
+    for image_info in (results.get("images_results") or [])[:3]:
+        # --- This is the key fix ---
+        # Check for Google's key OR Bing's key
+        url = image_info.get("original") or image_info.get("original_image_url")
+        if url:
+            urls.append(url)
+    if not urls:
+        print(f"❌ No image results found on [{engine}] for query: '{query}'")
+    search_cache.store_results(query, engine, urls)
+    return urls
+
+def _claim_stored(stored: str, output_path: str) -> str | None:
+    """
+    Links a store blob to output_path (keeping the blob's extension) so the run owns
+    its copy; None if the blob was evicted in the meantime.
+    """
+    dest = os.path.splitext(output_path)[0] + os.path.splitext(stored)[1]
+    try:
+        return IMAGE_STORE.link(stored, dest)
+    except OSError as e:
+        print(f"⚠️  Stored image {stored} is gone ({e}).")
+        return None
 
-def _download_image(url: str, output_path: str) -> str | None:
-    """Helper function to download an image from a URL."""
+def _download_image(url: str, output_path: str, cancel_event: threading.Event | None = None) -> str | None:
+    """
+    Downloads an image through the content-addressed image store: a URL fetched
+    before is served from the store, new bytes are stored once per sha256.
+    Either way the caller gets its own link to the blob at output_path (with the
+    image's real extension).
+    """
+    if not IMAGE_STORE_ENABLED:
+        return download_image(url, output_path, cancel_event=cancel_event)
+    stored = IMAGE_STORE.lookup(url)
+    if stored:
+        print(f"♻️  Reusing stored image for {url} -> {stored}")
+        path = _claim_stored(stored, output_path)
+        if path:
+            return path
+    tmp_path = download_image(url, f"{output_path}.{uuid.uuid4().hex[:8]}.part", cancel_event=cancel_event)
+    if not tmp_path:
+        return None
     try:
-        print(f"Attempting to download from: {url}")
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'}
-        image_response = requests.get(url, timeout=30, headers=headers, stream=True)
-        image_response.raise_for_status()
-        ensure_dir(output_path)
-        with open(output_path, "wb") as f:
-            for chunk in image_response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print(f"✅ Image downloaded successfully -> {output_path}")
-        return output_path
+        return _claim_stored(IMAGE_STORE.put_file(tmp_path, key=url), output_path)
     except Exception as e:
-        print(f"⚠️  Failed to download {url}. Reason: {e}.")
-        return None
\ No newline at end of file
+        print(f"⚠️  Could not add {url} to the image store ({e}); keeping a plain copy.")
+        if not os.path.exists(tmp_path):
+            return None
+        final = os.path.splitext(output_path)[0] + os.path.splitext(tmp_path)[1]
+        os.replace(tmp_path, final)
+        return final
@@ -0,0 +1,105 @@
+# modules/blog_agent/search_cache.py
+"""
+Persistent cache of SerpAPI image-search results and of the API-key check.
+
+Queries are normalised (case, punctuation, whitespace) before lookup, so
+"AI  Agents, diagram" and "ai agents diagram" share one entry. Inspect or
+purge from the command line:
+
+    python -m modules.blog_agent.search_cache stats
+    python -m modules.blog_agent.search_cache list [--limit N]
+    python -m modules.blog_agent.search_cache purge [--expired]
+"""
+import argparse
+import hashlib
+import json
+import re
+import unicodedata
+
+from modules.disk_cache import DiskCache, make_key
+from modules.utils import get_env
+
+SERP_CACHE_ENABLED = get_env("SERP_CACHE_ENABLED", "1") == "1"
+_CACHE_PATH = get_env("SERP_CACHE_PATH", "generated/cache/serp_cache.db")
+
+RESULTS = DiskCache(
+    _CACHE_PATH,
+    table="serp_results",
+    ttl=float(get_env("SERP_CACHE_TTL", str(3 * 24 * 3600))),
+    max_entries=int(get_env("SERP_CACHE_MAX_ENTRIES", "20000")),
+)
+KEY_STATUS = DiskCache(
+    _CACHE_PATH,
+    table="serp_key_status",
+    ttl=float(get_env("SERP_KEY_CHECK_TTL", str(24 * 3600))),
+)
+
+
+def normalize_query(query: str) -> str:
+    q = unicodedata.normalize("NFKC", query or "").casefold()
+    q = re.sub(r"[^\w+#.]+", " ", q)
+    return " ".join(q.split())
+
+
+def get_results(query: str, engine: str) -> list[str] | None:
+    """Cached candidate URLs for (normalised query, engine), or None on a miss."""
+    if not SERP_CACHE_ENABLED:
+        return None
+    raw = RESULTS.get(make_key(engine, normalize_query(query)))
+    return json.loads(raw) if raw is not None else None
+
+
+def store_results(query: str, engine: str, urls: list[str]):
+    if SERP_CACHE_ENABLED:
+        RESULTS.set(
+            make_key(engine, normalize_query(query)),
+            json.dumps(urls),
+            meta={"engine": engine, "query": normalize_query(query)},
+        )
+
+
+def _key_id(api_key: str) -> str:
+    # Never persist the key itself
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+
+
+def get_key_status(api_key: str) -> bool | None:
+    if not SERP_CACHE_ENABLED:
+        return None
+    raw = KEY_STATUS.get(_key_id(api_key))
+    return None if raw is None else raw == "valid"
+
+
+def store_key_status(api_key: str, valid: bool):
+    if SERP_CACHE_ENABLED:
+        KEY_STATUS.set(_key_id(api_key), "valid" if valid else "invalid")
+
+
+def stats() -> dict:
+    return {"enabled": SERP_CACHE_ENABLED, **RESULTS.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or purge the SerpAPI search-result cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show entry count, size and hit rate")
+    ls = sub.add_parser("list", help="Show most recently used queries")
+    ls.add_argument("--limit", type=int, default=20)
+    purge = sub.add_parser("purge", help="Delete cached results and the stored key check")
+    purge.add_argument("--expired", action="store_true", help="Only delete expired entries")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(stats(), indent=2))
+    elif args.command == "list":
+        for e in RESULTS.entries(args.limit):
+            meta = e["meta"] or {}
+            print(f"{meta.get('engine', '?'):<14} {meta.get('query', e['key'])}")
+    elif args.command == "purge":
+        removed = RESULTS.purge(expired_only=args.expired)
+        KEY_STATUS.purge(expired_only=args.expired)
+        print(f"🧹 Removed {removed} cached search results.")
+
+
+if __name__ == "__main__":
+    main()
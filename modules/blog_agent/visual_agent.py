@@ -19,36 +19,43 @@ def decide_visuals_for_section(heading: str, content: str) -> list[dict]:
         f"### Content:\n{content}\n"
     )
     
-    for _ in range(2): 
-        out = _gemini_call(prompt).strip()
-        
-        json_match = re.search(r'\[\s*\{.*?\}\s*\]', out, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(0)
-            try:
-                arr = json.loads(json_str)
-                cleaned = []
-                for v in arr if isinstance(arr, list) else []:
-                    t = (v.get("type") or "").lower()
-                    
-                    # Correctly handle the list of keywords and join them into a string
-                    keywords_val = v.get("keywords")
-                    if isinstance(keywords_val, list):
-                        keywords = " ".join(keywords_val)
-                    elif isinstance(keywords_val, str):
-                        keywords = keywords_val # Fallback if AI messes up
-                    else:
-                        continue
+    for attempt in range(2):
+        # Only a parseable answer is cached; the retry always asks the model again
+        out = _gemini_call(prompt, cache=attempt == 0, validate=lambda text: bool(_parse_visuals(text)))
+        cleaned = _parse_visuals(out)
+        if cleaned:
+            print(f"✅ Visual agent identified keywords for {len(cleaned)} visuals in section '{heading}'.")
+            return cleaned[:2]
 
-                    if t in {"diagram", "image"} and keywords.strip():
-                        idx = v.get("after_paragraph", 0)
-                        cleaned.append({"type": t, "keywords": keywords.strip(), "after_paragraph": idx})
-                
-                if cleaned:
-                    print(f"✅ Visual agent identified keywords for {len(cleaned)} visuals in section '{heading}'.")
-                    return cleaned[:2]
-            except json.JSONDecodeError:
-                continue
-    
     print(f"❌ Visual agent failed to generate keywords for section '{heading}'.")
-    return []
\ No newline at end of file
+    return []
+
+
+def _parse_visuals(out: str) -> list[dict]:
+    """The valid {type, keywords, after_paragraph} items in a model answer, or []."""
+    json_match = re.search(r'\[\s*\{.*?\}\s*\]', out.strip(), re.DOTALL)
+    if not json_match:
+        return []
+    try:
+        arr = json.loads(json_match.group(0))
+    except json.JSONDecodeError:
+        return []
+    cleaned = []
+    for v in arr if isinstance(arr, list) else []:
+        if not isinstance(v, dict):
+            continue
+        t = (v.get("type") or "").lower()
+
+        # Correctly handle the list of keywords and join them into a string
+        keywords_val = v.get("keywords")
+        if isinstance(keywords_val, list):
+            keywords = " ".join(str(k) for k in keywords_val)
+        elif isinstance(keywords_val, str):
+            keywords = keywords_val # Fallback if AI messes up
+        else:
+            continue
+
+        if t in {"diagram", "image"} and keywords.strip():
+            idx = v.get("after_paragraph", 0)
+            cleaned.append({"type": t, "keywords": keywords.strip(), "after_paragraph": idx})
+    return cleaned
@@ -1,17 +1,34 @@
 # modules/blog_agent/writer.py
+import time
+from typing import NamedTuple
 from modules.text_generator import write_section
+from modules.utils import get_env
 
-def write_sections(plan: dict, topic: str) -> list[tuple[str, str]]:
-    """
-    Returns list of (heading, content) for each section.
-    plan: {title, sections: [{heading, summary}], target_audience, tone}
-    """
-    audience = plan.get("target_audience", "")
-    tone = plan.get("tone", "informative")
-    results = []
-    for sec in plan.get("sections", []):
-        heading = sec.get("heading", "Section")
-        summary = sec.get("summary", "")
-        content = write_section(heading, summary, audience=audience, tone=tone)
-        results.append((heading, content))
-    return results
+# Max sections written at once per blog (upstream calls are still capped by GEMINI_MAX_RPS)
+SECTION_CONCURRENCY = int(get_env("BLOG_SECTION_CONCURRENCY", "4"))
+
+class SectionResult(NamedTuple):
+    heading: str
+    content: str
+    seconds: float
+    error: str | None = None
+
+def _fallback_section(heading: str, summary: str) -> str:
+    return summary or f"This section covers {heading}."
+
+def write_one_section(sec: dict, audience: str = "", tone: str = "informative", context: str = "") -> SectionResult:
+    """Writes one outline section. Failures fall back to the outline summary instead of raising."""
+    heading = sec.get("heading", "Section")
+    summary = sec.get("summary", "")
+    start = time.perf_counter()
+    error = None
+    try:
+        content = write_section(heading, summary, context=context, audience=audience, tone=tone)
+        if not content:
+            error = "empty response"
+    except Exception as e:
+        content, error = "", str(e)
+    if error:
+        print(f"⚠️  Section '{heading}' failed ({error}); using outline summary.")
+        content = _fallback_section(heading, summary)
+    return SectionResult(heading, content, time.perf_counter() - start, error)
@@ -7,11 +7,12 @@ from .utils import print_header, get_env
 
 BRAND_VOICE = get_env("BRAND_VOICE", "Insightful, clear, motivational when appropriate. Avoid hype.")
 
-def build_content_from_prompt(prompt: str):
+def build_content_from_prompt(prompt: str, fast: bool | None = None):
     """
     Step 1: Generate the quote + themed background image with styled typography (motivational mode).
+    `fast` uses a pre-generated library background instead of the image model (default: POST_IMAGE_MODE).
     """
-    final_image_path, quote_text = generate_final_post_image(prompt)
+    final_image_path, quote_text = generate_final_post_image(prompt, fast=fast)
     return {
         "topic": prompt,
         "quote_text": quote_text,
@@ -33,7 +34,7 @@ def _generate_caption_with_gemini(platform: str, topic: str, tone: str = "motiva
         "Write a short, engaging caption (1–3 lines). No hashtags. "
         "Keep it natural, specific, and human."
     )
-    caption = _gemini_call(prompt).strip()
+    caption = _gemini_call(prompt, cache=False).strip()
     # Minimal fallback
     if not caption:
         caption = f"{topic} — let's make it happen."
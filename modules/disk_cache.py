@@ -0,0 +1,163 @@
+# modules/disk_cache.py
+"""
+Small persistent key/value cache on SQLite (WAL mode).
+
+Safe to share between threads and between uvicorn worker processes pointing at
+the same file: a hit written by one worker is visible to all. Entries expire
+after `ttl` seconds and the least-recently-used ones are evicted once the
+table grows past `max_entries`. Hit/miss counters live in the same database
+so they also aggregate across workers.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from modules.utils import ensure_dir
+
+
+def make_key(*parts) -> str:
+    """Stable content hash for any JSON-serialisable key parts."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, path: str, table: str = "cache", ttl: float | None = None, max_entries: int | None = None):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    # --- connection handling ---
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            ensure_dir(self.path)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    self._create(conn)
+                    self._ready = True
+        return conn
+
+    def _create(self, conn: sqlite3.Connection):
+        t = self.table
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {t} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, meta TEXT, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_lru ON {t}(last_access)")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {t}_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _bump(self, conn: sqlite3.Connection, name: str):
+        conn.execute(
+            f"INSERT INTO {self.table}_stats(name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    # --- public API ---
+    def get(self, key: str) -> str | None:
+        try:
+            conn = self._conn()
+            now = time.time()
+            row = conn.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._bump(conn, "misses")
+                return None
+            conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+            self._bump(conn, "hits")
+            return row[0]
+        except sqlite3.Error as e:
+            print(f"⚠️  Cache read failed ({self.table}): {e}")
+            return None
+
+    def set(self, key: str, value: str, meta: dict | None = None):
+        try:
+            conn = self._conn()
+            now = time.time()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table}(key, value, meta, created_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, json.dumps(meta) if meta else None, now, now, len(value.encode("utf-8"))),
+            )
+            if self.max_entries:
+                self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"⚠️  Cache write failed ({self.table}): {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            conn.execute(
+                f"INSERT INTO {self.table}_stats(name, value) VALUES ('evictions', ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (excess,),
+            )
+
+    def delete(self, key: str):
+        try:
+            self._conn().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"⚠️  Cache delete failed ({self.table}): {e}")
+
+    def purge(self, expired_only: bool = False) -> int:
+        """Deletes expired entries (or everything) and returns how many were removed."""
+        conn = self._conn()
+        if expired_only:
+            if self.ttl is None:
+                return 0
+            cur = conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,))
+        else:
+            cur = conn.execute(f"DELETE FROM {self.table}")
+            conn.execute(f"DELETE FROM {self.table}_stats")
+        return cur.rowcount
+
+    def entries(self, limit: int = 50) -> list[dict]:
+        """Most recently used entries, newest first (without their values)."""
+        rows = self._conn().execute(
+            f"SELECT key, meta, created_at, last_access, size FROM {self.table} ORDER BY last_access DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [
+            {"key": k, "meta": json.loads(m) if m else None, "created_at": c, "last_access": a, "size": s}
+            for k, m, c, a, s in rows
+        ]
+
+    def stats(self) -> dict:
+        try:
+            conn = self._conn()
+            count, size = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+            counters = dict(conn.execute(f"SELECT name, value FROM {self.table}_stats").fetchall())
+        except sqlite3.Error as e:
+            return {"path": self.path, "error": str(e)}
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "path": os.path.abspath(self.path),
+            "entries": count,
+            "bytes": size,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
@@ -1,20 +1,130 @@
 import os
-import base64
-import requests
+import shutil
+import uuid
 from typing import Optional
 
+import requests
+
+from . import b64_stream, http_client
+from .blob_store import BlobStore
+from .disk_cache import make_key
+from .hedging import Hedge
+from .provider_router import Router
+from .single_flight import SingleFlight
 from .utils import ensure_dir, get_env
 
 # --- CONFIGURATION ---
 GEMINI_API_KEY = get_env("GEMINI_API_KEY")
 STABILITY_API_KEY = get_env("STABILITY_API_KEY", "")  # optional fallback
 
+GEMINI_API_BASE = get_env("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+
 MODEL_ID = "gemini-2.5-flash-image"
-GEMINI_ENDPOINT = (
-    "https://generativelanguage.googleapis.com/v1beta/"
-    f"models/{MODEL_ID}:generateContent"
+GEMINI_ENDPOINT = f"{GEMINI_API_BASE}/models/{MODEL_ID}:generateContent"
+STABILITY_ENDPOINT = get_env(
+    "STABILITY_ENDPOINT",
+    "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v1-0/text-to-image",
 )
 
+# With a Stability key, an image call slower than the IMAGE_HEDGE_PERCENTILE of the
+# leading provider's recent latencies gets a parallel request to the other; the first image wins.
+IMAGE_HEDGE_ENABLED = get_env("IMAGE_HEDGE_ENABLED", "1") == "1"
+IMAGE_HEDGE = Hedge(
+    "image", "gemini", "stability",
+    percentile=float(get_env("IMAGE_HEDGE_PERCENTILE", "95")),
+    initial_delay=float(get_env("IMAGE_HEDGE_INITIAL_DELAY", "30")),  # until enough samples
+    min_delay=float(get_env("IMAGE_HEDGE_MIN_DELAY", "5")),
+    max_delay=90,
+)
+
+# Health of each image provider; plain images go to the best-ranked one meeting the tier, and a
+# quarantined provider is skipped until its probe succeeds. Every IMAGE_ROUTER_EXPLORE_EVERY-th
+# call leads with the lower-ranked provider (hedged), so its latency keeps being sampled.
+# Only Gemini can draw the quote text, so Stability only serves plain images.
+IMAGE_ROUTER = Router("image", explore_every=int(get_env("IMAGE_ROUTER_EXPLORE_EVERY", "10")))
+IMAGE_ROUTER.register("gemini", "high")
+IMAGE_ROUTER.register("stability", "standard")
+
+# Concurrent identical image requests share one upstream generation
+IMAGE_FLIGHT = SingleFlight("gemini_image")
+
+# Generated images, keyed by (model, normalized prompt, mode, quote, brand text).
+# Only Gemini output is cached, so a Stability fallback is retried next time.
+IMAGE_CACHE_ENABLED = get_env("IMAGE_CACHE_ENABLED", "1") == "1"
+IMAGE_CACHE = BlobStore(
+    get_env("IMAGE_CACHE_DIR", "generated/cache/images"),
+    quota_bytes=int(float(get_env("IMAGE_CACHE_QUOTA_MB", "1024")) * 1024 * 1024),
+)
+# "copy" keeps the cache safe from callers editing their output in place; "link" saves disk
+IMAGE_CACHE_LINK_MODE = get_env("IMAGE_CACHE_LINK_MODE", "copy")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case and whitespace differences do not change the image we ask for."""
+    return " ".join((prompt or "").split()).casefold()
+
+
+def image_cache_key(kind: str, prompt: str, mode: str, quote_text: str = "", brand_text: str = "") -> str:
+    # Quote and brand text are drawn into the image verbatim, so they are not normalized
+    return make_key(kind, MODEL_ID, normalize_prompt(prompt), mode, quote_text, brand_text)
+
+
+def _from_cache(key: str, output_path: str) -> Optional[str]:
+    """Cached image copied (or hard-linked) to output_path, or None on a miss."""
+    if not IMAGE_CACHE_ENABLED:
+        return None
+    stored = IMAGE_CACHE.lookup(key)
+    if not stored:
+        return None
+    try:
+        IMAGE_CACHE.link(stored, output_path, hardlink=(IMAGE_CACHE_LINK_MODE == "link"))
+    except OSError as e:
+        print(f"⚠️  Could not reuse cached image ({e}); generating instead.")
+        return None
+    print(f"♻️  Reusing cached generated image → {output_path}")
+    return output_path
+
+
+def _save_image(response, field: str, output_path: str, cache_key: Optional[str] = None) -> Optional[str]:
+    """
+    Decodes the base64 `field` of a streamed JSON response straight into
+    output_path (never holding the whole image in memory). None if the
+    response has no such field.
+    """
+    if not b64_stream.response_to_file(response, field, output_path):
+        return None
+    if cache_key is not None and IMAGE_CACHE_ENABLED:
+        try:
+            # put_file moves its input, so the store gets its own copy
+            ensure_dir(os.path.join(IMAGE_CACHE.root, "x"))
+            tmp = os.path.join(IMAGE_CACHE.root, f"{uuid.uuid4().hex}.tmp")
+            shutil.copyfile(output_path, tmp)
+            IMAGE_CACHE.put_file(tmp, key=cache_key, ext=os.path.splitext(output_path)[1].lower() or ".png")
+        except OSError as e:
+            print(f"⚠️  Could not cache generated image: {e}")
+    return output_path
+
+
+def image_cache_stats() -> dict:
+    return {"enabled": IMAGE_CACHE_ENABLED, "link_mode": IMAGE_CACHE_LINK_MODE, **IMAGE_CACHE.stats()}
+
+
+def _coalesced(key: str, output_path: str, generate) -> Optional[str]:
+    """
+    Runs generate() once for concurrent identical requests. Callers that joined
+    another request's generation get a copy of its file at their own output_path.
+    """
+    result, shared = IMAGE_FLIGHT.do(key, generate)
+    if not shared or not result or os.path.abspath(result) == os.path.abspath(output_path):
+        return result
+    try:
+        ensure_dir(output_path)
+        shutil.copyfile(result, output_path)
+        return output_path
+    except OSError as e:
+        print(f"⚠️  Could not copy shared image to {output_path}: {e}")
+        return result
+
 
 def generate_image_with_stability(prompt: str, output_path: str) -> Optional[str]:
     """
@@ -24,8 +134,6 @@ def generate_image_with_stability(prompt: str, output_path: str) -> Optional[str
         return None
 
     try:
-        url = "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v1-0/text-to-image"
-
         payload = {
             "text_prompts": [{"text": prompt}],
             "cfg_scale": 7,
@@ -41,16 +149,19 @@ def generate_image_with_stability(prompt: str, output_path: str) -> Optional[str
             "Accept": "application/json",
         }
 
-        print("🔁 Gemini failed — trying Stability AI fallback...")
-        res = requests.post(url, json=payload, headers=headers, timeout=90)
+        print("🎨 Generating image via Stability AI...")
+        res = http_client.post(STABILITY_ENDPOINT, json=payload, headers=headers, read_timeout=90, stream=True)
 
         if res.status_code == 200:
-            img_b64 = res.json()["artifacts"][0]["base64"]
-            with open(output_path, "wb") as f:
-                f.write(base64.b64decode(img_b64))
-            print(f"✅ Image generated via Stability → {output_path}")
-            return output_path
+            if _save_image(res, "base64", output_path):
+                print(f"✅ Image generated via Stability → {output_path}")
+                return output_path
+            print("⚠️ No image data found in Stability response.")
+            return None
+        print(f"❌ Stability API error {res.status_code}: {res.text[:200]}")
 
+    except requests.Timeout:
+        raise  # counted as a timeout by IMAGE_ROUTER
     except Exception as e:
         print(f"❌ Stability fallback failed: {e}")
 
@@ -67,6 +178,25 @@ def generate_image_with_text(
     """
     Generate image with quote text embedded using Gemini Image API.
     """
+    key = image_cache_key("with_text", prompt, mode, quote_text, brand_text)
+    cached = _from_cache(key, output_path)
+    if cached:
+        return cached
+    return _coalesced(
+        key, output_path,
+        lambda: IMAGE_ROUTER.observe("gemini", _generate_image_with_text)(
+            prompt, quote_text, brand_text, output_path, mode, cache_key=key),
+    )
+
+
+def _generate_image_with_text(
+    prompt: str,
+    quote_text: str,
+    brand_text: str,
+    output_path: str,
+    mode: str = "motivational",
+    cache_key: Optional[str] = None,
+) -> Optional[str]:
 
     if not GEMINI_API_KEY:
         print("❌ GEMINI_API_KEY missing in environment.")
@@ -112,36 +242,29 @@ The image MUST include the following text elements:
     print(f"🎨 Generating image with embedded text using {MODEL_ID}...")
 
     try:
-        response = requests.post(
+        response = http_client.post(
             GEMINI_ENDPOINT,
             headers=headers,
             json=payload,
             params=params,
-            timeout=90,
+            read_timeout=90,
+            stream=True,
         )
 
         if response.status_code != 200:
             print(f"❌ Gemini API error {response.status_code}: {response.text}")
             return None
 
-        data = response.json()
-        candidates = data.get("candidates", [])
-
-        if not candidates:
-            print("⚠️ Gemini returned no candidates.")
-            return None
-
-        for part in candidates[0]["content"]["parts"]:
-            if "inlineData" in part:
-                img_b64 = part["inlineData"]["data"]
-                with open(output_path, "wb") as f:
-                    f.write(base64.b64decode(img_b64))
-                print(f"✅ Image with embedded text generated → {output_path}")
-                return output_path
+        # The image is the first inlineData.data string in the response
+        if _save_image(response, "data", output_path, cache_key):
+            print(f"✅ Image with embedded text generated → {output_path}")
+            return output_path
 
         print("⚠️ No image data found in Gemini response.")
         return None
 
+    except requests.Timeout:
+        raise  # counted as a timeout by IMAGE_ROUTER
     except Exception as e:
         print(f"❌ Gemini request failed: {e}")
         return None
@@ -151,10 +274,27 @@ def generate_image(
     prompt: str,
     output_path: str,
     mode: str = "motivational",
+    tier: str = "standard",
 ) -> Optional[str]:
     """
-    Generate image using Gemini Image API (Nano Banana).
+    Generate image using Gemini Image API (Nano Banana), or Stability when the router
+    ranks it better. `tier` ("standard" or "high") is the minimum provider quality;
+    "high" keeps the call on Gemini.
     """
+    key = image_cache_key("image", prompt, mode)
+    cached = _from_cache(key, output_path)
+    if cached:
+        return cached
+    return _coalesced(key, output_path, lambda: _generate_image(prompt, output_path, mode, cache_key=key, tier=tier))
+
+
+def _generate_image(
+    prompt: str,
+    output_path: str,
+    mode: str = "motivational",
+    cache_key: Optional[str] = None,
+    tier: str = "standard",
+) -> Optional[str]:
 
     if not GEMINI_API_KEY:
         print("❌ GEMINI_API_KEY missing in environment.")
@@ -162,6 +302,30 @@ def generate_image(
 
     ensure_dir(output_path)
 
+    attempts = {
+        "gemini": IMAGE_ROUTER.observe(
+            "gemini", lambda path: _generate_image_with_gemini(prompt, path, mode, cache_key)),
+        "stability": IMAGE_ROUTER.observe("stability", lambda path: generate_image_with_stability(prompt, path)),
+    }
+    order = [p for p in IMAGE_ROUTER.candidates(tier) if p != "stability" or STABILITY_API_KEY]
+    if not order:
+        print("❌ Every image provider is quarantined; try again shortly.")
+        return None
+
+    # Both hedged attempts report to IMAGE_ROUTER, so the provider ranked second is still sampled
+    if IMAGE_HEDGE_ENABLED and len(order) == 2:
+        return IMAGE_HEDGE.run(attempts["gemini"], attempts["stability"], output_path, first=order[0])
+
+    for i, provider in enumerate(order):
+        if i:
+            print(f"🔁 {order[i - 1]} failed — trying {provider}...")
+        result = attempts[provider](output_path)
+        if result:
+            return result
+    return None
+
+
+def _generate_image_with_gemini(prompt: str, output_path: str, mode: str, cache_key: Optional[str]) -> Optional[str]:
     final_prompt = f"{prompt}, photorealistic, cinematic lighting"
     if mode == "motivational":
         final_prompt += ", minimalist, inspiring, soft focus, no text"
@@ -184,36 +348,29 @@ def generate_image(
     print(f"🎨 Generating image using {MODEL_ID}...")
 
     try:
-        response = requests.post(
+        response = http_client.post(
             GEMINI_ENDPOINT,
             headers=headers,
             json=payload,
             params=params,
-            timeout=90,
+            read_timeout=90,
+            stream=True,
         )
 
         if response.status_code != 200:
             print(f"❌ Gemini API error {response.status_code}: {response.text}")
-            return generate_image_with_stability(prompt, output_path)
-
-        data = response.json()
-        candidates = data.get("candidates", [])
-
-        if not candidates:
-            print("⚠️ Gemini returned no candidates.")
-            return generate_image_with_stability(prompt, output_path)
+            return None
 
-        for part in candidates[0]["content"]["parts"]:
-            if "inlineData" in part:
-                img_b64 = part["inlineData"]["data"]
-                with open(output_path, "wb") as f:
-                    f.write(base64.b64decode(img_b64))
-                print(f"✅ Image generated → {output_path}")
-                return output_path
+        # The image is the first inlineData.data string in the response
+        if _save_image(response, "data", output_path, cache_key):
+            print(f"✅ Image generated → {output_path}")
+            return output_path
 
         print("⚠️ No image data found in Gemini response.")
-        return generate_image_with_stability(prompt, output_path)
+        return None
 
+    except requests.Timeout:
+        raise  # counted as a timeout by IMAGE_ROUTER
     except Exception as e:
         print(f"❌ Gemini request failed: {e}")
-        return generate_image_with_stability(prompt, output_path)
+        return None
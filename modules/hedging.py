@@ -0,0 +1,197 @@
+# modules/hedging.py
+"""
+Hedged calls across two providers.
+
+The primary (or whichever provider the caller names as `first`) runs first.
+If it has not answered after the hedge delay, the other one is started in parallel and whichever succeeds first wins; if the
+first one fails outright, the other runs as a plain fallback. The delay is
+the given percentile of the leading provider's recent latencies (successes
+and failures alike, so slow errors and timeouts count), so only the slow tail
+pays for a second request.
+
+Each attempt writes to its own temporary file next to output_path; the
+winner's file is moved into place and the loser's is deleted when it
+finishes. A blocking HTTP call cannot be interrupted, so the loser keeps
+running in its (daemon) thread until its own timeout, but its result is
+discarded and a secondary that has not started yet is never started.
+"""
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+_registry: dict[str, "Hedge"] = {}
+
+
+class LatencyWindow:
+    """Recent latencies (seconds) of one provider."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def values(self) -> list[float]:
+        with self._lock:
+            return list(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        return _percentile(self.values(), p)
+
+    def summary(self) -> dict:
+        return {"count": len(self), "p50_s": _round(self.percentile(50)), "p95_s": _round(self.percentile(95))}
+
+
+def _percentile(samples: list[float], p: float) -> float | None:
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100.0))]
+
+
+def _discard(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+class _Race:
+    """Shared state of one hedged call: the first success claims it, later ones clean up."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.winner = None
+        self.results = queue.Queue()
+
+
+class Hedge:
+    def __init__(self, name: str, primary: str, secondary: str, percentile: float = 95.0,
+                 initial_delay: float = 30.0, min_delay: float = 1.0, max_delay: float = 90.0,
+                 min_samples: int = 10, window: int = 200):
+        self.name = name
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.latency = {primary: LatencyWindow(window), secondary: LatencyWindow(window)}
+        self.failure_latency = {primary: LatencyWindow(window), secondary: LatencyWindow(window)}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.wins = {primary: 0, secondary: 0}
+        _registry[name] = self
+
+    def delay(self, provider: str | None = None) -> float:
+        """Seconds to wait for `provider` (default: the primary) before starting the other one."""
+        provider = provider or self.primary
+        samples = self.latency[provider].values() + self.failure_latency[provider].values()
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, _percentile(samples, self.percentile)))
+
+    def _start(self, race: _Race, provider: str, fn, output_path: str):
+        base, ext = os.path.splitext(output_path)
+        tmp = f"{base}.{provider}-{uuid.uuid4().hex[:8]}{ext}"
+
+        def attempt():
+            started = time.perf_counter()
+            try:
+                path = fn(tmp)
+            except Exception as e:
+                print(f"❌ {provider} attempt failed: {e}")
+                path = None
+            elapsed = time.perf_counter() - started
+            (self.latency if path else self.failure_latency)[provider].add(elapsed)
+            with race.lock:
+                if race.winner is None:
+                    race.results.put((provider, path, elapsed))
+                    return
+            _discard(path)
+
+        threading.Thread(target=attempt, name=f"hedge-{self.name}-{provider}", daemon=True).start()
+
+    def run(self, primary, secondary, output_path: str, first: str | None = None) -> str | None:
+        """
+        primary/secondary: fn(path) -> path | None, writing their result to `path`.
+        `first` names the provider to start with (default: the primary), e.g. the
+        one a router currently ranks best; the other is the hedge.
+        Returns output_path holding the winner's result, or None if both failed.
+        """
+        fns = {self.primary: primary, self.secondary: secondary}
+        lead = first or self.primary
+        backup = self.secondary if lead == self.primary else self.primary
+        with self._lock:
+            self.calls += 1
+        race = _Race()
+        started = time.perf_counter()
+        delay = self.delay(lead)
+        self._start(race, lead, fns[lead], output_path)
+        pending, secondary_started = 1, False
+
+        while pending:
+            timeout = None if secondary_started else max(0.0, delay - (time.perf_counter() - started))
+            try:
+                provider, path, elapsed = race.results.get(timeout=timeout)
+            except queue.Empty:
+                print(f"⏱️  {lead} slower than {delay:.1f}s — starting {backup} in parallel")
+                with self._lock:
+                    self.hedged += 1
+                self._start(race, backup, fns[backup], output_path)
+                pending, secondary_started = pending + 1, True
+                continue
+            pending -= 1
+
+            if path:
+                with race.lock:
+                    race.winner = provider
+                    while not race.results.empty():  # finished at the same moment: lost the race
+                        _discard(race.results.get_nowait()[1])
+                os.replace(path, output_path)
+                with self._lock:
+                    self.wins[provider] += 1
+                others = f", {pending} still running" if pending else ""
+                print(f"🏁 {provider} won in {elapsed:.1f}s (total {time.perf_counter() - started:.1f}s{others})")
+                return output_path
+
+            if not secondary_started:
+                print(f"🔁 {lead} failed — trying {backup}...")
+                with self._lock:
+                    self.fallbacks += 1
+                self._start(race, backup, fns[backup], output_path)
+                pending, secondary_started = pending + 1, True
+
+        with self._lock:
+            self.failures += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+            "wins": dict(self.wins),
+            "hedge_delay_s": round(self.delay(), 3),
+            "latency": {name: window.summary() for name, window in self.latency.items()},
+            "failure_latency": {name: window.summary() for name, window in self.failure_latency.items()},
+        }
+
+
+def all_stats() -> dict:
+    return {name: h.stats() for name, h in _registry.items()}
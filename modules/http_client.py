@@ -0,0 +1,156 @@
+# modules/http_client.py
+"""
+Shared provider HTTP clients.
+
+Every outbound provider call (Gemini, Stability, SerpAPI, ...) goes through
+a pooled keep-alive session so repeated calls to the same host reuse their
+TCP/TLS connection instead of paying a fresh handshake each time.
+
+Sync callers use `post()` / `get()`; async callers use `apost()` / `aget()`
+(httpx, optionally HTTP/2 when the `h2` package is installed).
+"""
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.utils import get_env
+
+try:
+    import httpx
+except ImportError:  # async variant is optional
+    httpx = None
+
+# --- Configuration ---
+POOL_MAXSIZE = int(get_env("HTTP_POOL_MAXSIZE", "10"))
+CONNECT_TIMEOUT = float(get_env("HTTP_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(get_env("HTTP_READ_TIMEOUT", "120"))
+HTTP2_ENABLED = get_env("HTTP2_ENABLED", "0") == "1"
+
+
+def _parse_pool_sizes(raw: str) -> dict[str, int]:
+    """Parses "host=size,host2=size2" into a dict."""
+    sizes = {}
+    for item in (raw or "").split(","):
+        host, _, size = item.partition("=")
+        if host.strip() and size.strip().isdigit():
+            sizes[host.strip().lower()] = int(size)
+    return sizes
+
+
+# Per-host pool sizes, e.g. HTTP_POOL_SIZES="generativelanguage.googleapis.com=20,serpapi.com=8"
+HOST_POOL_SIZES = _parse_pool_sizes(get_env("HTTP_POOL_SIZES", ""))
+
+_sessions: dict[str, requests.Session] = {}
+_async_clients: dict[tuple[int, str], "httpx.AsyncClient"] = {}
+_lock = threading.Lock()
+
+
+def configure_host(host: str, pool_maxsize: int):
+    """Overrides the pool size for one host. Applies to sessions created afterwards."""
+    with _lock:
+        HOST_POOL_SIZES[host.lower()] = pool_maxsize
+        _sessions.pop(host.lower(), None)
+
+
+def pool_size_for(host: str) -> int:
+    return HOST_POOL_SIZES.get((host or "").lower(), POOL_MAXSIZE)
+
+
+def _timeout(connect_timeout, read_timeout) -> tuple[float, float]:
+    return (
+        CONNECT_TIMEOUT if connect_timeout is None else connect_timeout,
+        READ_TIMEOUT if read_timeout is None else read_timeout,
+    )
+
+
+# === Sync (requests) ===
+def get_session(url: str) -> requests.Session:
+    """Returns the shared keep-alive session for the host of `url`."""
+    host = (urlsplit(url).hostname or "").lower()
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            size = pool_size_for(host)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=False)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+    return session
+
+
+def request(method: str, url: str, connect_timeout: float = None, read_timeout: float = None, **kwargs) -> requests.Response:
+    """Pooled equivalent of `requests.request` with separate connect/read timeouts."""
+    kwargs.setdefault("timeout", _timeout(connect_timeout, read_timeout))
+    return get_session(url).request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+# === Async (httpx) ===
+def get_async_client(url: str) -> "httpx.AsyncClient":
+    """Returns the shared AsyncClient for the host of `url` on the running event loop."""
+    if httpx is None:
+        raise RuntimeError("❌ httpx is not installed; async provider calls are unavailable.")
+    loop = asyncio.get_running_loop()
+    host = (urlsplit(url).hostname or "").lower()
+    key = (id(loop), host)
+    client = _async_clients.get(key)
+    if client is None or client.is_closed:
+        size = pool_size_for(host)
+        client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED and _h2_available(),
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+        )
+        _async_clients[key] = client
+    return client
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def arequest(method: str, url: str, connect_timeout: float = None, read_timeout: float = None, **kwargs) -> "httpx.Response":
+    """Pooled async request with separate connect/read timeouts."""
+    connect, read = _timeout(connect_timeout, read_timeout)
+    kwargs.setdefault("timeout", httpx.Timeout(read, connect=connect))
+    return await get_async_client(url).request(method, url, **kwargs)
+
+
+async def aget(url: str, **kwargs) -> "httpx.Response":
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> "httpx.Response":
+    return await arequest("POST", url, **kwargs)
+
+
+async def aclose_all():
+    """Closes the async clients bound to the running event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _async_clients if k[0] == loop_id]:
+        await _async_clients.pop(key).aclose()
+
+
+def close_all():
+    """Closes every pooled sync session (e.g. on server shutdown)."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
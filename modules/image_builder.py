@@ -5,10 +5,17 @@ from modules import text_generator as tg
 from modules.image_generator import (
     generate_dynamic_background_prompt,
     analyze_design_mood,
+    plan_motivational_post,
 )
 from modules.google_image import generate_image, generate_image_with_text
 from modules.typography_engine import render_quote_on_image
-from modules.utils import print_header
+from modules.background_library import select_background
+from modules.utils import print_header, get_env
+
+# "fused" = one structured planning call, "legacy" = quote → mood → subject → scene chain
+POST_PLANNING_MODE = get_env("POST_PLANNING_MODE", "fused")
+# "model" = image model draws the scene and text, "fast" = local typography on a library background
+POST_IMAGE_MODE = get_env("POST_IMAGE_MODE", "model")
 
 
 def _safe_generate_quote(topic: str) -> str:
@@ -21,12 +28,10 @@ def _safe_generate_quote(topic: str) -> str:
         f"Write a short, ORIGINAL motivational quote about '{topic}'. "
         f"Return ONLY the quote."
     )
-    return (tg._gemini_call(prompt) or "Keep moving forward.").strip('"')
-
+    return (tg._gemini_call(prompt, cache=False) or "Keep moving forward.").strip('"')
 
-def generate_final_post_image(user_topic: str):
-    run_id = uuid.uuid4().hex[:8]
 
+def _plan_post_legacy(user_topic: str) -> tuple[str, str, str]:
     print_header("Generating Powerful Quote")
     quote = _safe_generate_quote(user_topic)
 
@@ -37,6 +42,47 @@ def generate_final_post_image(user_topic: str):
     theme_prompt = generate_dynamic_background_prompt(
         quote, user_topic, mood
     )
+    return quote, mood, theme_prompt
+
+
+def plan_post(user_topic: str, planning: str | None = None) -> tuple[str, str, str]:
+    """
+    Returns (quote, mood, scene prompt). Fused mode makes one structured call and
+    falls back to the legacy per-step chain only if its output fails validation.
+    """
+    if (planning or POST_PLANNING_MODE) == "fused":
+        print_header("Planning Quote, Mood & Scene (fused)")
+        plan = plan_motivational_post(user_topic)
+        if plan:
+            return plan["quote"], plan["mood"], plan["scene"]
+        print("⚠️ Fused planning response failed validation; using step-by-step chain.")
+    return _plan_post_legacy(user_topic)
+
+
+def _render_from_library(user_topic: str, quote: str, mood: str, output_path: str) -> str | None:
+    """Fast mode: quote typeset locally on a pre-generated background; None if the library is empty or rendering fails."""
+    background = select_background(quote, mood, user_topic)
+    if not background:
+        print("⚠️ Background library is empty; falling back to the image model.")
+        return None
+    print(f"🖼️ Using library background #{background.id} ({background.mood}: {background.subject})")
+    try:
+        return render_quote_on_image(background.path, quote, mood, output_path)
+    except Exception as e:
+        print(f"⚠️ Rendering on library background failed ({e}); falling back to the image model.")
+        return None
+
+
+def generate_final_post_image(user_topic: str, planning: str | None = None, fast: bool | None = None):
+    run_id = uuid.uuid4().hex[:8]
+
+    quote, mood, theme_prompt = plan_post(user_topic, planning)
+
+    if fast if fast is not None else POST_IMAGE_MODE == "fast":
+        print_header("Rendering Quote on Library Background (fast)")
+        final_path = _render_from_library(user_topic, quote, mood, f"generated/quote_{run_id}.png")
+        if final_path:
+            return final_path, quote
 
     print_header("Creating Image with Embedded Text using Gemini")
     
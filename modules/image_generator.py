@@ -1,5 +1,6 @@
 # modules/image_generator.py
 
+import json
 from modules.text_generator import _gemini_call
 from modules.google_image import generate_image # Make sure you have this import if needed elsewhere
 
@@ -48,6 +49,69 @@ def generate_dynamic_background_prompt(quote_text: str, topic: str, mood: str) -
     return scene or f"{subject}, cinematic lighting, {mood} atmosphere, no text"
 
 
+# --- Fused planning: quote + mood + subject + scene in ONE structured call ---
+_POST_PLAN_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "quote": {"type": "STRING"},
+        "mood": {"type": "STRING", "enum": sorted(_VALID_MOODS)},
+        "visual_subject": {"type": "STRING"},
+        "scene": {"type": "STRING"},
+    },
+    "required": ["quote", "mood", "visual_subject", "scene"],
+}
+
+
+def plan_motivational_post(topic: str) -> dict | None:
+    """
+    Returns {quote, mood, visual_subject, scene} from a single JSON-schema-constrained
+    Gemini call, or None if the response fails local validation.
+    """
+    prompt = (
+        "You are a world-class author and art director planning a motivational poster.\n"
+        f"Topic: {topic}\n"
+        "1. quote: a short, ORIGINAL motivational quote about the topic. Avoid clichés and author names.\n"
+        "2. mood: the emotional tone of the quote, ONE of: calm, hopeful, powerful, creative, elegant, intense.\n"
+        "3. visual_subject: ONE concrete (not abstract) visual subject for the quote, <= 12 words "
+        "(e.g. 'mountain climber at sunrise', 'runner in rain').\n"
+        "4. scene: one concise line describing a vivid background scene with that subject and mood, "
+        "with realistic environment/lighting. No text or typography.\n"
+        "Return JSON only."
+    )
+    out = _gemini_call(
+        prompt,
+        generation_config={"responseMimeType": "application/json", "responseSchema": _POST_PLAN_SCHEMA},
+        cache=False,
+    )
+    return validate_post_plan(out)
+
+
+def validate_post_plan(raw: str) -> dict | None:
+    """Local validation of the fused planning response."""
+    try:
+        data = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    fields = {}
+    for name in ("quote", "mood", "visual_subject", "scene"):
+        value = data.get(name)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        fields[name] = value.strip()
+
+    quote = fields["quote"]
+    if quote.startswith(("\"", "“")) and quote.endswith(("\"", "”")) and len(quote) > 2:
+        quote = quote[1:-1].strip()
+    mood = fields["mood"].lower()
+    subject = fields["visual_subject"].strip('"')
+    if not quote or len(quote) > 300 or mood not in _VALID_MOODS or len(subject.split()) > 12:
+        return None
+    return {"quote": quote, "mood": mood, "visual_subject": subject, "scene": fields["scene"]}
+
+
 def generate_section_image(topic: str, description: str, context: str, output_path: str) -> str | None:
     """
     Generates an image for a blog section based on a detailed prompt.
@@ -0,0 +1,280 @@
+# modules/provider_router.py
+"""
+Latency-aware routing across interchangeable providers/models.
+
+Each Router holds the providers for one kind of call (text, image) with a
+quality tier ("fast" < "standard" < "high"). For every call it ranks the
+providers that meet the requested tier by health:
+
+    score = EWMA latency × (1 + 5 × EWMA error rate + 5 × EWMA timeout rate)
+
+and tries them in that order. Providers without a successful call yet keep
+their registration order after the measured ones.
+
+A circuit breaker quarantines a provider after ROUTER_BREAKER_FAILURES
+consecutive failures (or an error rate above ROUTER_BREAKER_ERROR_RATE).
+After ROUTER_BREAKER_COOLDOWN seconds it is half-open: one real call is let
+through as a probe, ranked first so recovery is noticed, and a failed probe
+simply falls through to the next provider. Client errors (4xx other than 429)
+are the caller's fault and do not count against a provider.
+
+With `explore_every` = N, every Nth ranking puts the lowest-ranked provider
+first, so a provider that lost the ranking once still gets fresh samples
+(its callers should hedge or fail over, as google_image does).
+"""
+import threading
+import time
+from collections import deque
+
+import requests
+
+from modules.utils import get_env
+
+ROUTER_EWMA_ALPHA = float(get_env("ROUTER_EWMA_ALPHA", "0.2"))
+ROUTER_BREAKER_FAILURES = int(get_env("ROUTER_BREAKER_FAILURES", "5"))
+ROUTER_BREAKER_ERROR_RATE = float(get_env("ROUTER_BREAKER_ERROR_RATE", "0.5"))
+ROUTER_BREAKER_MIN_CALLS = int(get_env("ROUTER_BREAKER_MIN_CALLS", "10"))
+ROUTER_BREAKER_COOLDOWN = float(get_env("ROUTER_BREAKER_COOLDOWN", "30"))
+ROUTER_EXPLORE_EVERY = int(get_env("ROUTER_EXPLORE_EVERY", "0"))
+
+TIERS = {"fast": 1, "standard": 2, "high": 3}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_registry: dict[str, "Router"] = {}
+
+
+class ProviderError(Exception):
+    """A provider call that failed; `status` is the HTTP status when there was one."""
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+class NoProviderAvailable(ProviderError):
+    pass
+
+
+def is_timeout(error: BaseException) -> bool:
+    return isinstance(error, (TimeoutError, requests.Timeout)) or type(error).__name__.endswith("TimeoutException")
+
+
+class _Provider:
+    def __init__(self, name: str, quality: str, order: int):
+        if quality not in TIERS:
+            raise ValueError(f"Unknown quality tier '{quality}'. Expected one of: {', '.join(TIERS)}")
+        self.name = name
+        self.quality = quality
+        self.order = order
+        self.latency = None  # EWMA seconds of successful calls
+        self.error_rate = 0.0
+        self.timeout_rate = 0.0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.consecutive_failures = 0
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.quarantines = 0
+
+    def score(self) -> float:
+        if self.latency is None:
+            return float("inf")
+        return self.latency * (1 + 5 * self.error_rate + 5 * self.timeout_rate)
+
+    def stats(self) -> dict:
+        return {
+            "quality": self.quality,
+            "state": self.state,
+            "ewma_latency_s": None if self.latency is None else round(self.latency, 3),
+            "error_rate": round(self.error_rate, 3),
+            "timeout_rate": round(self.timeout_rate, 3),
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "quarantines": self.quarantines,
+        }
+
+
+class Router:
+    def __init__(self, kind: str, alpha: float = None, breaker_failures: int = None,
+                 breaker_error_rate: float = None, breaker_min_calls: int = None, cooldown: float = None,
+                 explore_every: int = None):
+        self.kind = kind
+        self.alpha = ROUTER_EWMA_ALPHA if alpha is None else alpha
+        self.breaker_failures = ROUTER_BREAKER_FAILURES if breaker_failures is None else breaker_failures
+        self.breaker_error_rate = ROUTER_BREAKER_ERROR_RATE if breaker_error_rate is None else breaker_error_rate
+        self.breaker_min_calls = ROUTER_BREAKER_MIN_CALLS if breaker_min_calls is None else breaker_min_calls
+        self.cooldown = ROUTER_BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.explore_every = ROUTER_EXPLORE_EVERY if explore_every is None else explore_every
+        self._rankings = 0
+        self._providers: dict[str, _Provider] = {}
+        self._lock = threading.Lock()
+        self.decisions = deque(maxlen=50)
+        _registry[kind] = self
+
+    def register(self, name: str, quality: str = "standard"):
+        with self._lock:
+            if name not in self._providers:
+                self._providers[name] = _Provider(name, quality, len(self._providers))
+
+    def _refresh(self, p: _Provider, now: float):
+        if p.state == OPEN and now - p.opened_at >= self.cooldown:
+            p.state, p.probing = HALF_OPEN, False
+
+    def candidates(self, tier: str = "standard") -> list[str]:
+        """Providers meeting `tier`, best first. Quarantined ones are left out."""
+        need = TIERS[tier]
+        now = time.monotonic()
+        with self._lock:
+            ready = []
+            for p in self._providers.values():
+                self._refresh(p, now)
+                if TIERS[p.quality] < need or p.state == OPEN or (p.state == HALF_OPEN and p.probing):
+                    continue
+                ready.append(p)
+            ready.sort(key=lambda p: (p.state != HALF_OPEN, p.score(), p.order))
+            order = [p.name for p in ready]
+            self._rankings += 1
+            explore = (self.explore_every > 0 and len(order) > 1 and ready[0].state != HALF_OPEN
+                       and self._rankings % self.explore_every == 0)
+            if explore:
+                order = order[-1:] + order[:-1]
+        decision = {"time": round(time.time(), 3), "tier": tier, "order": order}
+        if explore:
+            decision["explore"] = True
+        self.decisions.append(decision)
+        return order
+
+    def acquire(self, name: str) -> bool:
+        """Whether `name` may be called now; claims the probe slot of a half-open provider."""
+        with self._lock:
+            p = self._providers[name]
+            self._refresh(p, time.monotonic())
+            if p.state == OPEN or (p.state == HALF_OPEN and p.probing):
+                return False
+            if p.state == HALF_OPEN:
+                p.probing = True
+            return True
+
+    def release(self, name: str):
+        """Gives back a probe slot without a verdict (e.g. the caller's own error)."""
+        with self._lock:
+            self._providers[name].probing = False
+
+    def record(self, name: str, elapsed: float, ok: bool, timeout: bool = False):
+        a = self.alpha
+        with self._lock:
+            p = self._providers[name]
+            p.calls += 1
+            p.error_rate = (1 - a) * p.error_rate + a * (0.0 if ok else 1.0)
+            p.timeout_rate = (1 - a) * p.timeout_rate + a * (1.0 if timeout else 0.0)
+            if ok:
+                p.latency = elapsed if p.latency is None else (1 - a) * p.latency + a * elapsed
+                p.consecutive_failures = 0
+                if p.state != CLOSED:
+                    print(f"✅ {self.kind} provider {name} recovered; closing its circuit")
+                p.state, p.probing = CLOSED, False
+                return
+            p.failures += 1
+            p.timeouts += timeout
+            p.consecutive_failures += 1
+            tripped = p.consecutive_failures >= self.breaker_failures or (
+                p.calls >= self.breaker_min_calls and p.error_rate > self.breaker_error_rate)
+            if p.state == HALF_OPEN or (p.state == CLOSED and tripped):
+                if p.state == CLOSED:
+                    p.quarantines += 1
+                    print(f"⛔ {self.kind} provider {name} quarantined for {self.cooldown:.0f}s "
+                          f"({p.consecutive_failures} consecutive failures, error rate {p.error_rate:.2f})")
+                p.state, p.opened_at, p.probing = OPEN, time.monotonic(), False
+
+    def _attempt(self, name: str, fn, *args, **kwargs):
+        """Runs fn once against `name`, recording the outcome. Raises what fn raised."""
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except ProviderError as e:
+            if not e.retryable:
+                self.release(name)
+                raise
+            self.record(name, time.perf_counter() - started, ok=False)
+            raise
+        except Exception as e:
+            self.record(name, time.perf_counter() - started, ok=False, timeout=is_timeout(e))
+            raise
+        self.record(name, time.perf_counter() - started, ok=result is not None)
+        return result
+
+    def call(self, fn, tier: str = "standard", pinned: str | None = None):
+        """
+        fn(provider_name) -> result, raising on failure. Tries providers best first
+        (only `pinned` if given) and returns the first result.
+        """
+        if pinned:
+            self.register(pinned)
+        order = [pinned] if pinned else self.candidates(tier)
+        last_error = None
+        for name in order:
+            if not self.acquire(name):
+                continue
+            try:
+                result = self._attempt(name, fn, name)
+            except ProviderError as e:
+                if not e.retryable:
+                    raise
+                last_error = e
+            except Exception as e:
+                last_error = e
+            else:
+                if self.decisions and not pinned:
+                    self.decisions[-1]["chosen"] = name
+                return result
+            print(f"⚠️  {self.kind} provider {name} failed ({last_error}); trying next")
+        if last_error is not None:
+            raise last_error
+        raise NoProviderAvailable(f"No healthy {self.kind} provider for tier '{tier}'")
+
+    def observe(self, name: str, fn):
+        """
+        Wraps fn(*args) -> result | None so calls through it feed `name`'s health.
+        A quarantined provider is skipped (returns None); exceptions count as
+        failures (timeouts separately) and also come back as None.
+        """
+        self.register(name)
+
+        def wrapper(*args, **kwargs):
+            if not self.acquire(name):
+                print(f"⛔ {self.kind} provider {name} is quarantined; skipping")
+                return None
+            try:
+                return self._attempt(name, fn, *args, **kwargs)
+            except Exception as e:
+                print(f"❌ {self.kind} provider {name} failed: {e}")
+                return None
+
+        return wrapper
+
+    def stats(self) -> dict:
+        with self._lock:
+            providers = {name: p.stats() for name, p in self._providers.items()}
+        return {"providers": providers, "recent_decisions": list(self.decisions)[-10:]}
+
+
+def parse_providers(raw: str) -> list[tuple[str, str]]:
+    """Parses "model:tier,model2:tier2" (tier defaults to standard)."""
+    out = []
+    for item in (raw or "").split(","):
+        name, _, tier = item.strip().partition(":")
+        if name:
+            out.append((name, tier.strip() or "standard"))
+    return out
+
+
+def all_stats() -> dict:
+    return {kind: router.stats() for kind, router in _registry.items()}
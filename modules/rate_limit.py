@@ -0,0 +1,35 @@
+# modules/rate_limit.py
+"""
+Thread-safe token-bucket rate limiter shared by everything that calls a provider.
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    def __init__(self, rate_per_sec: float, burst: int | None = None, clock=time.monotonic, sleep=time.sleep):
+        """rate_per_sec <= 0 disables limiting. `clock`/`sleep` are injectable for tests."""
+        self.rate = rate_per_sec
+        self.capacity = float(burst or max(1, int(rate_per_sec)))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1 - 1e-9:  # tolerate float rounding of the refill
+                    self._tokens = max(0.0, self._tokens - 1)
+                    return
+                wait = (1 - self._tokens) / self.rate
+                self.waited_seconds += wait
+            self._sleep(wait)
@@ -56,4 +56,6 @@ def _guess_content_type(filename: str) -> str:
     if filename.endswith(".png"): return "image/png"
     if filename.endswith(".jpg") or filename.endswith(".jpeg"): return "image/jpeg"
     if filename.endswith(".docx"): return "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    if filename.endswith(".md"): return "text/markdown; charset=utf-8"
+    if filename.endswith(".html"): return "text/html; charset=utf-8"
     return "application/octet-stream"
\ No newline at end of file
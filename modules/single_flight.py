@@ -0,0 +1,80 @@
+# modules/single_flight.py
+"""
+Single-flight request coalescing.
+
+When several threads (e.g. the FastAPI threadpool) ask for the same key at the
+same time, only the first one runs the upstream call; the others wait for it
+and receive the same result (or the same exception).
+"""
+import threading
+
+_registry: dict[str, "SingleFlight"] = {}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self.requests = 0
+        self.executions = 0
+        self.collapsed = 0
+        _registry[name] = self
+
+    def do(self, key: str, fn):
+        """
+        Runs fn() once per concurrent `key`.
+        Returns (result, shared) where shared is True if this caller reused another's call.
+        """
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.collapsed += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "upstream_calls": self.executions,
+                "collapsed": self.collapsed,
+                "in_flight": len(self._calls),
+            }
+
+
+def all_stats() -> dict:
+    return {name: flight.stats() for name, flight in _registry.items()}
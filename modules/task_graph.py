@@ -0,0 +1,141 @@
+# modules/task_graph.py
+"""
+Minimal dependency-graph executor.
+
+Each node is `fn(*dep_results)` and starts as soon as all of its dependencies
+have finished, on a bounded thread pool. Nodes may add further nodes while
+they run (e.g. one node per outline section once the outline exists); such
+spawned nodes also wait for the node that created them to finish, without
+receiving its result. A dependency may name a node that does not exist yet;
+it is satisfied once that node is added and finishes.
+
+After `run()`, `report()` returns per-node timings and the critical path.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Node:
+    __slots__ = ("name", "fn", "deps", "after", "start", "end", "result", "error")
+
+    def __init__(self, name, fn, deps, after=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        # spawning node: ordering only, its result is not passed to fn
+        self.after = after
+        self.start = None
+        self.end = None
+        self.result = None
+        self.error = None
+
+
+class TaskGraph:
+    def __init__(self, max_workers: int = 4, name: str = "pipeline"):
+        self.name = name
+        self.max_workers = max_workers
+        self._nodes: dict[str, _Node] = {}
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._running = 0
+        self._t0 = None
+        self._t1 = None
+
+    def add(self, name: str, fn, deps=()):
+        """Adds a node. Safe to call from inside a running node."""
+        parent = getattr(self._local, "current", None)
+        with self._cond:
+            if name in self._nodes:
+                raise ValueError(f"Duplicate task '{name}' in {self.name}")
+            self._nodes[name] = _Node(name, fn, deps, after=parent)
+            self._cond.notify_all()
+
+    @staticmethod
+    def _waits_on(node: _Node) -> tuple:
+        return node.deps + ((node.after,) if node.after else ())
+
+    def _ready(self) -> list[_Node]:
+        ready = []
+        for node in self._nodes.values():
+            if node.start is not None:
+                continue
+            deps = [self._nodes.get(d) for d in self._waits_on(node)]
+            if all(d is not None and d.end is not None for d in deps):
+                ready.append(node)
+        return ready
+
+    def _execute(self, node: _Node):
+        self._local.current = node.name
+        try:
+            args = [self._nodes[d].result for d in node.deps]
+            node.result = node.fn(*args)
+        except Exception as e:
+            node.error = e
+        finally:
+            self._local.current = None
+            with self._cond:
+                node.end = time.perf_counter()
+                self._running -= 1
+                self._cond.notify_all()
+
+    def run(self) -> dict:
+        """Runs until every node has finished. Returns {name: result}."""
+        self._t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as pool:
+            with self._cond:
+                while True:
+                    failed = next((n for n in self._nodes.values() if n.error is not None), None)
+                    if failed is None:
+                        for node in self._ready():
+                            node.start = time.perf_counter()
+                            self._running += 1
+                            pool.submit(self._execute, node)
+                    if self._running == 0:
+                        break
+                    self._cond.wait()
+        self._t1 = time.perf_counter()
+
+        failed = next((n for n in self._nodes.values() if n.error is not None), None)
+        if failed is not None:
+            raise RuntimeError(f"Task '{failed.name}' failed in {self.name}: {failed.error}") from failed.error
+        stuck = [n.name for n in self._nodes.values() if n.end is None]
+        if stuck:
+            raise RuntimeError(f"Tasks with unsatisfied dependencies in {self.name}: {', '.join(stuck)}")
+        return {name: node.result for name, node in self._nodes.items()}
+
+    def critical_path(self) -> list[str]:
+        """Chain of nodes that gated the finish: from the last node back through its latest-finishing dependency."""
+        done = [n for n in self._nodes.values() if n.end is not None]
+        if not done:
+            return []
+        node = max(done, key=lambda n: n.end)
+        path = [node.name]
+        while self._waits_on(node):
+            node = max((self._nodes[d] for d in self._waits_on(node)), key=lambda n: n.end)
+            path.append(node.name)
+        return path[::-1]
+
+    def report(self) -> dict:
+        nodes = {
+            n.name: {
+                "start": round(n.start - self._t0, 3),
+                "seconds": round(n.end - n.start, 3),
+                "deps": list(n.deps),
+            }
+            for n in self._nodes.values() if n.end is not None
+        }
+        path = self.critical_path()
+        return {
+            "wall_seconds": round((self._t1 or time.perf_counter()) - self._t0, 3),
+            "critical_path": [{"task": name, "seconds": nodes[name]["seconds"]} for name in path],
+            "critical_path_seconds": round(sum(nodes[name]["seconds"] for name in path), 3),
+            "tasks": nodes,
+        }
+
+    def print_report(self):
+        rep = self.report()
+        print(f"⏱  {self.name}: {len(rep['tasks'])} tasks in {rep['wall_seconds']:.2f}s wall, "
+              f"critical path {rep['critical_path_seconds']:.2f}s:")
+        for step in rep["critical_path"]:
+            print(f"   {step['seconds']:7.2f}s  {step['task']}")
@@ -1,45 +1,117 @@
 import json
-import requests
+from typing import Callable
+
+from modules import http_client
+from modules.disk_cache import DiskCache, make_key
+from modules.provider_router import ProviderError, Router, parse_providers
+from modules.rate_limit import RateLimiter
+from modules.single_flight import SingleFlight
 from modules.utils import get_env
 
 GEMINI_API_KEY = get_env("GEMINI_API_KEY")
+GEMINI_API_BASE = get_env("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
 BRAND_VOICE = get_env("BRAND_VOICE", "Insightful, clear, visionary.")
 DEFAULT_LANGUAGE = get_env("DEFAULT_LANGUAGE", "en")
 
-def _gemini_call(prompt: str, model: str = "gemini-2.0-flash") -> str:
+# --- Response cache (shared by all worker processes via SQLite WAL) ---
+LLM_CACHE_ENABLED = get_env("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE = DiskCache(
+    get_env("LLM_CACHE_PATH", "generated/cache/llm_cache.db"),
+    table="llm_responses",
+    ttl=float(get_env("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+    max_entries=int(get_env("LLM_CACHE_MAX_ENTRIES", "5000")),
+)
+# Concurrent identical calls share one upstream request
+GEMINI_FLIGHT = SingleFlight("gemini_text")
+# Process-wide cap on upstream Gemini text requests (0 disables)
+GEMINI_RATE_LIMITER = RateLimiter(float(get_env("GEMINI_MAX_RPS", "5")))
+
+# Text models the router may pick from ("model:tier", tiers fast < standard < high)
+TEXT_PROVIDERS = get_env("TEXT_PROVIDERS", "gemini-2.0-flash:standard,gemini-2.5-flash:high")
+TEXT_ROUTER = Router("text")
+for _name, _tier in parse_providers(TEXT_PROVIDERS):
+    TEXT_ROUTER.register(_name, _tier)
+
+def _gemini_call(prompt: str, model: str | None = None, generation_config: dict | None = None, cache: bool = True,
+                 tier: str = "standard", validate: Callable[[str], bool] | None = None) -> str:
+    """
+    Single Gemini text call, routed to the healthiest model meeting `tier` unless
+    `model` pins one. Identical (model or tier, prompt, generation_config) calls are
+    answered from the response cache; pass cache=False for prompts that should stay creative.
+    With `validate`, only responses it accepts are cached or served from the cache, so
+    a caller's retry after a bad response reaches the model again.
+    Identical calls already in flight are coalesced into one request either way.
+    """
     if not GEMINI_API_KEY:
         raise RuntimeError("❌ GEMINI_API_KEY missing in .env")
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+    key = make_key(model or f"tier:{tier}", prompt, generation_config)
+    use_cache = cache and LLM_CACHE_ENABLED
+    if use_cache:
+        hit = LLM_CACHE.get(key)
+        if hit is not None and (validate is None or validate(hit)):
+            return hit
+
+    def _fetch() -> str:
+        text = _gemini_request(prompt, model, generation_config, tier)
+        if use_cache and text and (validate is None or validate(text)):
+            LLM_CACHE.set(key, text, meta={"model": model or tier, "prompt": prompt[:80]})
+        return text
+
+    text, _ = GEMINI_FLIGHT.do(key, _fetch)
+    return text
+
+def _gemini_request(prompt: str, model: str | None, generation_config: dict | None = None, tier: str = "standard") -> str:
+    try:
+        return TEXT_ROUTER.call(lambda m: gemini_text_attempt(prompt, m, generation_config), tier=tier, pinned=model)
+    except Exception as e:
+        print("❌ Gemini request failed:", e); return ""
+
+def gemini_text_attempt(prompt: str, model: str, generation_config: dict | None = None) -> str:
+    """One generateContent request to `model`; raises ProviderError (with the status) on failure."""
+    url = f"{GEMINI_API_BASE}/models/{model}:generateContent"
     headers = {"Content-Type": "application/json"}
     payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    if generation_config:
+        payload["generationConfig"] = generation_config
     params = {"key": GEMINI_API_KEY}
+    GEMINI_RATE_LIMITER.acquire()
+    r = http_client.post(url, headers=headers, params=params, json=payload, read_timeout=120)
+    if r.status_code != 200:
+        raise ProviderError(f"Gemini error {r.status_code} from {model}: {r.text[:200]}", r.status_code)
+    data = r.json()
     try:
-        r = requests.post(url, headers=headers, params=params, json=payload, timeout=120)
-        if r.status_code != 200:
-            print("❌ Gemini error:", r.text); return ""
-        data = r.json()
         return data["candidates"][0]["content"]["parts"][0]["text"].strip()
-    except Exception as e:
-        print("❌ Gemini request failed:", e); return ""
+    except (KeyError, IndexError, TypeError):
+        raise ProviderError(f"Gemini returned no text from {model}")
+
+def llm_cache_stats() -> dict:
+    return {"enabled": LLM_CACHE_ENABLED, **LLM_CACHE.stats()}
 
 # === Motivational ===
 def generate_powerful_quote(topic: str) -> str:
     p = ("You are a world-class author. Write a short, ORIGINAL motivational quote about "
          f"'{topic}'. Avoid clichés and author names. Only the quote.")
-    t = _gemini_call(p).strip()
+    t = _gemini_call(p, cache=False).strip()
     if t.startswith(("\"", "“")) and t.endswith(("\"", "”")) and len(t) > 2: t = t[1:-1].strip()
     return t or f"Keep pushing forward with {topic} in mind."
 
 def generate_caption(platform: str, topic: str, tone: str = "motivational") -> str:
     p = (f"You are a social copywriter.\nPlatform: {platform}\nTopic: {topic}\nTone: {tone}\n"
          f"Brand voice: {BRAND_VOICE}\nWrite 1–3 lines, no hashtags.")
-    return _gemini_call(p).strip() or f"{topic} — make it happen."
+    return _gemini_call(p, cache=False).strip() or f"{topic} — make it happen."
 
 # === Blog Planning/Writing ===
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
 def plan_blog_outline(topic: str) -> dict:
     p = ("Plan a Medium-style blog outline for the topic below.\n"
          f"Topic: {topic}\nOutput JSON: {{title, sections:[{{heading, summary}}], target_audience, tone}}.")
-    out = _gemini_call(p)
+    out = _gemini_call(p, validate=_is_json)
     try: return json.loads(out)
     except: 
         return {
@@ -69,8 +141,11 @@ def suggest_contextual_cover_prompt(topic: str, plan: dict) -> str:
          "Avoid abstract words. No text overlays.\n" + summaries)
     return _gemini_call(p).strip()
 
-def validate_mermaid_code(code: str, topic: str) -> str:
+def validate_mermaid_code(code: str, topic: str, problems: list[str] | None = None) -> str:
+    found = "".join(f"- {p}\n" for p in problems or [])
     p = ("You are a software architect. Review the Mermaid diagram below for correctness about the topic.\n"
-         f"Topic: {topic}\nDiagram:\n{code}\nOutput corrected Mermaid code starting with 'graph'.")
-    out = _gemini_call(p).strip()
+         f"Topic: {topic}\nDiagram:\n{code}\n"
+         + (f"Problems found:\n{found}" if found else "")
+         + "Output corrected Mermaid code starting with 'graph'.")
+    out = _gemini_call(p).strip().removeprefix("```mermaid").removeprefix("```").removesuffix("```").strip()
     return out if out.startswith("graph") else code
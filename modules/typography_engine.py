@@ -1,12 +1,13 @@
 import os
 from textwrap import wrap
-from PIL import Image, ImageDraw, ImageFont, ImageEnhance, ImageFilter
-from .utils import ensure_dir, image_luminance
+from PIL import Image, ImageChops, ImageDraw, ImageEnhance, ImageFilter
+from . import asset_cache
+from .utils import ensure_dir, get_env, image_luminance
 
-# --- Define Project Root to find assets/logo.jpg ---
-# This makes the path robust, finding D:\Marketing Agent\assets\logo.jpg
-PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-LOGO_PATH = os.path.join(PROJECT_ROOT, "assets", "logo.jpg")
+# --- Project root (this file lives in <root>/modules) to find the logo ---
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LOGO_PATH = get_env("LOGO_PATH", os.path.join(PROJECT_ROOT, "assests", "logo.jpg"))
+BRAND_TEXT = "@aiwithsid | http://grwothbrothers.in"
 
 # Font paths
 FONT_PATHS = {
@@ -49,11 +50,28 @@ MOOD_STYLES = {
 }
 
 def _load_font(family: str, size: int):
-    font_path = FONT_PATHS.get(family, "arial.ttf")
-    try:
-        return ImageFont.truetype(font_path, size)
-    except:
-        return ImageFont.load_default()
+    return asset_cache.get_font(FONT_PATHS.get(family, "arial.ttf"), size)
+
+def _quote_font_size(style: dict) -> int:
+    return int(style["base_size"] * 1.20)  # Consistent large sizing
+
+def _brand_font_size(height: int) -> int:
+    return max(28, int(height * 0.045))  # Larger for better visibility
+
+def _logo_height(height: int) -> int:
+    return int(height * 0.05)
+
+def warm_assets(heights=(1024, 1080)):
+    """
+    Preloads every mood's quote font and, for each output height, the brand
+    font and the scaled logo, so the first renders after startup hit the cache.
+    """
+    fonts = {(FONT_PATHS.get(s["font_family"], "arial.ttf"), _quote_font_size(s)) for s in MOOD_STYLES.values()}
+    fonts |= {(FONT_PATHS["sans"], _brand_font_size(h)) for h in heights}
+    asset_cache.warm(sorted(fonts), [(LOGO_PATH, _logo_height(h)) for h in heights])
+    for h in heights:
+        asset_cache.text_bbox(FONT_PATHS["sans"], _brand_font_size(h), BRAND_TEXT)
+    return asset_cache.stats()
 
 def _auto_color_for_background(img, preferred_rgb):
     lum = image_luminance(img)
@@ -61,17 +79,64 @@ def _auto_color_for_background(img, preferred_rgb):
     elif lum < 80: return (255, 255, 255)
     return preferred_rgb
 
-def _apply_fake_style(draw, x, y, text, font, color, bold, italic, align, spacing=8):
+def _italic_positions(x, y, text, font, spacing):
+    # Fake italic: each line nudged one more pixel right, left-aligned
+    return [((x + 2 + i, y + i * (font.size + spacing)), line) for i, line in enumerate(text.split("\n"))]
+
+def _dilate(mask, radius: int):
+    """
+    Square (2r+1)² max filter of an "L" mask, done separably with doubling
+    shifts: ~2·log2(2r+1) lighter() passes instead of MaxFilter's (2r+1)²
+    comparisons per pixel. The mask needs `radius` pixels of empty margin.
+    """
+    span = 2 * radius + 1
+    for axis in (0, 1):
+        covered = 1
+        while covered < span:
+            step = min(covered, span - covered)
+            mask = ImageChops.lighter(mask, ImageChops.offset(mask, step if axis == 0 else 0, step if axis == 1 else 0))
+            covered += step
+    return ImageChops.offset(mask, -radius, -radius)
+
+def _draw_outlined_text(img, x, y, text, font, color, outline_color, outline_width, bold, italic, spacing=12):
+    """
+    Draws centred multiline text with a square outline in one composite.
+
+    The text is rasterized once into a mask over just its own region; the
+    outline is that mask dilated by a (2w+1)² square, the same shape the
+    old per-offset redraw loop produced, and fake bold is the mask OR-ed with
+    its 1px shifts. Two pastes then put outline and fill onto the image.
+    """
+    draw = ImageDraw.Draw(img)
+    left, top, right, bottom = draw.multiline_textbbox((x, y), text, font=font, align="center", spacing=spacing)
+    lines = _italic_positions(x, y, text, font, spacing) if italic else []
+    for pos, line in lines:
+        l, t, r, b = draw.textbbox(pos, line, font=font)
+        left, top, right, bottom = min(left, l), min(top, t), max(right, r), max(bottom, b)
+    pad = outline_width + 2
+    left, top = int(left) - pad, int(top) - pad
+    size = (int(right) + pad + 1 - left, int(bottom) + pad + 1 - top)
+    box = (left, top, left + size[0], top + size[1])
+
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).multiline_text((x - left, y - top), text, font=font, fill=255, align="center", spacing=spacing)
+    outline = _dilate(mask, outline_width) if outline_width else None
+
     if italic:
-        offset = 2
-        for i, line in enumerate(text.split("\n")):
-            draw.text((x + offset, y + i * (font.size + spacing)), line, font=font, fill=color, align=align)
-            offset += 1
+        fill = Image.new("L", size, 0)
+        fill_draw = ImageDraw.Draw(fill)
+        for (lx, ly), line in lines:
+            fill_draw.text((lx - left, ly - top), line, font=font, fill=255)
     elif bold:
-        for dx, dy in [(0, 0), (1, 0), (0, 1), (1, 1)]:
-            draw.multiline_text((x + dx, y + dy), text, font=font, fill=color, align=align, spacing=spacing)
+        fill = mask
+        for dx, dy in ((1, 0), (0, 1), (1, 1)):
+            fill = ImageChops.lighter(fill, ImageChops.offset(mask, dx, dy))
     else:
-        draw.multiline_text((x, y), text, font=font, fill=color, align=align, spacing=spacing)
+        fill = mask
+
+    if outline is not None:
+        img.paste(outline_color, box, outline)
+    img.paste(color, box, fill)
 
 def render_quote_on_image(background_path: str, quote_text: str, mood: str, output_path: str = "generated/final_quote_image.png"):
     from random import randint
@@ -87,11 +152,12 @@ def render_quote_on_image(background_path: str, quote_text: str, mood: str, outp
     draw = ImageDraw.Draw(img)
 
     # --- 1. Render Quote Text ---
-    font_size = int(style["base_size"] * 1.20)  # Consistent large sizing
-    font = _load_font(style["font_family"], font_size)
+    font_size = _quote_font_size(style)
+    font_path = FONT_PATHS.get(style["font_family"], "arial.ttf")
+    font = asset_cache.get_font(font_path, font_size)
     max_chars = max(15, int(width / (font_size * 0.50)))  # Tighter wrapping for larger fonts
     wrapped = "\n".join(wrap(quote_text, width=max_chars))
-    bbox = draw.multiline_textbbox((0, 0), wrapped, font=font, spacing=8)
+    bbox = asset_cache.text_bbox(font_path, font_size, wrapped, spacing=8)
     text_w, text_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
     x = (width - text_w) / 2
     y_offset = style.get("y_offset", 0.0)
@@ -100,24 +166,16 @@ def render_quote_on_image(background_path: str, quote_text: str, mood: str, outp
     text_color = (255, 255, 255)
     outline_color = (0, 0, 0)
     
-    # Draw thick outline (8-directional)
-    outline_width = 4
-    for dx in range(-outline_width, outline_width + 1):
-        for dy in range(-outline_width, outline_width + 1):
-            if dx != 0 or dy != 0:
-                draw.multiline_text((x + dx, y + dy), wrapped, font=font, fill=outline_color, align="center", spacing=12)
-    
-    # Draw main text
-    _apply_fake_style(draw, x, y, wrapped, font, text_color, style["bold"], style["italic"], "center", spacing=12)
+    # Thick outline + main text (with fake bold/italic), rasterized once
+    _draw_outlined_text(img, x, y, wrapped, font, text_color, outline_color, 4, style["bold"], style["italic"], spacing=12)
 
     # --- 2. Add Branding ---
-    BRAND_TEXT = "@aiwithsid | http://grwothbrothers.in"
     padding = max(20, int(width * 0.02))
 
     # Add Brand Text (Bottom Left)
     try:
         # === FONT SIZE FIX IS HERE ===
-        brand_font_size = max(28, int(height * 0.045)) # Larger for better visibility
+        brand_font_size = _brand_font_size(height)
         brand_font = _load_font("sans", brand_font_size)
         text_x = padding
         text_y = height - padding - brand_font_size - 10
@@ -129,21 +187,17 @@ def render_quote_on_image(background_path: str, quote_text: str, mood: str, outp
         print(f"⚠️  Could not render brand text: {e}")
 
     # Add Logo (Bottom Right)
-    if os.path.exists(LOGO_PATH):
-        try:
-            logo = Image.open(LOGO_PATH)
-            logo_max_h = int(height * 0.05)
-            ratio = logo_max_h / logo.height
-            logo_w = int(logo.width * ratio)
-            logo.thumbnail((logo_w, logo_max_h), Image.Resampling.LANCZOS)
-            logo_x = width - logo.width - padding
-            logo_y = height - logo.height - padding
-            img.paste(logo, (logo_x, logo_y))
-        except Exception as e:
-            print(f"⚠️  Could not paste logo: {e}")
-    else:
-        # === PATH FIX IS HERE ===
-        print(f"⚠️  Logo not found at {LOGO_PATH}. Skipping logo branding. Ensure assets folder exists.")
+    try:
+        logo = asset_cache.get_logo(LOGO_PATH, _logo_height(height))
+    except Exception as e:
+        logo = None
+        print(f"⚠️  Could not load logo: {e}")
+    if logo is not None:
+        logo_x = width - logo.width - padding
+        logo_y = height - logo.height - padding
+        img.paste(logo, (logo_x, logo_y), logo)
+    elif not os.path.exists(LOGO_PATH):
+        print(f"⚠️  Logo not found at {LOGO_PATH}. Skipping logo branding. Set LOGO_PATH if it lives elsewhere.")
     
     img.convert("RGB").save(output_path, "PNG")
     print(f"✅ Styled typography and branding applied ({mood}). Saved: {output_path}")
@@ -5,9 +5,11 @@ import argparse
 import random
 import base64
 from typing import Optional, List, Dict, Any
-import requests
 from dotenv import load_dotenv
+
+from modules import http_client
 load_dotenv()
+from modules.text_generator import TEXT_ROUTER, gemini_text_attempt
 
 # =========================
 # CONFIG
@@ -84,22 +86,14 @@ class FinalPost:
 # GEMINI (TEXT)
 # =========================
 
-def gemini_generate_text(prompt: str, model: str = "gemini-2.0-flash") -> str:
+def gemini_generate_text(prompt: str, model: Optional[str] = None) -> str:
+    """Routed like the main pipeline: healthiest standard-tier model unless `model` pins one."""
     if not GEMINI_API_KEY:
         raise RuntimeError("❌ GEMINI_API_KEY missing in .env file.")
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    headers = {"Content-Type": "application/json"}
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
-    params = {"key": GEMINI_API_KEY}
-
-    resp = requests.post(url, headers=headers, params=params, json=payload)
-    if resp.status_code != 200:
-        raise RuntimeError(f"Gemini API error {resp.status_code}: {resp.text}")
-    data = resp.json()
     try:
-        return data["candidates"][0]["content"]["parts"][0]["text"].strip()
-    except Exception:
-        return json.dumps(data)
+        return TEXT_ROUTER.call(lambda m: gemini_text_attempt(prompt, m), pinned=model)
+    except Exception as e:
+        raise RuntimeError(f"Gemini API error: {e}")
 
 # =========================
 # STABILITY (IMAGE)
@@ -116,7 +110,7 @@ def generate_image_stability(style_prompt: str, save_path: str = "generated_imag
 
     try:
         print(f"🎨 Generating image with Stability AI for prompt: {style_prompt}")
-        resp = requests.post(
+        resp = http_client.post(
             "https://api.stability.ai/v1/generation/stable-diffusion-v1-6/text-to-image",
             headers={"Authorization": f"Bearer {STABILITY_API_KEY}"},
             json={
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Asset caches: fonts and logo variants load once per key, a replaced logo is
+picked up, warm-up at API startup fills the caches, and batch renders reuse
+them. The default logo path points at the repo's logo.
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from modules import asset_cache, typography_engine
+
+
+def test_fonts_and_bboxes_are_reused():
+    asset_cache.clear()
+    font = asset_cache.get_font("missing-font.ttf", 40)
+    assert asset_cache.get_font("missing-font.ttf", 40) is font
+    assert asset_cache.get_font("missing-font.ttf", 41) is not font
+    assert font.size == 40  # falls back to the scalable default font, not a 10px bitmap
+    assert asset_cache.text_bbox("missing-font.ttf", 40, "Hi\nthere") == asset_cache.text_bbox("missing-font.ttf", 40, "Hi\nthere")
+    stats = asset_cache.stats()
+    assert (stats["fonts"]["hits"], stats["fonts"]["misses"]) == (2, 2)  # one hit is the bbox's own lookup
+    assert (stats["text_bbox"]["hits"], stats["text_bbox"]["misses"]) == (1, 1)
+
+
+def test_logo_variants(tmp_path):
+    asset_cache.clear()
+    path = os.path.join(tmp_path, "logo.jpg")
+    Image.new("RGB", (200, 100), (200, 30, 30)).save(path)
+    small = asset_cache.get_logo(path, 50)
+    assert small.size == (100, 50) and small.mode == "RGBA"
+    assert asset_cache.get_logo(path, 50) is small
+    assert asset_cache.get_logo(path, 20).size == (40, 20)
+
+    Image.new("RGB", (100, 100), (0, 0, 255)).save(path)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    assert asset_cache.get_logo(path, 50).size == (50, 50)
+    assert asset_cache.get_logo(os.path.join(tmp_path, "nope.jpg"), 50) is None
+
+
+def test_warm_up_and_batch_reuse(tmp_path):
+    assert os.path.exists(typography_engine.LOGO_PATH)
+    asset_cache.clear()
+    from fastapi.testclient import TestClient
+    import api
+    with TestClient(api.app):  # runs the startup warm-up
+        warmed = asset_cache.stats()
+    assert warmed["logos"]["entries"] == 2 and warmed["fonts"]["entries"] >= 5
+
+    background = os.path.join(tmp_path, "bg.png")
+    Image.new("RGB", (1080, 1080), (40, 60, 90)).save(background)
+    for i in range(3):
+        typography_engine.render_quote_on_image(background, f"Quote number {i} keeps going", "calm",
+                                                os.path.join(tmp_path, f"out{i}.png"))
+    stats = asset_cache.stats()
+    assert stats["fonts"]["entries"] == warmed["fonts"]["entries"]  # nothing new loaded
+    assert stats["logos"]["misses"] == warmed["logos"]["misses"] and stats["logos"]["hits"] == 3
+    with Image.open(os.path.join(tmp_path, "out0.png")) as out:
+        assert out.getpixel((1080 - 30, 1080 - 30)) != (40, 60, 90)  # logo in the bottom-right corner
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_fonts_and_bboxes_are_reused()
+    for test in (test_logo_variants, test_warm_up_and_batch_reuse):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+    print("✅ asset cache tests passed")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Streaming base64 extraction from JSON: any chunking, keys inside strings,
+escaped slashes and \\u003d padding, missing fields, constant memory, and
+google_image decoding a stub Gemini response straight to disk.
+"""
+
+import base64
+import io
+import json
+import os
+import random
+import sys
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.stub_server import StubServer
+from modules import google_image
+from modules.b64_stream import Base64FieldExtractor, extract_to_file
+
+
+def _gemini_body(image: bytes, escape_slashes=False, escape_padding=False) -> bytes:
+    data = base64.b64encode(image).decode()
+    body = json.dumps({"candidates": [{"content": {"parts": [
+        {"text": 'Here you go: {"data": "not this", "mimeType": "x"} \\ "data":'},
+        {"inlineData": {"mimeType": "image/png", "data": data}},
+    ]}}], "usageMetadata": {"data": "QUJD"}}, indent=1)
+    if escape_padding:  # as Google's JSON encoders send base64 padding
+        body = body.replace("=", "\\u003d")
+    return body.replace("/", "\\/").encode() if escape_slashes else body.encode()
+
+
+def _chunks(body: bytes, sizes):
+    pos, i = 0, 0
+    while pos < len(body):
+        size = sizes[i % len(sizes)]
+        yield body[pos:pos + size]
+        pos, i = pos + size, i + 1
+
+
+def test_any_chunking():
+    image = bytes(random.Random(7).randrange(256) for _ in range(5000))
+    for escape in ((False, False), (True, False), (False, True), (True, True)):
+        body = _gemini_body(image, *escape)
+        assert escape[1] is (b"\\u003d" in body)
+        for sizes in ([1], [3], [7, 1, 2], [4096], [len(body)]):
+            out = io.BytesIO()
+            extractor = Base64FieldExtractor("data", out)
+            for chunk in _chunks(body, sizes):
+                extractor.feed(chunk)
+            assert extractor.found and out.getvalue() == image, (escape, sizes)
+
+
+def test_missing_field_and_unpadded(tmp_path):
+    out = os.path.join(tmp_path, "img.png")
+    assert extract_to_file([b'{"candidates": [{"finishReason": "SAFETY"}]}'], "data", out) == 0
+    assert not os.path.exists(out) and os.listdir(tmp_path) == []
+
+    assert extract_to_file([b'{"artifacts": [{"base64": "QUJDRA"}]}'], "base64", out) == 4
+    with open(out, "rb") as f:
+        assert f.read() == b"ABCD"
+
+
+def test_memory_stays_flat(tmp_path):
+    image = os.urandom(6 * 1024 * 1024)
+    body = _gemini_body(image)
+    chunks = [body[i:i + 65536] for i in range(0, len(body), 65536)]
+    del body
+    tracemalloc.start()
+    try:
+        written = extract_to_file(chunks, "data", os.path.join(tmp_path, "big.png"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert written == len(image)
+    assert peak < 512 * 1024, peak
+
+
+def test_google_image_streams_to_disk(tmp_path):
+    image = os.urandom(300_000)
+
+    def handler(method, path, query, body):
+        return 200, {}, _gemini_body(image)
+
+    saved = (google_image.GEMINI_API_KEY, google_image.GEMINI_ENDPOINT, google_image.IMAGE_CACHE_ENABLED)
+    with StubServer(handler) as stub:
+        try:
+            google_image.GEMINI_API_KEY = "k"
+            google_image.GEMINI_ENDPOINT = f"{stub.url}/v1beta/models/{google_image.MODEL_ID}:generateContent"
+            google_image.IMAGE_CACHE_ENABLED = False
+            out = os.path.join(tmp_path, "gen.png")
+            assert google_image.generate_image_with_text("sea", "Go", "@b", out) == out
+            with open(out, "rb") as f:
+                assert f.read() == image
+        finally:
+            google_image.GEMINI_API_KEY, google_image.GEMINI_ENDPOINT, google_image.IMAGE_CACHE_ENABLED = saved
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_any_chunking()
+    print("✅ test_any_chunking")
+    for test in (test_missing_field_and_unpadded, test_memory_stays_flat, test_google_image_streams_to_disk):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Background library: parallel build with a fake generator, the index fields,
+selection by keywords/legibility without recent reuse, and fast mode rendering
+a post without calling the image model.
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from modules import background_library, image_builder
+from modules.background_library import SUBJECTS, BackgroundLibrary, build_library
+
+
+def _solid(color):
+    def generate(prompt, output_path):
+        Image.new("RGB", (96, 64), color).save(output_path)
+        return output_path
+    return generate
+
+
+def test_build_indexes_and_fills_gaps(tmp_path):
+    library = BackgroundLibrary(str(tmp_path))
+    result = build_library(3, ["calm", "powerful"], workers=3, library=library, generate=_solid((30, 60, 200)))
+    assert result["added"] == 6 and result["per_mood"] == {"calm": 3, "powerful": 3}
+    assert library.subjects("calm") == set(SUBJECTS["calm"][:3])
+    assert not os.listdir(os.path.join(tmp_path, "tmp"))
+
+    pick = library.select("anything", "calm")
+    assert os.path.exists(pick.path) and pick.path.startswith(os.path.join(str(tmp_path), "calm"))
+    assert pick.colors == ["#1e3cc8"]
+    assert abs(pick.luminance - (0.299 * 30 + 0.587 * 60 + 0.114 * 200)) < 1
+
+    # Re-running only generates what is missing
+    assert build_library(4, ["calm", "powerful"], library=library, generate=_solid((0, 0, 0)))["added"] == 2
+
+
+def test_select_matches_keywords_and_avoids_reuse(tmp_path):
+    library = BackgroundLibrary(str(tmp_path))
+    for name, color, subject in [("dark", (20, 20, 20), "quiet lake"), ("bright", (240, 240, 240), "quiet lake"),
+                                 ("ocean", (120, 120, 120), "ocean waves at dawn")]:
+        path = os.path.join(tmp_path, f"{name}.png")
+        Image.new("RGB", (64, 64), color).save(path)
+        library.add(path, "calm", subject)
+
+    assert library.select("Be like the ocean", "calm").subject == "ocean waves at dawn"
+    assert library.select("Peace", "calm", "lake").luminance < 50  # darker centre wins on a tie
+
+    picks = [library.select("Be like the ocean", "calm", reuse_window=2).id for _ in range(6)]
+    assert all(len(set(picks[i:i + 3])) == 3 for i in range(4))  # no repeats within the window
+    assert library.select("Anything", "intense").mood == "calm"  # empty mood falls back
+    assert library.stats()["selections"] == 9
+
+
+def test_fast_mode_skips_image_model(tmp_path, monkeypatch):
+    library = BackgroundLibrary(str(tmp_path))
+    build_library(1, ["hopeful"], library=library, generate=_solid((40, 40, 80)))
+    monkeypatch.setattr(background_library, "_default_library", library)
+    monkeypatch.setattr(background_library, "LIBRARY_DIR", library.root)
+    monkeypatch.setattr(image_builder, "plan_post", lambda topic, planning=None: ("Rise again", "hopeful", "scene"))
+
+    def no_model(*args, **kwargs):
+        raise AssertionError("image model called in fast mode")
+
+    monkeypatch.setattr(image_builder, "generate_image_with_text", no_model)
+    path, quote = image_builder.generate_final_post_image("comebacks", fast=True)
+    try:
+        assert quote == "Rise again"
+        with Image.open(path) as img:
+            assert img.size == (96, 64)
+    finally:
+        os.remove(path)
+
+
+def test_missing_files_are_pruned_and_render_errors_fall_back(tmp_path, monkeypatch):
+    library = BackgroundLibrary(str(tmp_path))
+    build_library(2, ["hopeful"], library=library, generate=_solid((40, 40, 80)))
+    first = library.select("Rise", "hopeful")
+    os.remove(first.path)
+    assert library.select("Rise", "hopeful", reuse_window=0).path != first.path
+    assert library.stats()["backgrounds"] == 1
+
+    monkeypatch.setattr(background_library, "_default_library", library)
+    monkeypatch.setattr(background_library, "LIBRARY_DIR", library.root)
+    monkeypatch.setattr(image_builder, "plan_post", lambda topic, planning=None: ("Rise again", "hopeful", "scene"))
+
+    def broken(*args, **kwargs):
+        raise OSError("cannot read background")
+
+    monkeypatch.setattr(image_builder, "render_quote_on_image", broken)
+    calls = []
+    monkeypatch.setattr(image_builder, "generate_image_with_text",
+                        lambda *args, **kwargs: calls.append(args) or "model.png")
+    path, quote = image_builder.generate_final_post_image("comebacks", fast=True)
+    assert calls and quote == "Rise again"
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Markdown/HTML blog exports and format selection in the blog pipeline.
+Offline: the LLM, search and download stages are replaced with local fakes.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from PIL import Image
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.blog_agent import exporters
+from modules.blog_agent.document_model import figure, insert_figures, parse_section
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SECTION = "Intro with **bold** & <tags>.\n\n* one\n* two\n\n1. step\n\nClosing *thought*."
+
+
+def _sections(image):
+    intro = insert_figures(parse_section("Introduction", SECTION), [(0, figure(image, "a diagram"))])
+    return [intro, parse_section("Details", SECTION)]
+
+
+def _image(name, width=1600):
+    path = os.path.join("generated/blogs/assets", name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new("RGB", (width, width // 2), "teal").save(path)
+    return path
+
+
+def test_markdown_uses_relative_assets():
+    image = _image("test_export_fig.png")
+    path = exporters.export_markdown({"title": "Title"}, _sections(image), image, "topic", run_id="test_md")
+    with open(path, encoding="utf-8") as f:
+        md = f.read()
+    assert md.startswith("# Title\n")
+    assert "![a diagram](assets/test_export_fig.png)" in md
+    assert "## Details" in md and "## Introduction" not in md
+    assert "* one\n* two" in md
+    os.remove(path)
+
+
+def test_markdown_links_resolve_for_blob_store_images(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporters, "OUT_DIR", str(tmp_path))
+    store = os.path.join(tmp_path, "assets", "store")
+    images = []
+    for i, color in enumerate(("teal", "orange")):
+        path = os.path.join(store, f"a{i}", f"a{i}{'0' * 30}.png")
+        os.makedirs(os.path.dirname(path))
+        Image.new("RGB", (64, 32), color).save(path)
+        images.append(path)
+    sections = [insert_figures(parse_section("Details", SECTION, base_dir=str(tmp_path)), [(0, figure(images[1], "fig"))])]
+    path = exporters.export_markdown({"title": "T"}, sections, images[0], "topic", run_id="blob")
+    with open(path, encoding="utf-8") as f:
+        links = re.findall(r"!\[.*?\]\((.*?)\)", f.read())
+
+    assert len(links) == 2
+    for link, image in zip(links, images):
+        # Resolves next to the .md, and matches the key the API uploads the image under
+        assert link == f"assets/{os.path.basename(image)}"
+        with open(os.path.join(os.path.dirname(path), link), "rb") as a, open(image, "rb") as b:
+            assert a.read() == b.read()
+
+
+def test_html_is_self_contained_with_srcset():
+    image = _image("test_export_fig.png")
+    path = exporters.export_html({"title": "Title & Co"}, _sections(image), image, "topic", run_id="test_html")
+    with open(path, encoding="utf-8") as f:
+        page = f.read()
+    assert "<title>Title &amp; Co</title>" in page
+    assert "&lt;tags&gt;" in page and "<strong>bold</strong>" in page
+    assert page.count("<ul>") == 2 and page.count("<ol>") == 2
+    srcsets = re.findall(r'srcset="([^"]+)"', page)
+    assert len(srcsets) == 2  # cover + figure
+    assert [w for w in re.findall(r" (\d+)w", srcsets[0])] == ["480", "960", "1200"]
+    assert "assets/" not in page  # nothing referenced outside the file
+    os.remove(path)
+
+
+_PIPELINE = r"""
+import sys
+from modules.blog_agent import blog_builder as bb
+from modules.blog_agent.writer import SectionResult
+
+bb.plan_blog_outline = lambda topic: {"title": "T", "sections": [{"heading": "Introduction"}, {"heading": "More"}]}
+bb.write_one_section = lambda sec, audience, tone, context="": SectionResult(sec["heading"], "Para one.\n\nPara two.", 0.0, None)
+bb.decide_visuals_for_section = lambda heading, content: [{"type": "image", "keywords": "chart", "after_paragraph": 0}]
+bb.find_and_download_image = lambda **kw: None
+out = bb.build_blog_outputs("topic", ["markdown", "html"])
+assert set(out) >= {"markdown", "html", "cover", "images"} and "docx" not in out, out
+print("docx loaded:", "docx" in sys.modules)
+"""
+
+
+def test_web_formats_skip_python_docx():
+    result = subprocess.run([sys.executable, "-c", _PIPELINE], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert "docx loaded: False" in result.stdout
+
+
+def test_pipeline_bounds_section_writes_and_reports_timings(monkeypatch):
+    from modules.blog_agent import blog_builder as bb
+    from modules.blog_agent.writer import SectionResult
+
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def write_one_section(sec, audience, tone, context=""):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return SectionResult(sec["heading"], "Para one.", 0.05, "empty response" if sec["heading"] == "C" else None)
+
+    monkeypatch.setattr(bb, "SECTION_CONCURRENCY", 2)
+    monkeypatch.setattr(bb, "plan_blog_outline", lambda topic: {"title": "T", "sections": [{"heading": h} for h in "ABCDE"]})
+    monkeypatch.setattr(bb, "write_one_section", write_one_section)
+    monkeypatch.setattr(bb, "retrieve_section_context", lambda *a: "")
+    monkeypatch.setattr(bb, "decide_visuals_for_section", lambda heading, content: [])
+    monkeypatch.setattr(bb, "find_and_download_image", lambda **kw: None)
+    out = bb.build_blog_outputs("topic", ["markdown"], max_workers=8)
+    os.remove(out["markdown"])
+
+    assert peak[0] == 2
+    assert [s["heading"] for s in out["sections"]] == list("ABCDE")
+    assert out["sections"][2] == {"heading": "C", "seconds": 0.05, "error": "empty response"}
+    assert {f"write:{i}" for i in range(5)} <= set(out["report"]["tasks"])
+    assert out["report"]["critical_path"][-1]["task"] in ("export:markdown", "images")
+
+
+if __name__ == "__main__":
+    for test in (test_markdown_uses_relative_assets, test_html_is_self_contained_with_srcset, test_web_formats_skip_python_docx):
+        test()
+        print(f"✅ {test.__name__}")
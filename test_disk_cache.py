@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Disk cache TTL expiry, purge and LRU eviction, and single-flight coalescing:
+concurrent identical calls run once and every waiter gets the result or the
+exception.
+"""
+
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from modules import disk_cache, single_flight
+from modules.disk_cache import DiskCache, make_key
+from modules.single_flight import SingleFlight
+
+
+class _Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(disk_cache, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = DiskCache(os.path.join(tmp_path, "c.db"), ttl=60)
+    cache.set("k", "v")
+    clock.now += 59
+    assert cache.get("k") == "v"
+    clock.now += 2
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0  # the expired row was dropped on read
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_purge(tmp_path, clock):
+    cache = DiskCache(os.path.join(tmp_path, "c.db"), ttl=60)
+    cache.set("old", "1")
+    clock.now += 30
+    cache.set("new", "2")
+    clock.now += 45
+    assert cache.purge(expired_only=True) == 1
+    assert cache.get("old") is None and cache.get("new") == "2"
+    assert cache.purge() == 1
+    assert cache.stats()["entries"] == 0 and cache.stats()["hits"] == 0
+    assert DiskCache(os.path.join(tmp_path, "d.db")).purge(expired_only=True) == 0  # no TTL, nothing expires
+
+
+def test_lru_eviction_and_keys(tmp_path, clock):
+    cache = DiskCache(os.path.join(tmp_path, "c.db"), max_entries=2)
+    for key in ("a", "b"):
+        cache.set(key, key)
+        clock.now += 1
+    cache.get("a")  # b is now the least recently used
+    clock.now += 1
+    cache.set("c", "c")
+    assert cache.get("b") is None and cache.get("a") == "a" and cache.get("c") == "c"
+    assert cache.stats()["evictions"] == 1
+    assert make_key("m", "p", {"x": 1, "y": 2}) == make_key("m", "p", {"y": 2, "x": 1})
+    assert make_key("m", "p", None) != make_key("m", "p2", None)
+
+
+def _concurrently(flight, n, fn):
+    """Runs flight.do("key", fn) from n threads; returns their results or exceptions."""
+    out = [None] * n
+
+    def worker(i):
+        try:
+            out[i] = flight.do("key", fn)
+        except Exception as e:
+            out[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return out
+
+
+def _leader(flight, n, result=None, error=None):
+    """An upstream call that holds until all n callers have joined it."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        deadline = time.monotonic() + 5
+        while flight.stats()["requests"] < n and time.monotonic() < deadline:
+            time.sleep(0.005)
+        if error:
+            raise error
+        return result
+    fn.calls = calls
+    return fn
+
+
+def test_single_flight_runs_once_and_shares(monkeypatch):
+    monkeypatch.setattr(single_flight, "_registry", {})
+    flight = SingleFlight("test")
+    fn = _leader(flight, 8, result={"answer": 42})
+    results = _concurrently(flight, 8, fn)
+    assert len(fn.calls) == 1
+    assert all(r[0] is results[0][0] for r in results)
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert flight.stats() == {"requests": 8, "upstream_calls": 1, "collapsed": 7, "in_flight": 0}
+    assert single_flight.all_stats() == {"test": flight.stats()}
+
+    assert flight.do("key", lambda: "fresh") == ("fresh", False)  # nothing cached once the call finished
+
+
+def test_single_flight_error_reaches_every_waiter(monkeypatch):
+    monkeypatch.setattr(single_flight, "_registry", {})
+    flight = SingleFlight("test")
+    boom = ValueError("upstream down")
+    fn = _leader(flight, 5, error=boom)
+    results = _concurrently(flight, 5, fn)
+    assert len(fn.calls) == 1
+    assert all(r is boom for r in results)
+    assert flight.stats()["in_flight"] == 0
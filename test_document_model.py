@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Blog section document model: parsing, single-pass figure insertion, DOCX rendering.
+"""
+
+import os
+import sys
+from docx import Document
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.blog_agent.document_model import Span, figure, insert_figures, parse_section
+from modules.blog_agent.formatter import add_blocks
+
+SECTION = (
+    "Caching pays off **fast**, and *batching* helps too.\n\n"
+    "* **Bold *nested* run** bullet\n"
+    "- dash bullet\n\n"
+    "1. first step\n"
+    "2. second step\n\n"
+    "### A sub-heading\n\n"
+    "Closing paragraph."
+)
+
+
+def test_parse_blocks_and_spans():
+    doc = parse_section("Intro", SECTION)
+    assert [b.kind for b in doc.blocks] == ["paragraph", "bullet", "bullet", "numbered", "numbered", "heading", "paragraph"]
+    assert doc.paragraph_count == 5
+    assert doc.blocks[0].spans[1] == Span("fast", bold=True)
+    assert doc.blocks[0].spans[3] == Span("batching", italic=True)
+    assert doc.blocks[1].spans == [Span("Bold ", bold=True), Span("nested", bold=True, italic=True), Span(" run", bold=True), Span(" bullet")]
+    assert doc.blocks[2].text == "dash bullet"
+    assert doc.blocks[5].text == "A sub-heading"
+
+
+def test_insert_figures_single_pass():
+    doc = parse_section("Intro", SECTION)
+    enriched = insert_figures(doc, [
+        (0, figure("generated/blogs/assets/a.png", "first")),
+        (0, figure("generated/blogs/assets/b.png", "second")),
+        (2, figure(None, "missing")),
+        (99, figure("generated/blogs/assets/c.png", "last")),
+    ])
+    kinds = [(b.kind, b.caption or b.text) for b in enriched.blocks]
+    # Indices refer to the section as written; same-index figures keep their order
+    assert kinds[1:3] == [("figure", "first"), ("figure", "second")]
+    assert ("paragraph", "> (Image not found for keywords: missing)") == kinds[7]
+    assert kinds[-1] == ("figure", "last")
+    assert enriched.paragraph_count == doc.paragraph_count + 4
+    md = enriched.to_markdown()
+    assert "![first](assets/a.png)\n\n![second](assets/b.png)" in md
+    assert parse_section("Intro", md).to_markdown() == md
+
+
+def test_render_docx_from_model(tmp_path):
+    doc = parse_section("Intro", SECTION)
+    document = Document()
+    add_blocks(document, doc.blocks)
+    styles = [p.style.name for p in document.paragraphs]
+    assert styles == ["Normal", "List Bullet", "List Bullet", "List Number", "List Number", "Heading 3", "Normal"]
+    runs = document.paragraphs[1].runs
+    assert [(r.text, r.bold, r.italic) for r in runs] == [("Bold ", True, None), ("nested", True, True), (" run", True, None), (" bullet", None, None)]
+    document.save(os.path.join(tmp_path, "out.docx"))
+
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_parse_blocks_and_spans, test_insert_figures_single_pass):
+        test()
+        print(f"✅ {test.__name__}")
+    with tempfile.TemporaryDirectory() as d:
+        test_render_docx_from_model(d)
+        print("✅ test_render_docx_from_model")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Template DOCX writer vs the python-docx path: same styling and body XML,
+and the streamed file opens cleanly. Offline; uses a generated image.
+"""
+
+import os
+import re
+import sys
+import zipfile
+from docx import Document
+from PIL import Image
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.blog_agent import formatter
+from modules.blog_agent.document_model import figure, insert_figures, parse_section
+
+SECTION = (
+    "Intro with **bold**, *italic* and trailing space  \n\n"
+    "* **Bold *nested* run** & <escaped>\n"
+    "- tab\tinside\n\n"
+    "1. first step\n\n"
+    "### Sub-heading\n\n"
+    "Closing paragraph."
+)
+
+
+def _normalized(path, member):
+    xml = zipfile.ZipFile(path).read(member).decode()
+    # Relationship ids depend on the order parts were added (the template adds the logo first)
+    return re.sub(r'r:(id|embed)="rId\d+"', 'r:\\1="rId"', xml)
+
+
+def _build(tmp_path, writer):
+    image = os.path.join(tmp_path, "figure.png")
+    Image.new("RGB", (120, 80), "teal").save(image)
+    sections = [
+        insert_figures(parse_section("Introduction", SECTION), [(0, figure(image, "a diagram")), (2, figure(image, "a chart"))]),
+        parse_section("Details", SECTION),
+    ]
+    return formatter.assemble_docx({"title": "Title"}, sections, image, "topic", run_id=f"test_{writer}", writer=writer)
+
+
+def test_template_matches_python_docx(tmp_path):
+    legacy = _build(str(tmp_path), "python-docx")
+    fast = _build(str(tmp_path), "template")
+    for member in ("word/document.xml", "word/styles.xml", "word/footer1.xml", "word/numbering.xml"):
+        assert _normalized(fast, member) == _normalized(legacy, member), member
+    assert len(zipfile.ZipFile(fast).namelist()) == len(zipfile.ZipFile(legacy).namelist())
+    os.remove(legacy)
+    os.remove(fast)
+
+
+def test_streamed_docx_reopens(tmp_path):
+    path = _build(str(tmp_path), "template")
+    doc = Document(path)
+    texts = [p.text for p in doc.paragraphs]
+    assert texts[0] == "Title"
+    assert "Figure: a diagram" in texts
+    assert "Bold nested run & <escaped>" in texts
+    assert doc.styles["Normal"].font.name == "Calibri"
+    assert not [f for f in os.listdir(os.path.dirname(path)) if f.endswith(".tmp")]
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_template_matches_python_docx, test_streamed_docx_reopens):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Hedged provider calls: a slow primary is raced by the secondary after the
+hedge delay, a failed primary falls back, the delay adapts to observed
+latency, and google_image hedges Gemini with Stability against stub servers.
+"""
+
+import base64
+import io
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from benchmarks.stub_server import StubServer
+from modules import google_image, provider_router
+from modules.hedging import Hedge
+from modules.provider_router import Router
+
+
+def _writer(content, delay=0.0, ok=True):
+    calls = []
+
+    def fn(path):
+        calls.append(path)
+        time.sleep(delay)
+        if not ok:
+            return None
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+    fn.calls = calls
+    return fn
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_slow_primary_is_hedged(tmp_path):
+    hedge = Hedge("test_slow", "a", "b", initial_delay=0.05)
+    out = os.path.join(tmp_path, "out.txt")
+    primary, secondary = _writer("from a", delay=0.4), _writer("from b")
+    assert hedge.run(primary, secondary, out) == out
+    assert _read(out) == "from b"
+    time.sleep(0.5)  # let the loser finish and clean up
+    assert os.listdir(tmp_path) == ["out.txt"]
+    stats = hedge.stats()
+    assert stats["hedged"] == 1 and stats["wins"] == {"a": 0, "b": 1}
+    assert stats["latency"]["a"]["count"] == 1  # the loser's latency still counts
+
+
+def test_fast_primary_and_fallback(tmp_path):
+    hedge = Hedge("test_fast", "a", "b", initial_delay=1.0)
+    out = os.path.join(tmp_path, "out.txt")
+    secondary = _writer("from b")
+    assert hedge.run(_writer("from a"), secondary, out) == out
+    assert _read(out) == "from a" and secondary.calls == []
+
+    assert hedge.run(_writer("", ok=False), secondary, out) == out
+    assert _read(out) == "from b"
+    assert hedge.run(_writer("", ok=False), _writer("", ok=False), out) is None
+    stats = hedge.stats()
+    assert (stats["hedged"], stats["fallbacks"], stats["failures"]) == (0, 2, 1)
+    assert sorted(os.listdir(tmp_path)) == ["out.txt"]
+
+
+def test_delay_adapts_to_latency():
+    hedge = Hedge("test_adapt", "a", "b", percentile=90, initial_delay=30, min_delay=1, max_delay=60, min_samples=10)
+    assert hedge.delay() == 30
+    for seconds in range(1, 21):
+        hedge.latency["a"].add(float(seconds))
+    assert hedge.delay() == 19
+    hedge.latency["a"].add(0.1)
+    for _ in range(200):
+        hedge.latency["a"].add(0.2)
+    assert hedge.delay() == 1  # clamped to min_delay
+
+
+def test_slow_failures_raise_the_delay(tmp_path):
+    hedge = Hedge("test_slow_fail", "a", "b", percentile=90, initial_delay=30, min_delay=0.01, min_samples=3)
+    out = os.path.join(tmp_path, "out.txt")
+    for _ in range(3):
+        hedge.run(_writer("from a", delay=0.01), _writer("from b"), out)
+    fast = hedge.delay()
+    for _ in range(3):
+        hedge.run(_writer("", delay=0.2, ok=False), _writer("from b"), out)
+    time.sleep(0.4)  # the hedge answers before the failing primary gives up
+    assert hedge.stats()["failure_latency"]["a"]["count"] == 3
+    assert fast < 0.1 < 0.2 <= hedge.delay()
+
+
+def _png_b64():
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), (10, 20, 30)).save(buf, "PNG")
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+def test_google_image_hedges_to_stability(tmp_path, monkeypatch):
+    def handler(method, path, query, body):
+        if "generateContent" in path:
+            payload = {"candidates": [{"content": {"parts": [{"inlineData": {"data": _png_b64()}}]}}]}
+        else:
+            payload = {"artifacts": [{"base64": _png_b64()}]}
+        return 200, {}, json.dumps(payload).encode()
+
+    # Router() registers itself for the metrics endpoint; put the real one back afterwards
+    monkeypatch.setitem(provider_router._registry, "image", provider_router._registry["image"])
+    router = Router("image", explore_every=2)
+    router.register("gemini", "high")
+    router.register("stability", "standard")
+    with StubServer(handler, latency=lambda path, query: 0.6 if "generateContent" in path else 0.0) as stub:
+        monkeypatch.setattr(google_image, "GEMINI_API_KEY", "k")
+        monkeypatch.setattr(google_image, "STABILITY_API_KEY", "k")
+        monkeypatch.setattr(google_image, "GEMINI_ENDPOINT", f"{stub.url}/v1beta/models/{google_image.MODEL_ID}:generateContent")
+        monkeypatch.setattr(google_image, "STABILITY_ENDPOINT", f"{stub.url}/v1/generation/sdxl/text-to-image")
+        monkeypatch.setattr(google_image, "IMAGE_CACHE_ENABLED", False)
+        monkeypatch.setattr(google_image, "IMAGE_ROUTER", router)
+        monkeypatch.setattr(google_image, "IMAGE_HEDGE", Hedge("test_image", "gemini", "stability",
+                                                               initial_delay=0.1, min_delay=0.05))
+        hedge = google_image.IMAGE_HEDGE
+
+        def generate():
+            started = time.perf_counter()
+            assert google_image.generate_image("harbour at dawn", out) == out
+            assert time.perf_counter() - started < 0.5
+            time.sleep(0.7)  # a losing Gemini call finishes and is recorded
+
+        out = os.path.join(tmp_path, "img.png")
+        generate()  # unmeasured: registration order, Gemini hedged by Stability
+        assert hedge.stats()["wins"] == {"gemini": 0, "stability": 1}
+        with Image.open(out) as img:
+            assert img.size == (8, 8)
+        providers = router.stats()["providers"]
+        assert providers["stability"]["ewma_latency_s"] < providers["gemini"]["ewma_latency_s"]
+
+        generate()  # every 2nd ranking explores: Gemini leads again and gets a fresh sample
+        assert router.decisions[-1]["order"] == ["gemini", "stability"] and router.decisions[-1]["explore"]
+        generate()  # routed by health: Stability leads and answers before the hedge delay
+        assert router.decisions[-1]["order"] == ["stability", "gemini"]
+        assert hedge.stats()["hedged"] == 2 and hedge.stats()["wins"]["stability"] == 3
+        assert router.stats()["providers"]["gemini"]["calls"] == 2
+
+        google_image.generate_image("harbour at dusk", out, tier="high")  # only Gemini meets "high"
+        assert router.decisions[-1]["order"] == ["gemini"]
+        assert hedge.stats()["calls"] == 3
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_slow_primary_is_hedged, test_fast_primary_and_fallback):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+        print(f"✅ {test.__name__}")
+    test_delay_adapts_to_latency()
+    print("✅ test_delay_adapts_to_latency")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Prompt-keyed cache for generated images against a local stub Gemini endpoint:
+hits skip the provider, keys cover quote/brand text, Stability fallbacks are
+not cached, and the admin endpoints report and purge.
+"""
+
+import base64
+import io
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from benchmarks.stub_server import StubServer
+from modules import google_image
+from modules.blob_store import BlobStore
+
+
+def _png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _gemini(calls, status=200):
+    def handler(method, path, query, body):
+        calls.append(json.loads(body)["contents"][0]["parts"][0]["text"])
+        if status != 200:
+            return status, {"Content-Type": "application/json"}, b'{"error": "overloaded"}'
+        data = base64.b64encode(_png((len(calls) * 40 % 256, 90, 160))).decode()
+        payload = {"candidates": [{"content": {"parts": [{"inlineData": {"mimeType": "image/png", "data": data}}]}}]}
+        return 200, {"Content-Type": "application/json"}, json.dumps(payload).encode()
+    return handler
+
+
+def _setup(tmp_path, status=200):
+    google_image.IMAGE_CACHE = BlobStore(os.path.join(tmp_path, "cache"), quota_bytes=10 * 1024 * 1024)
+    google_image.IMAGE_CACHE_ENABLED = True
+    google_image.GEMINI_API_KEY = "test-key"
+    google_image.STABILITY_API_KEY = ""
+    calls = []
+    stub = StubServer(_gemini(calls, status))
+    stub.start()
+    google_image.GEMINI_ENDPOINT = f"{stub.url}/v1beta/models/{google_image.MODEL_ID}:generateContent"
+    return stub, calls
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_hit_skips_provider(tmp_path):
+    stub, calls = _setup(str(tmp_path))
+    try:
+        first = google_image.generate_image("A calm  Sunset over hills", os.path.join(tmp_path, "a.png"))
+        second = google_image.generate_image("a calm sunset over HILLS ", os.path.join(tmp_path, "out", "b.png"))
+        assert len(calls) == 1
+        assert second == os.path.join(tmp_path, "out", "b.png")
+        assert _read(first) == _read(second)
+        assert os.stat(first).st_ino != os.stat(second).st_ino  # copied, not linked, by default
+
+        google_image.generate_image("a calm sunset over hills", os.path.join(tmp_path, "c.png"), mode="cover")
+        assert len(calls) == 2  # mode is part of the key
+        stats = google_image.image_cache_stats()
+        assert stats["hits"] == 1 and stats["blobs"] == 2
+    finally:
+        stub.stop()
+
+
+def test_quote_and_brand_are_part_of_the_key(tmp_path):
+    stub, calls = _setup(str(tmp_path))
+    try:
+        out = os.path.join(tmp_path, "q.png")
+        google_image.generate_image_with_text("ocean", "Keep going", "@brand", out)
+        google_image.generate_image_with_text("Ocean", "Keep going", "@brand", out)
+        assert len(calls) == 1
+        google_image.generate_image_with_text("ocean", "Keep Going", "@brand", out)
+        google_image.generate_image_with_text("ocean", "Keep going", "@other", out)
+        assert len(calls) == 3
+    finally:
+        stub.stop()
+
+
+def test_failures_are_not_cached(tmp_path):
+    stub, calls = _setup(str(tmp_path), status=503)
+    try:
+        assert google_image.generate_image("storm", os.path.join(tmp_path, "s.png")) is None
+        assert google_image.generate_image("storm", os.path.join(tmp_path, "s.png")) is None
+        assert len(calls) == 2
+        assert google_image.image_cache_stats()["blobs"] == 0
+    finally:
+        stub.stop()
+
+
+def test_admin_endpoints(tmp_path):
+    from fastapi.testclient import TestClient
+    import api
+
+    stub, calls = _setup(str(tmp_path))
+    try:
+        google_image.generate_image("forest", os.path.join(tmp_path, "f.png"))
+        client = TestClient(api.app)
+        api.ADMIN_TOKEN = None
+        assert client.delete("/api/v1/admin/image_cache").status_code == 403  # no token configured
+        api.ADMIN_TOKEN = "secret"
+        assert client.get("/api/v1/admin/image_cache").status_code == 403
+        stats = client.get("/api/v1/admin/image_cache", headers={"X-Admin-Token": "secret"}).json()
+        assert stats["blobs"] == 1
+        purged = client.delete("/api/v1/admin/image_cache", headers={"X-Admin-Token": "secret"}).json()
+        assert purged == {"purged": 1}
+        google_image.generate_image("forest", os.path.join(tmp_path, "f.png"))
+        assert len(calls) == 2
+    finally:
+        api.ADMIN_TOKEN = None
+        stub.stop()
+
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_hit_skips_provider, test_quote_and_brand_are_part_of_the_key,
+                 test_failures_are_not_cached, test_admin_endpoints):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Bounded, validating image downloads against a local stub server (no network).
+"""
+
+import io
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+from benchmarks.stub_server import StubServer
+from modules.blog_agent import downloader
+
+
+def _image_bytes(size, fmt="PNG", mode="RGB"):
+    buf = io.BytesIO()
+    Image.new(mode, size, (200, 120, 40, 255)[:len(mode)]).save(buf, fmt)
+    return buf.getvalue()
+
+
+ROUTES = {
+    "/small.png": ("image/png", _image_bytes((300, 200))),
+    "/huge.png": ("image/png", _image_bytes((3000, 1500))),
+    "/logo.png": ("image/png", _image_bytes((3000, 1000), mode="RGBA")),
+    "/error.html": ("text/html", b"<html><body>404 Not Found</body></html>"),
+    "/disguised.png": ("image/png", b"<html>" + b"x" * 100),
+}
+
+
+def _handler(method, path, query, body):
+    ctype, payload = ROUTES[path]
+    return 200, {"Content-Type": ctype}, payload
+
+
+def _get(stub, name, tmp_path, **kwargs):
+    return downloader.download_image(f"{stub.url}/{name}", os.path.join(tmp_path, "out.png"), **kwargs)
+
+
+def test_small_png_kept_as_is(tmp_path):
+    with StubServer(_handler) as stub:
+        path = _get(stub, "small.png", str(tmp_path))
+    with open(path, "rb") as f:
+        assert f.read() == ROUTES["/small.png"][1]
+
+
+def test_large_photo_downscaled_to_jpeg(tmp_path):
+    with StubServer(_handler) as stub:
+        path = _get(stub, "huge.png", str(tmp_path))
+    assert path.endswith(".jpg")
+    with Image.open(path) as img:
+        assert img.size == (downloader.DOCX_IMAGE_MAX_WIDTH, downloader.DOCX_IMAGE_MAX_WIDTH // 2)
+
+
+def test_transparent_image_stays_png(tmp_path):
+    with StubServer(_handler) as stub:
+        path = _get(stub, "logo.png", str(tmp_path))
+    with Image.open(path) as img:
+        assert img.format == "PNG" and img.mode == "RGBA"
+
+
+def test_non_images_and_oversize_rejected(tmp_path):
+    with StubServer(_handler) as stub:
+        assert _get(stub, "error.html", str(tmp_path)) is None
+        assert _get(stub, "disguised.png", str(tmp_path)) is None
+        assert _get(stub, "huge.png", str(tmp_path), max_bytes=1024) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_probe_falls_back_to_ranged_get_when_head_is_refused():
+    png = _image_bytes((300, 200))
+
+    def handler(method, path, query, body):
+        if method == "HEAD":  # an HTML error page, as CDNs send for a refused HEAD
+            return 405, {"Content-Type": "text/html"}, b"<html>Method Not Allowed</html>"
+        if path == "/page":
+            return 200, {"Content-Type": "text/html"}, b"<html>" + b"x" * 100
+        return 206, {"Content-Type": "image/png", "Content-Range": f"bytes 0-31/{len(png)}"}, png[:32]
+
+    with StubServer(handler) as stub:
+        assert downloader.probe_image(f"{stub.url}/photo.png") is None
+        assert stub.requests == 2
+        assert downloader.probe_image(f"{stub.url}/photo.png", max_bytes=100) == f"{len(png)} bytes exceeds cap"
+        assert downloader.probe_image(f"{stub.url}/page") == "content-type text/html"
+
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_small_png_kept_as_is, test_large_photo_downscaled_to_jpeg,
+                 test_transparent_image_stays_png, test_non_images_and_oversize_rejected):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+        print(f"✅ {test.__name__}")
+    test_probe_falls_back_to_ranged_get_when_head_is_refused()
+    print("✅ test_probe_falls_back_to_ranged_get_when_head_is_refused")
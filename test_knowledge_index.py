@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Offline knowledge index: chunking, incremental ingest, BM25 ranking and
+context packing, plus the "local" retriever backend.
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.blog_agent import knowledge_index, retriever
+from modules.blog_agent.knowledge_index import Hit, KnowledgeIndex, chunk_text, pack_context
+
+DOCS = [
+    {"source": "a", "title": "Solar panels", "text": "Solar panels convert sunlight into electricity.\n\nPhotovoltaic cells are made of silicon."},
+    {"source": "b", "title": "Wind power", "text": "Wind turbines convert kinetic energy into electricity.\n\nOffshore farms mention solar rarely."},
+    {"source": "c", "title": "Batteries", "text": "Lithium batteries store electricity for later use."},
+]
+
+
+def test_chunking_packs_paragraphs_and_splits_long_ones():
+    assert chunk_text("one\n\ntwo\n\n\nthree", max_tokens=100) == ["one\n\ntwo\n\nthree"]
+    long = " ".join(f"w{i}" for i in range(200))  # ~200 tokens
+    pieces = chunk_text(long, max_tokens=50, overlap=10)
+    assert len(pieces) > 4
+    assert all(knowledge_index.estimate_tokens(p) <= 50 for p in pieces)
+    # consecutive pieces overlap
+    assert pieces[0].split()[-1] in pieces[1].split()
+
+
+def test_incremental_ingest(tmp_path):
+    index = KnowledgeIndex(os.path.join(str(tmp_path), "k.db"))
+    assert index.ingest(DOCS)["added"] == 3
+    changed = [dict(DOCS[0], text="Solar thermal collectors heat water."), DOCS[1], DOCS[2]]
+    counts = index.ingest(changed)
+    assert (counts["added"], counts["updated"], counts["skipped"]) == (0, 1, 2)
+    assert index.stats()["documents"] == 3
+    # the old chunks of the updated document are gone
+    assert not index.search("photovoltaic silicon")
+    assert index.search("thermal collectors")[0].source == "a"
+
+
+def test_title_weight_and_common_terms(tmp_path, monkeypatch):
+    index = KnowledgeIndex(os.path.join(str(tmp_path), "k.db"))
+    index.ingest(DOCS)
+    hits = index.search("solar")
+    assert [h.source for h in hits] == ["a", "b"]  # the title match ranks first
+    assert index.selective_terms(["electricity", "zebra"]) == ["electricity"]  # unknown terms dropped
+    # "electricity" is in every chunk, so it is dropped in favour of the rare term
+    monkeypatch.setattr(knowledge_index, "_MIN_DF_CUTOFF", 0)
+    assert index.selective_terms(["electricity", "lithium"]) == ["lithium"]
+    assert [h.source for h in index.search("electricity lithium")] == ["c"]
+    assert index.search('"unbalanced AND (quotes') == []
+
+
+def test_pack_context_respects_budget():
+    hits = [Hit("T", "x" * 400, "s", -3.0, 100), Hit("T", "x" * 400, "s", -2.0, 100), Hit("U", "y" * 80, "s", -1.0, 20)]
+    ctx = pack_context(hits, budget_tokens=130)
+    assert ctx == "[T]\n" + "x" * 400 + "\n\n[U]\n" + "y" * 80  # duplicate skipped, small one still fits
+    assert pack_context(hits, budget_tokens=50) == "[U]\n" + "y" * 80
+
+
+def test_local_backend(tmp_path, monkeypatch):
+    path = os.path.join(str(tmp_path), "k.db")
+    KnowledgeIndex(path).ingest(DOCS)
+    monkeypatch.setattr(knowledge_index, "INDEX_PATH", path)
+    monkeypatch.setattr(retriever, "RETRIEVER_BACKEND", "local")
+    monkeypatch.setattr(retriever, "WIKI_API", "http://127.0.0.1:9/unreachable")
+    assert retriever.retrieve_visual_context("energy", "wind turbines").startswith("[Wind power]")
+    assert retriever.retrieve_section_context("energy", "Batteries", "storage").startswith("[Batteries]")
+    assert retriever.retrieve_visual_context("", "zebra") == "No external context found for 'zebra'."
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+LLM response cache: answers a caller rejects are neither cached nor served
+from the cache, so a retry after a bad response reaches the model again.
+"""
+
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from benchmarks.stub_server import StubServer, gemini_text_response
+from modules import text_generator
+from modules.blog_agent import visual_agent
+from modules.disk_cache import DiskCache
+
+GOOD_VISUALS = json.dumps([{"type": "diagram", "keywords": ["RNN", "architecture"], "after_paragraph": 1}])
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    """A Gemini stub answering each request with the next queued text."""
+    answers = []
+
+    def handler(method, path, query, body):
+        return 200, {}, gemini_text_response(answers.pop(0))
+
+    with StubServer(handler) as server:
+        server.answers = answers
+        monkeypatch.setattr(text_generator, "GEMINI_API_BASE", server.url)
+        monkeypatch.setattr(text_generator, "GEMINI_API_KEY", "test-key")
+        monkeypatch.setattr(text_generator, "LLM_CACHE_ENABLED", True)
+        monkeypatch.setattr(text_generator, "LLM_CACHE", DiskCache(os.path.join(tmp_path, "llm.db"), table="llm_responses"))
+        yield server
+
+
+def test_visual_agent_retries_past_a_bad_answer(stub):
+    stub.answers.extend(["Sure! Here are some visuals: a diagram.", GOOD_VISUALS])
+    visuals = visual_agent.decide_visuals_for_section("RNNs", "Recurrent networks...")
+    assert visuals == [{"type": "diagram", "keywords": "RNN architecture", "after_paragraph": 1}]
+    assert stub.requests == 2
+
+    # The bad answer was never cached, and the retry (cache=False) did not fill it either
+    stub.answers.append(GOOD_VISUALS)
+    assert visual_agent.decide_visuals_for_section("RNNs", "Recurrent networks...") == visuals
+    assert stub.requests == 3
+    # Now the first attempt's good answer is cached
+    assert visual_agent.decide_visuals_for_section("RNNs", "Recurrent networks...") == visuals
+    assert stub.requests == 3
+
+
+def test_invalid_outline_is_not_cached(stub):
+    stub.answers.extend(["{not json", json.dumps({"title": "RNNs", "sections": []})])
+    assert text_generator.plan_blog_outline("RNNs")["title"] == "Understanding RNNs"  # fallback
+    assert text_generator.plan_blog_outline("RNNs")["title"] == "RNNs"
+    assert text_generator.plan_blog_outline("RNNs")["title"] == "RNNs"
+    assert stub.requests == 2
+
+
+def test_cached_answer_failing_validation_is_refetched(stub):
+    stub.answers.extend(["plain", "[1]"])
+    assert text_generator._gemini_call("prompt") == "plain"  # cached without a validator
+    assert text_generator._gemini_call("prompt", validate=lambda t: t.startswith("[")) == "[1]"
+    assert text_generator._gemini_call("prompt", validate=lambda t: t.startswith("[")) == "[1]"
+    assert stub.requests == 2
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Mermaid rendering: warm worker reuse, render cache, batching, the timeout/kill
+policy and the pure-Python flowchart fallback. The Node worker is replaced by a
+small Python script speaking the same JSON-lines protocol.
+"""
+
+import io
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from modules.blob_store import BlobStore
+from modules.blog_agent import mermaid_fallback, mermaid_renderer
+
+FAKE_WORKER = r'''
+import base64, json, os, sys, time
+print(json.dumps({"ready": True}), flush=True)
+for line in sys.stdin:
+    job = json.loads(line)
+    code = job["code"]
+    if "slow" in code:
+        time.sleep(30)
+    if "nap" in code:
+        time.sleep(0.3)
+    if "bad" in code:
+        print(json.dumps({"id": job["id"], "ok": False, "error": "Parse error"}), flush=True)
+        continue
+    data = f"{os.getpid()}|{job['format']}|{code}".encode()
+    print("some log line", flush=True)
+    print(json.dumps({"id": job["id"], "ok": True, "data": base64.b64encode(data).decode()}), flush=True)
+'''
+
+FLOW = "graph TD\nA[Input] --> B(Process)\nB --> C{Valid?}\nC -- yes --> D[Output]\nC -. no .-> A\nD --> A"
+
+
+def _setup(tmp_path, cmd=None, timeout=5.0, workers=2, renderer="auto"):
+    mermaid_renderer.close_pool()
+    script = os.path.join(tmp_path, "fake_worker.py")
+    with open(script, "w") as f:
+        f.write(FAKE_WORKER)
+    mermaid_renderer.MERMAID_WORKER_CMD = cmd or f"{sys.executable} {script}"
+    mermaid_renderer.MERMAID_TIMEOUT = timeout
+    mermaid_renderer.MERMAID_WORKERS = workers
+    mermaid_renderer.MERMAID_RENDERER = renderer
+    mermaid_renderer.MERMAID_CACHE = BlobStore(os.path.join(tmp_path, "cache"))
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_worker_reused_and_cache_hit(tmp_path):
+    _setup(str(tmp_path))
+    try:
+        paths = [mermaid_renderer.render(f"graph LR\nA-->N{i}")[0] for i in range(3)]
+        pids = {_read(p).split(b"|")[0] for p in paths}
+        assert len(pids) == 1  # one warm worker served every diagram
+        again, renderer = mermaid_renderer.render("graph LR\nA-->N0\n")
+        assert (again, renderer) == (paths[0], "node")
+        stats = mermaid_renderer.stats()
+        assert stats["pool"]["renders"] == 3 and stats["pool"]["spawns"] == 1
+    finally:
+        mermaid_renderer.close_pool()
+
+
+def test_batch_renders_in_parallel(tmp_path):
+    _setup(str(tmp_path), workers=2)
+    try:
+        codes = [f"graph LR\nnap-->N{i}" for i in range(4)] + ["graph LR\nnap-->N0"]
+        start = time.perf_counter()
+        results = mermaid_renderer.render_batch(codes)
+        elapsed = time.perf_counter() - start
+        assert results[0] == results[4]  # duplicate rendered once
+        assert mermaid_renderer.stats()["pool"]["renders"] == 4
+        assert elapsed < 1.0  # 4 x 0.3s over two workers, not serially
+    finally:
+        mermaid_renderer.close_pool()
+
+
+def test_timeout_kills_worker_then_falls_back(tmp_path):
+    _setup(str(tmp_path), timeout=0.5)
+    try:
+        first = _read(mermaid_renderer.render("graph LR\nA-->B")[0]).split(b"|")[0]
+        path, renderer = mermaid_renderer.render("graph LR\nslow --> B")
+        assert renderer == "python"
+        assert Image.open(path).format == "PNG"
+        pool = mermaid_renderer.pool().stats()
+        assert pool["timeouts"] == 1 and pool["idle"] == 0
+        # Mermaid errors keep the worker; the next render starts a fresh one
+        assert mermaid_renderer.render("sequenceDiagram\nbad") == (None, "")
+        second = _read(mermaid_renderer.render("graph LR\nC-->D")[0]).split(b"|")[0]
+        assert second != first
+    finally:
+        mermaid_renderer.close_pool()
+
+
+def test_python_fallback_without_node(tmp_path):
+    _setup(str(tmp_path), cmd="definitely-not-node-xyz worker.mjs")
+    try:
+        path, renderer = mermaid_renderer.render(FLOW)
+        assert renderer == "python"
+        assert mermaid_renderer.pool().unavailable
+        img = Image.open(io.BytesIO(_read(path)))
+        assert img.width > 100 and img.height > 200  # top-down: taller than wide-ish
+        svg, _ = mermaid_renderer.render(FLOW, fmt="svg")
+        assert _read(svg).startswith(b"<svg") and b"Valid?" in _read(svg)
+        assert mermaid_renderer.render("pie\n\"a\": 1") == (None, "")
+    finally:
+        mermaid_renderer.close_pool()
+
+
+def test_fallback_parse_and_routing():
+    chart = mermaid_fallback.layout(mermaid_fallback.parse(FLOW + "\nE & F --> D\nclassDef x fill:#f00;"))
+    assert chart.nodes["C"].shape == "diamond" and chart.nodes["B"].shape == "round"
+    edges = {(e.src, e.dst): e for e in chart.edges}
+    assert edges[("C", "D")].label == "yes" and edges[("C", "A")].style == "dotted"
+    assert ("E", "D") in edges and ("F", "D") in edges
+    routes = {(e.src, e.dst): points for e, points in chart.routes}
+    # D --> A spans three ranks upwards: routed around through bend points, ending at A
+    assert len(routes[("D", "A")]) > 2
+    a = chart.nodes["A"]
+    end = routes[("D", "A")][-1]
+    assert abs(end[1] - (a.y + a.h / 2)) < 1e-6 or abs(end[0] - a.x) <= a.w / 2
+
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_worker_reused_and_cache_hit, test_batch_renders_in_parallel,
+                 test_timeout_kills_worker_then_falls_back, test_python_fallback_without_node):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+        print(f"✅ {test.__name__}")
+    test_fallback_parse_and_routing()
+    print("✅ test_fallback_parse_and_routing")
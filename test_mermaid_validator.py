@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Local Mermaid flowchart validation and the repair-only-on-failure policy in
+generate_mermaid_from_context. Offline: the Gemini calls are replaced.
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.blog_agent import diagram_generator
+from modules.blog_agent.mermaid_validator import strip_fences, validate_flowchart
+
+GOOD = "graph LR\nA[Collect] --> B[Clean]\nB --> C{Valid?}\nC -- yes --> D[Train]\nC -- no --> B\nD --> E[Deploy]"
+
+
+def test_validate_flowchart():
+    assert validate_flowchart(GOOD) == []
+    assert validate_flowchart("sequenceDiagram\nA->>B: hi")[0].startswith("syntax: unsupported diagram type")
+    assert validate_flowchart("graph LR\nA[Start] --> B[Open")[0].startswith("syntax")
+    assert validate_flowchart("graph TD\nA[Start] -->")[0].startswith("syntax")
+    problems = validate_flowchart(GOOD + "\nE --> Ee\nF[Orphan]")
+    assert "references to undefined nodes: Ee" in problems
+    assert "unconnected nodes: F" in problems
+    assert validate_flowchart("graph LR\nA[Load (CSV)] --> B[Parse] --> C[Save]") == [
+        "label of A needs quotes: 'Load (CSV)'"]
+    assert validate_flowchart('graph LR\nA["Load (CSV)"] --> B[Parse] --> C[Save]') == []
+    assert validate_flowchart("graph LR\nA --> B") == ["too few nodes (2 < 3)"]
+    many = "graph LR\n" + "\n".join(f"N{i} --> N{i + 1}" for i in range(20))
+    assert validate_flowchart(many) == ["too many nodes (21 > 15)"]
+    assert strip_fences("```mermaid\n" + GOOD + "\n```") == GOOD
+
+
+def _fake_llm(monkeypatch, first, repaired):
+    calls = {"generate": 0, "repair": []}
+
+    def gemini(prompt, **kw):
+        calls["generate"] += 1
+        return first
+
+    def repair(code, topic, problems=None):
+        calls["repair"].append(problems)
+        return repaired
+
+    monkeypatch.setattr(diagram_generator, "_gemini_call", gemini)
+    monkeypatch.setattr(diagram_generator, "validate_mermaid_code", repair)
+    monkeypatch.setattr(diagram_generator, "_validation", dict.fromkeys(diagram_generator._validation, 0))
+    return calls
+
+
+def test_valid_diagram_skips_repair(monkeypatch):
+    calls = _fake_llm(monkeypatch, "```mermaid\n" + GOOD + "\n```", "unused")
+    assert diagram_generator.generate_mermaid_from_context("ML", "pipeline", "ctx") == GOOD
+    assert calls["repair"] == []
+    stats = diagram_generator.validation_stats()
+    assert stats["repairs_avoided"] == 1 and stats["repair_calls"] == 0
+
+
+def test_invalid_diagram_repaired_once(monkeypatch):
+    broken = "graph LR\nA[Load (CSV)] --> B[Parse]\nB --> C"
+    calls = _fake_llm(monkeypatch, broken, GOOD)
+    assert diagram_generator.generate_mermaid_from_context("ML", "pipeline", "ctx") == GOOD
+    assert len(calls["repair"]) == 1
+    assert "label of A needs quotes: 'Load (CSV)'" in calls["repair"][0]
+
+    # A repair that is still unparseable falls back to the original (which parses)
+    calls = _fake_llm(monkeypatch, broken, "graph LR\nA[oops")
+    assert diagram_generator.generate_mermaid_from_context("ML", "pipeline", "ctx") == broken
+    assert diagram_generator.validation_stats() == {
+        "valid": 0, "repair_calls": 1, "repaired": 0, "repair_failed": 1, "repairs_avoided": 0}
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Fused motivational-post planning: a valid structured response is accepted and
+normalised, malformed ones are rejected, and plan_post falls back to the
+step-by-step chain when validation fails.
+"""
+
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules import image_builder, image_generator
+from modules.image_generator import validate_post_plan
+
+PLAN = {"quote": "“Small steps, every day.”", "mood": "Hopeful",
+        "visual_subject": '"runner at dawn"', "scene": "A lone runner on a coastal road at sunrise."}
+
+
+def test_valid_plan_is_normalised():
+    assert validate_post_plan(json.dumps(PLAN)) == {
+        "quote": "Small steps, every day.", "mood": "hopeful",
+        "visual_subject": "runner at dawn", "scene": "A lone runner on a coastal road at sunrise.",
+    }
+
+
+def test_malformed_plans_are_rejected():
+    bad = [
+        None, "", "not json", "[1, 2]",
+        json.dumps({k: v for k, v in PLAN.items() if k != "scene"}),
+        json.dumps({**PLAN, "quote": "   "}),
+        json.dumps({**PLAN, "mood": "sleepy"}),
+        json.dumps({**PLAN, "visual_subject": " ".join(["word"] * 13)}),
+        json.dumps({**PLAN, "quote": "x" * 301}),
+        json.dumps({**PLAN, "scene": 42}),
+    ]
+    for raw in bad:
+        assert validate_post_plan(raw) is None, raw
+
+
+def test_plan_is_one_uncached_structured_call(monkeypatch):
+    calls = []
+
+    def fake_call(prompt, **kwargs):
+        calls.append(kwargs)
+        return json.dumps(PLAN)
+
+    monkeypatch.setattr(image_generator, "_gemini_call", fake_call)
+    assert image_generator.plan_motivational_post("consistency")["mood"] == "hopeful"
+    assert len(calls) == 1 and calls[0]["cache"] is False
+    assert calls[0]["generation_config"]["responseMimeType"] == "application/json"
+
+
+def test_plan_post_falls_back_to_the_chain(monkeypatch):
+    legacy = []
+    monkeypatch.setattr(image_builder, "_plan_post_legacy", lambda topic: legacy.append(topic) or ("q", "calm", "scene"))
+
+    monkeypatch.setattr(image_builder, "POST_PLANNING_MODE", "fused")
+    monkeypatch.setattr(image_generator, "_gemini_call", lambda prompt, **kw: json.dumps(PLAN))
+    assert image_builder.plan_post("consistency") == ("Small steps, every day.", "hopeful", PLAN["scene"])
+    assert legacy == []
+
+    monkeypatch.setattr(image_generator, "_gemini_call", lambda prompt, **kw: '{"quote": "cut off')
+    assert image_builder.plan_post("consistency") == ("q", "calm", "scene")
+    assert image_builder.plan_post("consistency", planning="legacy") == ("q", "calm", "scene")
+    assert legacy == ["consistency", "consistency"]
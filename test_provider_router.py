@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Provider router: EWMA health ranking, quality tiers, failover, the circuit
+breaker with half-open probes, and text calls failing over between Gemini
+models against a local stub.
+"""
+
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.stub_server import StubServer, gemini_text_response
+from modules import provider_router, text_generator
+from modules.provider_router import CLOSED, HALF_OPEN, OPEN, NoProviderAvailable, ProviderError, Router
+
+
+def _router(**kw):
+    router = Router("test", **kw)
+    router.register("a", "standard")
+    router.register("b", "high")
+    router.register("c", "fast")
+    return router
+
+
+def test_ranking_by_health_and_tier():
+    router = _router(alpha=0.5)
+    assert router.candidates() == ["a", "b"]  # unmeasured keep registration order
+    assert router.candidates("high") == ["b"]
+    router.record("a", 2.0, ok=True)
+    router.record("b", 1.0, ok=True)
+    assert router.candidates() == ["b", "a"]
+    router.record("b", 1.0, ok=False, timeout=True)  # 1.0 × (1 + 5×0.5 + 5×0.5) = 6 > 2
+    assert router.candidates() == ["a", "b"]
+    stats = router.stats()["providers"]["b"]
+    assert (stats["error_rate"], stats["timeout_rate"], stats["timeouts"]) == (0.5, 0.5, 1)
+
+
+def test_failover_and_client_errors():
+    router = _router()
+    seen = []
+
+    def fn(name):
+        seen.append(name)
+        if name == "a":
+            raise ProviderError("overloaded", 503)
+        return f"from {name}"
+
+    assert router.call(fn) == "from b"
+    assert seen == ["a", "b"] and router.decisions[-1]["chosen"] == "b"
+
+    def bad_request(name):
+        raise ProviderError("bad prompt", 400)
+
+    try:
+        router.call(bad_request, pinned="a")
+        raise AssertionError("expected ProviderError")
+    except ProviderError as e:
+        assert e.status == 400
+    assert router.stats()["providers"]["a"]["failures"] == 1  # the 400 did not count
+
+
+def test_circuit_breaker_half_open_probe():
+    router = _router(breaker_failures=2, cooldown=0.05)
+    for _ in range(2):
+        router.record("a", 0.1, ok=False)
+    assert router.stats()["providers"]["a"]["state"] == OPEN
+    assert router.candidates() == ["b"]
+    assert not router.acquire("a")
+
+    time.sleep(0.06)
+    assert router.candidates() == ["a", "b"]  # the probe goes first
+    assert router.stats()["providers"]["a"]["state"] == HALF_OPEN
+    assert router.acquire("a") and not router.acquire("a")  # one probe at a time
+    router.record("a", 0.1, ok=False)
+    assert router.stats()["providers"]["a"]["state"] == OPEN
+
+    time.sleep(0.06)
+    assert router.call(lambda name: name) == "a"
+    assert router.stats()["providers"]["a"]["state"] == CLOSED
+
+    router.record("b", 0.1, ok=False)
+    router.record("b", 0.1, ok=False)
+    try:
+        router.call(lambda name: name, tier="high")
+        raise AssertionError("expected NoProviderAvailable")
+    except NoProviderAvailable:
+        pass
+
+
+def test_text_calls_fail_over_between_models(monkeypatch):
+    def handler(method, path, query, body):
+        if "gemini-2.0-flash" in path:
+            return 503, {}, b'{"error": "overloaded"}'
+        return 200, {}, gemini_text_response("routed")
+
+    # Router() registers itself for the metrics endpoint; put the real one back afterwards
+    monkeypatch.setitem(provider_router._registry, "text", provider_router._registry["text"])
+    router = Router("text", breaker_failures=1, cooldown=60)
+    router.register("gemini-2.0-flash", "standard")
+    router.register("gemini-2.5-flash", "high")
+    with StubServer(handler) as stub:
+        monkeypatch.setattr(text_generator, "GEMINI_API_BASE", stub.url)
+        monkeypatch.setattr(text_generator, "GEMINI_API_KEY", "test-key")
+        monkeypatch.setattr(text_generator, "LLM_CACHE_ENABLED", False)
+        monkeypatch.setattr(text_generator, "TEXT_ROUTER", router)
+        assert text_generator._gemini_call("hello") == "routed"
+        assert stub.requests == 2
+        assert text_generator._gemini_call("hello again") == "routed"
+        assert stub.requests == 3  # 2.0-flash is quarantined, no wasted request
+        assert text_generator._gemini_call("pinned", model="gemini-2.0-flash") == ""
+        assert stub.requests == 3
+
+    from fastapi.testclient import TestClient
+    import api
+    stats = TestClient(api.app).get("/api/v1/metrics/providers").json()["text"]
+    assert stats["providers"]["gemini-2.0-flash"]["state"] == OPEN
+    assert stats["recent_decisions"][-1] == {"time": stats["recent_decisions"][-1]["time"], "tier": "standard",
+                                             "order": ["gemini-2.5-flash"], "chosen": "gemini-2.5-flash"}
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Token bucket: the initial burst is free, then tokens refill at the configured
+rate, never beyond the burst capacity. Driven by a fake clock, so no real waiting.
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from modules.rate_limit import RateLimiter
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _limiter(rate, burst=None):
+    clock = _Clock()
+    return RateLimiter(rate, burst, clock=clock, sleep=clock.sleep), clock
+
+
+def test_burst_is_free_then_refills_at_rate():
+    limiter, clock = _limiter(5, burst=3)
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.now == 0 and clock.sleeps == []
+
+    for _ in range(10):
+        limiter.acquire()
+    assert clock.now == pytest.approx(2.0)  # 10 more tokens at 5/s
+    assert clock.sleeps == [pytest.approx(0.2)] * 10
+    assert limiter.waited_seconds == pytest.approx(2.0)
+
+
+def test_idle_time_refills_only_up_to_capacity():
+    limiter, clock = _limiter(2, burst=4)
+    for _ in range(4):
+        limiter.acquire()
+    clock.now += 60  # would be 120 tokens without the cap
+    for _ in range(4):
+        limiter.acquire()
+    assert clock.sleeps == []
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+    clock.now += 0.25  # half a token refilled
+    limiter.acquire()
+    assert clock.sleeps[-1] == pytest.approx(0.25)
+
+
+def test_default_burst_and_disabled():
+    limiter, clock = _limiter(2.5)
+    assert limiter.capacity == 2
+    limiter, clock = _limiter(0.5)
+    assert limiter.capacity == 1
+    limiter, clock = _limiter(0)
+    for _ in range(100):
+        limiter.acquire()
+    assert clock.sleeps == []
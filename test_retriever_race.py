@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Racing image retrieval against a local fake SerpAPI server.
+No API key or network needed: engine latency is injected per request.
+"""
+
+import io
+import os
+import sys
+import json
+import threading
+import time
+from PIL import Image
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.stub_server import StubServer
+from modules.blog_agent import retriever_hybrid as rh
+from modules.blog_agent import search_cache
+from modules.blob_store import BlobStore
+from modules.disk_cache import DiskCache
+
+# Results point at a per-test stub port, so they must not be cached across tests
+search_cache.SERP_CACHE_ENABLED = False
+
+def _png(color) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (120, 80), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+IMAGES = {"google": _png("red"), "bing": _png("blue")}
+
+
+def _fake_serpapi(base_url, searches):
+    def handler(method, path, query, body):
+        if path == "/img/broken":
+            return 200, {"Content-Type": "text/html"}, b"<html>Not found</html>"
+        if path.startswith("/img/"):
+            return 200, {"Content-Type": "image/png"}, IMAGES[path.rsplit("/", 1)[1]]
+        engine = query["engine"][0]
+        searches.append(engine)
+        if engine == "google_images":
+            results = [{"original": f"{base_url()}/img/broken"}, {"original": f"{base_url()}/img/google"}]
+        else:
+            results = [{"original_image_url": f"{base_url()}/img/bing"}]
+        return 200, {}, json.dumps({"images_results": results}).encode()
+    return handler
+
+
+def _run_race(latencies, tmp_path, mode="race", runs=1):
+    rh.IMAGE_STORE = BlobStore(os.path.join(tmp_path, "store"))
+    searches = []
+    stub = StubServer(None)
+    stub.handler = _fake_serpapi(lambda: stub.url, searches)
+    stub.latency = lambda path, query: latencies.get(query.get("engine", [""])[0], 0.0)
+    with stub:
+        rh.SERPAPI_ENDPOINT = f"{stub.url}/search.json"
+        rh.IS_API_KEY_VALID = True
+        out = os.path.join(tmp_path, "visual.png")
+        start = time.perf_counter()
+        for _ in range(runs):
+            path = rh.find_and_download_image("AI", "neural network", "diagram", out, mode=mode)
+        elapsed = time.perf_counter() - start
+    with open(path, "rb") as f:
+        data = f.read()
+    return data, elapsed, stub.requests, searches
+
+
+def test_race_prefers_fast_engine(tmp_path):
+    data, elapsed, _, _ = _run_race({"google_images": 1.5, "bing_images": 0.05}, str(tmp_path))
+    assert data == IMAGES["bing"]
+    assert elapsed < 1.5
+    assert not [f for f in os.listdir(tmp_path) if ".race" in f or ".part" in f]
+
+
+def test_race_keeps_preference_order_on_tie(tmp_path):
+    data, _, _, _ = _run_race({"google_images": 0.2, "bing_images": 0.1}, str(tmp_path))
+    assert data == IMAGES["google"]
+
+
+def test_cascade_mode_still_serial(tmp_path):
+    data, _, requests, searches = _run_race({"google_images": 0.0, "bing_images": 0.0}, str(tmp_path), mode="cascade")
+    assert data == IMAGES["google"]
+    # one search; the broken first candidate is skipped without another search
+    assert searches == ["google_images"]
+    assert requests == 4  # search + 2 HEAD probes + 1 download
+
+
+def test_known_url_served_from_store(tmp_path):
+    data, _, requests, searches = _run_race({"google_images": 0.0, "bing_images": 0.0}, str(tmp_path), mode="cascade", runs=3)
+    assert data == IMAGES["google"]
+    assert len(searches) == 3
+    assert requests == 3 + 3  # three searches, 2 probes + 1 download only on the first run
+    assert rh.IMAGE_STORE.stats()["blobs"] == 1
+
+
+def test_returned_image_survives_eviction(tmp_path):
+    rh.IMAGE_STORE = BlobStore(os.path.join(tmp_path, "store"))
+    stub = StubServer(None)
+    stub.handler = _fake_serpapi(lambda: stub.url, [])
+    with stub:
+        rh.SERPAPI_ENDPOINT = f"{stub.url}/search.json"
+        rh.IS_API_KEY_VALID = True
+        paths = [rh.find_and_download_image("AI", "neural network", "diagram", os.path.join(tmp_path, f"{i}.png"),
+                                            mode="cascade") for i in range(2)]
+    assert paths == [os.path.join(tmp_path, "0.png"), os.path.join(tmp_path, "1.png")]
+    assert stub.requests == 2 + 3  # the second run is served from the store
+    rh.IMAGE_STORE.purge()  # e.g. another run's put_file evicting the blob
+    for path in paths:
+        with open(path, "rb") as f:
+            assert f.read() == IMAGES["google"]
+
+
+def _job(delays, started):
+    """A _race_paths job writing its own temp file after delays[i] seconds (None = fails)."""
+    def job(i, tmp_path, cancel):
+        started.append(i)
+        if cancel.wait(delays[i] or 0):
+            return None
+        if delays[i] is None:
+            return None
+        with open(tmp_path, "w") as f:
+            f.write(str(i))
+        return tmp_path
+    return job
+
+
+def test_race_paths_first_success_wins(tmp_path, monkeypatch):
+    monkeypatch.setattr(rh, "IMAGE_SEARCH_RACE_GRACE", 0.05)
+    out = os.path.join(tmp_path, "out.png")
+    started = []
+    start = time.perf_counter()
+    # job 0 fails, job 1 is slow, job 2 finishes first; 1 is only waited on for the grace period
+    assert rh._race_paths(3, _job([None, 2.0, 0.05], started), out, "t", 3) == (2, out)
+    assert time.perf_counter() - start < 1.0
+    with open(out) as f:
+        assert f.read() == "2"
+    time.sleep(0.1)
+    assert sorted(started) == [0, 1, 2]
+    assert os.listdir(tmp_path) == ["out.png"]  # no loser temp files left
+
+
+def test_race_paths_grace_keeps_preference(tmp_path, monkeypatch):
+    monkeypatch.setattr(rh, "IMAGE_SEARCH_RACE_GRACE", 0.5)
+    out = os.path.join(tmp_path, "out.png")
+    assert rh._race_paths(2, _job([0.15, 0.05], []), out, "t", 2) == (0, out)
+    time.sleep(0.1)
+    assert os.listdir(tmp_path) == ["out.png"]
+    assert rh._race_paths(2, _job([None, None], []), out, "t", 2) is None
+
+
+def test_losing_race_cancels_inner_downloads(tmp_path):
+    outer = rh._CancelScope()
+    seen = []
+
+    def job(i, tmp, cancel):
+        seen.append(cancel.wait(5))  # a download that only stops when cancelled
+        return None
+
+    result = []
+    runner = threading.Thread(target=lambda: result.append(
+        rh._race_paths(2, job, os.path.join(tmp_path, "out.png"), "c", 2, parent=outer)))
+    runner.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    outer.set()  # the enclosing attempt lost its race
+    runner.join(5)
+    assert time.perf_counter() - started < 1.0
+    assert result == [None] and seen == [True, True]
+    assert rh._CancelScope().child().is_set() is False and outer.child().is_set() is True
+
+
+def test_cached_search_skips_serpapi(tmp_path, monkeypatch):
+    searches = []
+
+    def handler(method, path, query, body):
+        searches.append(query["q"][0])
+        return 200, {}, json.dumps({"images_results": [{"original": "https://img.example/a.png"}]}).encode()
+
+    monkeypatch.setattr(search_cache, "SERP_CACHE_ENABLED", True)
+    monkeypatch.setattr(search_cache, "RESULTS", DiskCache(os.path.join(tmp_path, "serp.db"), table="serp_results"))
+    with StubServer(handler) as stub:
+        monkeypatch.setattr(rh, "SERPAPI_ENDPOINT", f"{stub.url}/search.json")
+        assert rh._search_candidates("AI  Agents, diagram", "google_images") == ["https://img.example/a.png"]
+        assert rh._search_candidates("ai agents diagram", "google_images") == ["https://img.example/a.png"]
+        assert len(searches) == 1 and stub.requests == 1
+        rh._search_candidates("ai agents diagram", "bing_images")  # other engine, own entry
+        assert stub.requests == 2
+    assert search_cache.stats()["hits"] == 1
+
+
+def test_search_sends_query_as_written(tmp_path, monkeypatch):
+    searches = []
+
+    def handler(method, path, query, body):
+        searches.append(query["q"][0])
+        return 200, {}, json.dumps({"images_results": []}).encode()
+
+    monkeypatch.setattr(search_cache, "SERP_CACHE_ENABLED", True)
+    monkeypatch.setattr(search_cache, "RESULTS", DiskCache(os.path.join(tmp_path, "serp.db"), table="serp_results"))
+    with StubServer(handler) as stub:
+        monkeypatch.setattr(rh, "SERPAPI_ENDPOINT", f"{stub.url}/search.json")
+        rh._search_candidates("C++ vs Node.js, memory", "google_images")
+        rh._search_candidates("c++ VS node.js memory", "google_images")
+    assert searches == ["C++ vs Node.js, memory"]  # as written upstream; the normalised form is only the cache key
+
+
+def test_key_check_persists_only_definite_answers(tmp_path, monkeypatch):
+    statuses = []
+
+    def handler(method, path, query, body):
+        return statuses.pop(0), {}, b'{"error": "nope"}'
+
+    monkeypatch.setattr(search_cache, "SERP_CACHE_ENABLED", True)
+    monkeypatch.setattr(search_cache, "KEY_STATUS", DiskCache(os.path.join(tmp_path, "serp.db"), table="serp_key_status"))
+    monkeypatch.setattr(rh, "SERP_API_KEY", "key")
+    with StubServer(handler) as stub:
+        monkeypatch.setattr(rh, "SERPAPI_ENDPOINT", f"{stub.url}/search.json")
+        for status in (429, 503):
+            monkeypatch.setattr(rh, "IS_API_KEY_VALID", None)
+            statuses.append(status)
+            assert rh._validate_api_key() is False
+            assert rh.IS_API_KEY_VALID is None and search_cache.get_key_status("key") is None
+
+        statuses.append(401)
+        assert rh._validate_api_key() is False
+        assert search_cache.get_key_status("key") is False
+        monkeypatch.setattr(rh, "IS_API_KEY_VALID", None)
+        assert rh._validate_api_key() is False and stub.requests == 3  # answered from the cache
+
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_race_prefers_fast_engine, test_race_keeps_preference_order_on_tie,
+                 test_cascade_mode_still_serial, test_known_url_served_from_store):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Wikipedia grounding retriever against a local stub MediaWiki API.
+Checks round-trip counts: one cold, zero warm, one batched refetch.
+"""
+
+import os
+import sys
+import json
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.stub_server import StubServer
+from modules.blog_agent import retriever
+from modules.disk_cache import DiskCache
+
+ARTICLES = {
+    "Neural network": (101, "A neural network is a model inspired by the brain."),
+    "Backpropagation": (202, "Backpropagation computes gradients layer by layer."),
+    "Perceptron": (303, "The perceptron is a linear classifier."),
+    "Graph theory": (404, "Graph theory studies pairwise relations."),
+}
+SEARCH = {
+    "neural network diagram": ["Neural network", "Backpropagation", "Perceptron"],
+    "graphs": ["Graph theory"],
+}
+
+
+def _mediawiki(calls):
+    def handler(method, path, query, body):
+        q = {k: v[0] for k, v in query.items()}
+        calls.append(q)
+        if q.get("generator") == "search":
+            titles = SEARCH.get(q["gsrsearch"].lower(), [])[: int(q["gsrlimit"])]
+        else:
+            titles = q["titles"].split("|")
+        pages = []
+        for i, title in enumerate(titles):
+            revid, text = ARTICLES[title]
+            page = {"pageid": revid, "title": title, "lastrevid": revid, "extract": text}
+            if q.get("generator") == "search":
+                page["index"] = i + 1
+            pages.append(page)
+        return 200, {"Content-Type": "application/json"}, json.dumps({"query": {"pages": pages}}).encode()
+    return handler
+
+
+def _setup(tmp_path, latency=0.0):
+    db = os.path.join(tmp_path, "wiki.db")
+    retriever.EXTRACTS = DiskCache(db, table="wiki_extracts")
+    retriever.QUERIES = DiskCache(db, table="wiki_queries")
+    retriever.WIKI_CACHE_ENABLED = True
+    calls = []
+    stub = StubServer(_mediawiki(calls), latency=latency)
+    stub.start()
+    retriever.WIKI_API = f"{stub.url}/w/api.php"
+    return stub, calls
+
+
+def test_one_round_trip_then_cached(tmp_path):
+    stub, calls = _setup(str(tmp_path))
+    try:
+        ctx = retriever.retrieve_visual_context("", "Neural network", "diagram")
+        assert [c.get("generator") for c in calls] == ["search"]
+        assert ctx.index("[Neural network]") < ctx.index("[Backpropagation]") < ctx.index("[Perceptron]")
+        assert "linear classifier" in ctx
+
+        again = retriever.retrieve_visual_context("", "neural  network,", "DIAGRAM")
+        assert again == ctx
+        assert len(calls) == 1  # zero round trips when warm
+    finally:
+        stub.stop()
+
+
+def test_evicted_extracts_refetched_in_one_batch(tmp_path):
+    stub, calls = _setup(str(tmp_path))
+    try:
+        ctx = retriever.retrieve_visual_context("", "Neural network", "diagram")
+        retriever.EXTRACTS.purge()
+        again = retriever.retrieve_visual_context("", "Neural network", "diagram")
+        assert again == ctx
+        assert len(calls) == 2
+        assert calls[1]["titles"] == "Neural network|Backpropagation|Perceptron"
+    finally:
+        stub.stop()
+
+
+def test_topic_fallback_runs_concurrently(tmp_path):
+    stub, calls = _setup(str(tmp_path), latency=0.3)
+    try:
+        start = time.perf_counter()
+        ctx = retriever.retrieve_visual_context("graphs", "something obscure")
+        elapsed = time.perf_counter() - start
+        assert "[Graph theory]" in ctx
+        assert len(calls) == 2
+        assert elapsed < 0.55  # both searches overlapped, not 2 x 0.3s
+    finally:
+        stub.stop()
+
+
+def test_no_results_message(tmp_path):
+    stub, _ = _setup(str(tmp_path))
+    try:
+        assert retriever.retrieve_visual_context("", "nothing here") == "No external context found for 'nothing here'."
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_one_round_trip_then_cached, test_evicted_extracts_refetched_in_one_batch,
+                 test_topic_fallback_runs_concurrently, test_no_results_message):
+        with tempfile.TemporaryDirectory() as d:
+            test(d)
+        print(f"✅ {test.__name__}")
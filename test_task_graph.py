@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Dependency-graph executor: nodes run after their dependencies with their
+results, a failing node stops its dependents, and the report names the
+critical path.
+"""
+
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from modules.task_graph import TaskGraph
+
+
+def test_dependencies_run_first_and_pass_results():
+    graph = TaskGraph(max_workers=4, name="test")
+    order = []
+    lock = threading.Lock()
+
+    def step(name, value):
+        def fn(*args):
+            with lock:
+                order.append(name)
+            return value + sum(args)
+        return fn
+
+    graph.add("sum", step("sum", 0), deps=["a", "b"])  # deps may be added later
+    graph.add("a", step("a", 1))
+    graph.add("b", step("b", 2), deps=["a"])
+    results = graph.run()
+    assert results == {"sum": 4, "a": 1, "b": 3}
+    assert order == ["a", "b", "sum"]
+
+
+def test_spawned_nodes_wait_for_their_parent():
+    graph = TaskGraph(max_workers=4, name="test")
+    done = []
+
+    def parent():
+        graph.add("child", lambda: done.append("child") or "c")
+        time.sleep(0.05)
+        done.append("parent")
+        return "p"
+
+    graph.add("parent", parent)
+    graph.add("join", lambda c: c + "!", deps=["child"])
+    assert graph.run()["join"] == "c!"
+    assert done == ["parent", "child"]
+
+
+def test_failure_cancels_dependents():
+    graph = TaskGraph(max_workers=2, name="test")
+    ran = []
+
+    def boom():
+        raise ValueError("bad outline")
+
+    graph.add("outline", boom)
+    graph.add("write", lambda outline: ran.append("write"), deps=["outline"])
+    graph.add("export", lambda write: ran.append("export"), deps=["write"])
+    with pytest.raises(RuntimeError, match="Task 'outline' failed in test: bad outline") as exc:
+        graph.run()
+    assert isinstance(exc.value.__cause__, ValueError)
+    assert ran == []
+
+
+def test_missing_dependency_is_reported():
+    graph = TaskGraph(name="test")
+    graph.add("a", lambda never: None, deps=["never"])
+    with pytest.raises(RuntimeError, match="unsatisfied dependencies in test: a"):
+        graph.run()
+
+
+def test_critical_path_report():
+    graph = TaskGraph(max_workers=4, name="test")
+    graph.add("cover", lambda: time.sleep(0.05))
+    graph.add("outline", lambda: time.sleep(0.02))
+    graph.add("write", lambda outline: time.sleep(0.15), deps=["outline"])
+    graph.add("export", lambda cover, write: time.sleep(0.01), deps=["cover", "write"])
+    graph.run()
+
+    assert graph.critical_path() == ["outline", "write", "export"]
+    report = graph.report()
+    assert [step["task"] for step in report["critical_path"]] == ["outline", "write", "export"]
+    assert set(report["tasks"]) == {"cover", "outline", "write", "export"}
+    assert report["tasks"]["export"]["deps"] == ["cover", "write"]
+    assert report["critical_path_seconds"] >= 0.17
+    assert report["wall_seconds"] >= report["critical_path_seconds"]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Single-pass outlined text in typography_engine matches the old per-offset
+redraw (80 outline rasterizations + fake bold/italic redraws) to within
+anti-aliasing, and render_quote_on_image still produces a full-size image.
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image, ImageChops, ImageFont, ImageStat
+
+from benchmarks.bench_typography import legacy_outlined_text
+from modules import typography_engine
+from modules.typography_engine import _draw_outlined_text
+
+TEXT = "The best way out\nis always through\nkeep going"
+
+
+def _background(size=(600, 400)):
+    img = Image.linear_gradient("L").resize(size).convert("RGBA")
+    return Image.merge("RGBA", (img.getchannel("R"), Image.new("L", size, 90), img.getchannel("B"), img.getchannel("A")))
+
+
+def test_matches_legacy_rendering():
+    font = ImageFont.load_default(48)
+    for bold, italic in ((False, False), (True, False), (False, True)):
+        old, new = _background(), _background()
+        legacy_outlined_text(old, 40.5, 60, TEXT, font, (255, 255, 255), (0, 0, 0), 4, bold, italic)
+        _draw_outlined_text(new, 40.5, 60, TEXT, font, (255, 255, 255), (0, 0, 0), 4, bold, italic)
+        diff = ImageChops.difference(old.convert("RGB"), new.convert("RGB"))
+        mean = sum(ImageStat.Stat(diff).mean) / 3
+        changed = sum(diff.convert("L").point(lambda v: 255 if v > 64 else 0).histogram()[255:])
+        assert mean < 1.0, (bold, italic, mean)
+        assert changed < 100, (bold, italic, changed)
+
+
+def test_text_near_the_edge_is_clipped(tmp_path):
+    font = ImageFont.load_default(60)
+    img = _background((200, 120))
+    _draw_outlined_text(img, -30, -20, TEXT, font, (255, 255, 255), (0, 0, 0), 4, True, False)
+    assert img.size == (200, 120)
+
+
+def test_render_quote_on_image(tmp_path):
+    background = os.path.join(tmp_path, "bg.png")
+    _background((1080, 1080)).convert("RGB").save(background)
+    out = typography_engine.render_quote_on_image(
+        background, "Small steps every day add up to big results", "calm", os.path.join(tmp_path, "out.png"))
+    with Image.open(out) as img, Image.open(background) as bg:
+        assert img.size == (1080, 1080)
+        assert ImageChops.difference(img.convert("RGB"), bg.convert("RGB")).getbbox() is not None
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    test_matches_legacy_rendering()
+    with tempfile.TemporaryDirectory() as d:
+        test_text_near_the_edge_is_clipped(d)
+    with tempfile.TemporaryDirectory() as d:
+        test_render_quote_on_image(d)
+    print("✅ typography engine tests passed")